@@ -10,3 +10,56 @@ DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
     'port': os.getenv('DB_PORT', '5432')
 }
+
+# Connection pool shared by the web app and the report generator
+POOL_CONFIG = {
+    'minconn': int(os.getenv('DB_POOL_MIN', '1')),
+    'maxconn': int(os.getenv('DB_POOL_MAX', '10')),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+    'health_check': os.getenv('DB_POOL_HEALTH_CHECK', '1') == '1'
+}
+
+# Hard cap on rows returned per /api/search page (deeper results use the next-page cursor)
+SEARCH_MAX_PAGE_SIZE = int(os.getenv('SEARCH_MAX_PAGE_SIZE', '1000'))
+
+# Minimum word_similarity() between a term and a name for fuzzy searches to match it (0-1)
+SEARCH_FUZZY_THRESHOLD = float(os.getenv('SEARCH_FUZZY_THRESHOLD', '0.4'))
+
+# Typeahead (/api/suggest): most names returned per request, and typed prefixes kept in memory
+SUGGEST_MAX_LIMIT = int(os.getenv('SUGGEST_MAX_LIMIT', '20'))
+SUGGEST_CACHE_ENTRIES = int(os.getenv('SUGGEST_CACHE_ENTRIES', '4096'))
+
+# Rows fetched per round trip by the streaming export endpoint
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '5000'))
+
+# Response cache for /api/search and /api/stats (REDIS_URL switches to a shared Redis store)
+CACHE_CONFIG = {
+    'max_entries': int(os.getenv('CACHE_MAX_ENTRIES', '1024')),
+    'ttl': float(os.getenv('CACHE_TTL', '300')),
+    'version_check_interval': float(os.getenv('CACHE_VERSION_CHECK_INTERVAL', '5')),
+    'redis_url': os.getenv('REDIS_URL')
+}
+
+# Engine behind /api/stats: 'sql' (PostgreSQL) or 'snapshot' (in-memory NumPy copy, see src/analytics.py)
+STATS_ENGINE = os.getenv('STATS_ENGINE', 'sql')
+
+# Directory for the memory-mapped salary snapshot shared by worker processes and the report (unset: keep it in memory)
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR') or None
+
+# Worker processes rendering the PDF report pages (merging them needs pypdf; 1 renders serially)
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', str(os.cpu_count() or 1)))
+
+# Report queries run at the same time (each holds one pooled connection; keep it within DB_POOL_MAX)
+REPORT_FETCH_WORKERS = int(os.getenv('REPORT_FETCH_WORKERS', '4'))
+
+# Where the report's aggregates are computed: 'sql' (one query per dataset) or 'local' (one extract, pandas)
+REPORT_COMPUTE = os.getenv('REPORT_COMPUTE', 'sql')
+
+# Rows per round trip when the report reads per-record extracts
+REPORT_CHUNK_SIZE = int(os.getenv('REPORT_CHUNK_SIZE', '100000'))
+
+# Declaration rows per transaction in the bulk loader (src/loader.py)
+LOAD_BATCH_SIZE = int(os.getenv('LOAD_BATCH_SIZE', '50000'))
+
+# Processes parsing declaration PDFs (src/parser.py)
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', str(os.cpu_count() or 1)))
@@ -0,0 +1,116 @@
+-- Inequality aggregates, so Gini/Hoover/Atkinson/Theil can be computed
+-- next to the data and only the results cross the wire.
+-- All of them take float8 (cast salary_amount::float8) and skip NULLs.
+-- Used by the inequality queries of src/stats.py (the API and the report),
+-- which check that they are installed; no view depends on them.
+
+-- Gini coefficient. The input must arrive sorted:
+--     gini_agg(x ORDER BY x)
+-- State: {count, sum, sum of rank * value}
+CREATE OR REPLACE FUNCTION gini_sfunc(state float8[], x float8)
+RETURNS float8[] LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT ARRAY[state[1] + 1, state[2] + x, state[3] + (state[1] + 1) * x]
+$$;
+
+CREATE OR REPLACE FUNCTION gini_final(state float8[])
+RETURNS float8 LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE WHEN state[1] > 0 AND state[2] > 0
+                THEN (2 * state[3] - (state[1] + 1) * state[2]) / (state[1] * state[2])
+           END
+$$;
+
+CREATE OR REPLACE AGGREGATE gini_agg(float8) (
+    SFUNC = gini_sfunc,
+    STYPE = float8[],
+    FINALFUNC = gini_final,
+    INITCOND = '{0,0,0}'
+);
+
+-- Element-wise sum of two states (combine step of the order-independent aggregates)
+CREATE OR REPLACE FUNCTION inequality_combine(a float8[], b float8[])
+RETURNS float8[] LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT array_agg(x + y ORDER BY i) FROM unnest(a, b) WITH ORDINALITY AS t(x, y, i)
+$$;
+
+-- Hoover index, given each value's group mean (e.g. AVG(x) OVER (PARTITION BY ...)):
+--     hoover_agg(x, group_mean)
+-- State: {sum of |x - mean|, sum}
+CREATE OR REPLACE FUNCTION hoover_sfunc(state float8[], x float8, mean float8)
+RETURNS float8[] LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT ARRAY[state[1] + abs(x - mean), state[2] + x]
+$$;
+
+CREATE OR REPLACE FUNCTION hoover_final(state float8[])
+RETURNS float8 LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE WHEN state[2] <> 0 THEN state[1] / (2 * state[2]) END
+$$;
+
+CREATE OR REPLACE AGGREGATE hoover_agg(float8, float8) (
+    SFUNC = hoover_sfunc,
+    STYPE = float8[],
+    FINALFUNC = hoover_final,
+    COMBINEFUNC = inequality_combine,
+    INITCOND = '{0,0}',
+    PARALLEL = SAFE
+);
+
+-- Atkinson index with inequality aversion epsilon, over positive values:
+--     atkinson_agg(x, 0.5)
+-- State: {count, sum, sum of x^(1 - epsilon), sum of ln x, epsilon}
+CREATE OR REPLACE FUNCTION atkinson_sfunc(state float8[], x float8, epsilon float8)
+RETURNS float8[] LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE WHEN x > 0
+                THEN ARRAY[state[1] + 1, state[2] + x, state[3] + power(x, 1 - epsilon),
+                           state[4] + ln(x), epsilon]
+                ELSE state
+           END
+$$;
+
+CREATE OR REPLACE FUNCTION atkinson_combine(a float8[], b float8[])
+RETURNS float8[] LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT ARRAY[a[1] + b[1], a[2] + b[2], a[3] + b[3], a[4] + b[4], greatest(a[5], b[5])]
+$$;
+
+CREATE OR REPLACE FUNCTION atkinson_final(state float8[])
+RETURNS float8 LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE
+        WHEN state[1] = 0 THEN NULL
+        WHEN state[5] = 1 THEN 1 - exp(state[4] / state[1]) / (state[2] / state[1])
+        ELSE 1 - power(state[3] / state[1], 1 / (1 - state[5])) / (state[2] / state[1])
+    END
+$$;
+
+CREATE OR REPLACE AGGREGATE atkinson_agg(float8, float8) (
+    SFUNC = atkinson_sfunc,
+    STYPE = float8[],
+    FINALFUNC = atkinson_final,
+    COMBINEFUNC = atkinson_combine,
+    INITCOND = '{0,0,0,0,0}',
+    PARALLEL = SAFE
+);
+
+-- Theil T index over positive values: theil_agg(x)
+-- State: {count, sum, sum of x ln x}
+CREATE OR REPLACE FUNCTION theil_sfunc(state float8[], x float8)
+RETURNS float8[] LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE WHEN x > 0
+                THEN ARRAY[state[1] + 1, state[2] + x, state[3] + x * ln(x)]
+                ELSE state
+           END
+$$;
+
+CREATE OR REPLACE FUNCTION theil_final(state float8[])
+RETURNS float8 LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE WHEN state[1] > 0
+                THEN state[3] / state[2] - ln(state[2] / state[1])
+           END
+$$;
+
+CREATE OR REPLACE AGGREGATE theil_agg(float8) (
+    SFUNC = theil_sfunc,
+    STYPE = float8[],
+    FINALFUNC = theil_final,
+    COMBINEFUNC = inequality_combine,
+    INITCOND = '{0,0,0}',
+    PARALLEL = SAFE
+);
@@ -9,16 +9,21 @@ CREATE TABLE companies (
 -- Table for storing document references
 CREATE TABLE documents (
     document_id SERIAL PRIMARY KEY,
-    filename VARCHAR(255) NOT NULL,
+    filename VARCHAR(255) NOT NULL UNIQUE,
     company_id INTEGER REFERENCES companies(company_id),
     employee_count INTEGER,
-    total_salary_mass DECIMAL(15, 2)
+    total_salary_mass DECIMAL(15, 2),
+    -- SHA-256 (hex) and size in bytes of the declaration file, when loaded by src.parser
+    content_hash CHAR(64) UNIQUE,
+    file_size BIGINT
 );
 
 -- Table for storing employee information
 CREATE TABLE employees (
     employee_id SERIAL PRIMARY KEY,
-    full_name VARCHAR(255) NOT NULL
+    full_name VARCHAR(255) NOT NULL,
+    -- CNSS registration number from the declarations (NULL when the source has none)
+    cnss_number VARCHAR(20)
 );
 
 -- Table for storing salary records
@@ -30,3 +35,32 @@ CREATE TABLE salary_records (
     salary_amount DECIMAL(15, 2)
 );
 
+-- Natural keys the bulk loader (src/loader.py) deduplicates companies and employees on.
+-- A missing city counts as '' so companies without one are deduplicated too.
+-- Employees are identified by registration number; only rows without one fall back to the name.
+CREATE UNIQUE INDEX uq_companies_name_city ON companies (company_name, COALESCE(city, ''));
+CREATE UNIQUE INDEX uq_employees_cnss_number ON employees (cnss_number);
+CREATE UNIQUE INDEX uq_employees_full_name ON employees (full_name) WHERE cnss_number IS NULL;
+
+-- Staging area of the bulk loader: parsed declaration rows of the batch being
+-- loaded. Unlogged (no WAL) and truncated by every batch.
+CREATE UNLOGGED TABLE staging_salary_rows (
+    filename VARCHAR(255) NOT NULL,
+    company_name VARCHAR(255) NOT NULL,
+    activity_description TEXT,
+    city VARCHAR(100),
+    full_name VARCHAR(255) NOT NULL,
+    salary_amount DECIMAL(15, 2),
+    content_hash CHAR(64),
+    file_size BIGINT,
+    cnss_number VARCHAR(20)
+);
+
+-- Single-row counter bumped whenever new data is loaded (invalidates cached API responses)
+CREATE TABLE data_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO data_version DEFAULT VALUES;
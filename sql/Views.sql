@@ -1,7 +1,12 @@
+-- Materialized views for the dashboard and report aggregates.
+-- Each one has a unique index so it can be refreshed with
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY (readers are never blocked).
+-- Refreshes are driven by src/matviews.py after new documents are loaded.
+
 -- View for company summary information
 -- Updated company_summary view with COALESCE and decimal precision
-CREATE OR REPLACE VIEW company_summary AS
-SELECT 
+CREATE MATERIALIZED VIEW IF NOT EXISTS company_summary AS
+SELECT
     c.company_id,
     c.company_name,
     c.activity_description,
@@ -14,9 +19,11 @@ FROM companies c
 LEFT JOIN salary_records s ON c.company_id = s.company_id
 GROUP BY c.company_id, c.company_name, c.activity_description, c.city;
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_company_summary_id ON company_summary(company_id);
+
 -- View for top earners
 CREATE OR REPLACE VIEW top_earners AS
-SELECT 
+SELECT
     e.employee_id,
     e.full_name,
     c.company_id,
@@ -32,30 +39,58 @@ JOIN documents d ON s.document_id = d.document_id
 ORDER BY s.salary_amount DESC;
 
 -- City-based salary statistics
-CREATE OR REPLACE VIEW city_salary_stats AS
-SELECT 
+CREATE MATERIALIZED VIEW IF NOT EXISTS city_salary_stats AS
+SELECT
     city,
     COUNT(DISTINCT c.company_id) AS company_count,
     COUNT(DISTINCT s.employee_id) AS employee_count,
     AVG(s.salary_amount) AS average_salary,
     PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY s.salary_amount) AS median_salary,
-    MAX(s.salary_amount) AS max_salary
+    PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY s.salary_amount) AS p25_salary,
+    PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY s.salary_amount) AS p75_salary,
+    STDDEV(s.salary_amount) AS stddev_salary,
+    MAX(s.salary_amount) AS max_salary,
+    MIN(s.salary_amount) AS min_salary
 FROM companies c
 JOIN salary_records s ON c.company_id = s.company_id
+WHERE s.salary_amount IS NOT NULL
+  AND s.employee_id IS NOT NULL
+  AND s.document_id IS NOT NULL
 GROUP BY city;
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_city_salary_stats_city ON city_salary_stats(city);
+
 -- Activity-based salary statistics
-CREATE OR REPLACE VIEW activity_salary_stats AS
-SELECT 
+CREATE MATERIALIZED VIEW IF NOT EXISTS activity_salary_stats AS
+SELECT
     activity_description,
     COUNT(DISTINCT c.company_id) AS company_count,
     COUNT(DISTINCT s.employee_id) AS employee_count,
     AVG(s.salary_amount) AS average_salary,
-    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY s.salary_amount) AS median_salary
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY s.salary_amount) AS median_salary,
+    PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY s.salary_amount) AS p25_salary,
+    PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY s.salary_amount) AS p75_salary,
+    STDDEV(s.salary_amount) AS stddev_salary,
+    MAX(s.salary_amount) AS max_salary,
+    MIN(s.salary_amount) AS min_salary
 FROM companies c
 JOIN salary_records s ON c.company_id = s.company_id
+WHERE s.salary_amount IS NOT NULL
+  AND s.employee_id IS NOT NULL
+  AND s.document_id IS NOT NULL
 GROUP BY activity_description;
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_activity_salary_stats_activity ON activity_salary_stats(activity_description);
+
+-- Refresh bookkeeping: the newest document each materialized view reflects
+CREATE TABLE IF NOT EXISTS matview_refresh_log (
+    view_name VARCHAR(63) PRIMARY KEY,
+    last_document_id INTEGER,
+    refreshed_at TIMESTAMP,
+    duration_ms INTEGER
+);
+
+
 SELECT 
     e.employee_id,
     e.full_name,
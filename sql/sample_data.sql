@@ -127,6 +127,14 @@ SET total_salary_mass = (
     WHERE s.document_id = d.document_id
 );
 
+-- Refresh the materialized aggregates (see sql/Views.sql)
+REFRESH MATERIALIZED VIEW company_summary;
+REFRESH MATERIALIZED VIEW city_salary_stats;
+REFRESH MATERIALIZED VIEW activity_salary_stats;
+
+-- Invalidate cached API responses
+UPDATE data_version SET version = version + 1, updated_at = NOW();
+
 -- Verify data
 SELECT 'Companies:', COUNT(*) FROM companies
 UNION ALL
@@ -0,0 +1,513 @@
+"""
+Columnar in-memory snapshot of the salary facts for the /api/stats engine.
+
+The snapshot holds one row per salary record with compact NumPy columns:
+salaries as float64 and city, activity and company name dictionary-encoded
+as int32 codes (-1 for NULL). Text filters are evaluated once per distinct
+dictionary value and broadcast through the codes, and every aggregate is a
+vectorized sort/bincount over the masked rows, so a stats request never
+leaves the process.
+
+Only filters on company attributes are supported; requests filtering on
+employee names fall back to SQL (see supports()).
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.query_builder import EXACT_FILTERS, TEXT_FILTERS
+from src.stats import (SALARY_BUCKET_BOUNDS, SALARY_BUCKET_LABELS, INEQUALITY_MIN_GROUP_SIZE,
+                       INEQUALITY_EPSILON, OPTIONAL_STATS_KEYS, fetch_stats)
+from src.inequality import grouped_inequality
+from src.extract import copy_frame
+
+# Same rows the SQL engine aggregates: every FK set and a salary present
+SNAPSHOT_QUERY = """
+    SELECT
+        s.employee_id,
+        s.salary_amount::float8 AS salary_amount,
+        c.company_name,
+        c.city,
+        c.activity_description
+    FROM salary_records s
+    JOIN companies c ON s.company_id = c.company_id
+    WHERE s.employee_id IS NOT NULL
+      AND s.document_id IS NOT NULL
+      AND s.salary_amount IS NOT NULL
+"""
+
+SNAPSHOT_DTYPES = {
+    'employee_id': 'int32',
+    'salary_amount': 'float64',
+    'company_name': 'category',
+    'city': 'category',
+    'activity_description': 'category',
+}
+
+# Text filters the snapshot can evaluate: request key -> dictionary-encoded column
+SNAPSHOT_FILTERS = {
+    'company_name': 'company_name',
+    'city': 'city',
+    'activity': 'activity_description',
+}
+
+TOP_N = 20
+
+# Bumped whenever the on-disk layout written by SalarySnapshot.save() changes
+SNAPSHOT_FORMAT = 1
+
+
+def like_to_regex(pattern):
+    """Compile a case-insensitive SQL LIKE pattern (% and _ wildcards, backslash escape)"""
+    parts = []
+    chars = iter(pattern)
+    for ch in chars:
+        if ch == '\\':
+            parts.append(re.escape(next(chars, '\\')))
+        elif ch == '%':
+            parts.append('.*')
+        elif ch == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(ch))
+    return re.compile(''.join(parts), re.IGNORECASE | re.DOTALL)
+
+
+def _encode(values):
+    """Dictionary-encode a column: (int32 codes with -1 for NULL, list of values)"""
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype(np.int32), list(uniques)
+
+
+class SalarySnapshot:
+    """Immutable columnar copy of the salary facts used by the stats engine"""
+
+    def __init__(self, employee_id, salary, columns, version=None):
+        self.employee_id = employee_id
+        self.salary = salary
+        # name -> (codes, dictionary)
+        self.columns = columns
+        self.version = version
+        self.loaded_at = time.time()
+
+    @classmethod
+    def from_frame(cls, df, version=None):
+        """Build a snapshot from a frame shaped like SNAPSHOT_QUERY's result"""
+        columns = {name: _encode(df[name]) for name in SNAPSHOT_FILTERS.values()}
+        return cls(
+            df['employee_id'].to_numpy(dtype=np.int32),
+            df['salary_amount'].to_numpy(dtype=np.float64),
+            columns,
+            version,
+        )
+
+    @classmethod
+    def load(cls, conn, version=None):
+        """Read the salary facts from the database into a new snapshot"""
+        df = copy_frame(conn, SNAPSHOT_QUERY, dtypes=SNAPSHOT_DTYPES)
+        return cls.from_frame(df, version)
+
+    def save(self, path):
+        """
+        Write the snapshot as a directory of .npy columns plus manifest.json.
+
+        The directory is assembled under a temporary name and renamed into
+        place, so readers never see a partial snapshot. If another process
+        has already published the same path, its copy is kept.
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.snapshot-', dir=parent)
+        try:
+            np.save(os.path.join(staging, 'employee_id.npy'), self.employee_id)
+            np.save(os.path.join(staging, 'salary.npy'), self.salary)
+            for name, (codes, _) in self.columns.items():
+                np.save(os.path.join(staging, f'{name}.codes.npy'), codes)
+            manifest = {
+                'format': SNAPSHOT_FORMAT,
+                'version': self.version,
+                'rows': len(self),
+                'created_at': self.loaded_at,
+                'dictionaries': {name: dictionary for name, (_, dictionary) in self.columns.items()},
+            }
+            with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.rename(staging, path)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.exists(os.path.join(path, 'manifest.json')):
+                raise
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open a saved snapshot with its columns memory-mapped read-only.
+
+        Every process opening the same files shares one copy in the page cache.
+        """
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['format'] != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format {manifest['format']} in {path}")
+
+        def column(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+
+        columns = {
+            name: (column(f'{name}.codes'), dictionary)
+            for name, dictionary in manifest['dictionaries'].items()
+        }
+        snapshot = cls(column('employee_id'), column('salary'), columns, manifest['version'])
+        snapshot.loaded_at = manifest['created_at']
+        return snapshot
+
+    def to_frame(self, min_salary=None):
+        """
+        The report's salary frame (salary_amount, city, activity_description,
+        company_name, employee_id), with the strings as categoricals.
+        """
+        keep = slice(None) if min_salary is None else self.salary >= min_salary
+        frame = {'salary_amount': np.asarray(self.salary[keep])}
+        for name in ('city', 'activity_description', 'company_name'):
+            codes, dictionary = self.columns[name]
+            # The dictionary codes become categoricals as they are (-1 is NULL)
+            frame[name] = pd.Categorical.from_codes(np.asarray(codes[keep]), categories=dictionary)
+        frame['employee_id'] = np.asarray(self.employee_id[keep])
+        return pd.DataFrame(frame)
+
+    def __len__(self):
+        return len(self.salary)
+
+    @property
+    def nbytes(self):
+        """Memory held by the NumPy columns"""
+        return (self.employee_id.nbytes + self.salary.nbytes
+                + sum(codes.nbytes for codes, _ in self.columns.values()))
+
+    @staticmethod
+    def supports(filters):
+        """Whether every active filter can be evaluated on the snapshot"""
+        return all(
+            key in SNAPSHOT_FILTERS or not filters.get(key)
+            for key, _, _ in TEXT_FILTERS
+        )
+
+    def mask(self, filters):
+        """Boolean row mask for the filters (same semantics as plan_query's WHERE clause)"""
+        mask = (self.salary >= float(filters['min_salary'])) & (self.salary <= float(filters['max_salary']))
+        for key, column in SNAPSHOT_FILTERS.items():
+            value = filters.get(key)
+            if not value:
+                continue
+            codes, dictionary = self.columns[column]
+            if key in EXACT_FILTERS:
+                matches = [v.lower() == value.lower() for v in dictionary]
+            else:
+                regex = like_to_regex(f"%{value}%")
+                matches = [bool(regex.fullmatch(v)) for v in dictionary]
+            # One match per distinct value; NULL (-1) maps to the appended False
+            matches = np.array(matches + [False])
+            mask &= matches[codes]
+        return mask
+
+    def stats(self, filters, include=()):
+        """The /api/stats payload computed from the snapshot (`include` as in fetch_stats)"""
+        mask = self.mask(filters)
+        salary = self.salary[mask]
+        employee = self.employee_id[mask]
+        city, cities = self.columns['city']
+        activity, activities = self.columns['activity_description']
+        company, companies = self.columns['company_name']
+        city, activity, company = city[mask], activity[mask], company[mask]
+
+        stats = {
+            'city_stats': self._city_stats(salary, employee, city, cities),
+            'activity_stats': self._activity_stats(salary, employee, activity, activities),
+            'salary_distribution': self._salary_distribution(salary),
+            'top_companies': self._top_companies(salary, employee, company, city, activity,
+                                                 companies, cities, activities),
+        }
+        if 'city_inequality' in include:
+            stats['city_inequality'] = self._city_inequality(salary, employee, city, cities)
+        return stats
+
+    @staticmethod
+    def _city_stats(salary, employee, city, cities):
+        keep = city >= 0
+        groups, g = _group_aggregates(city[keep], salary[keep], employee[keep])
+        order = _top(g['avg_salary'])
+        return [
+            {
+                'city': cities[groups[i]],
+                'employee_count': int(g['employee_count'][i]),
+                'avg_salary': float(g['avg_salary'][i]),
+                'median_salary': float(g['median_salary'][i]),
+                'max_salary': float(g['max_salary'][i]),
+            }
+            for i in order
+        ]
+
+    @staticmethod
+    def _activity_stats(salary, employee, activity, activities):
+        keep = activity >= 0
+        groups, g = _group_aggregates(activity[keep], salary[keep], employee[keep])
+        order = _top(g['avg_salary'])
+        return [
+            {
+                'activity_description': activities[groups[i]],
+                'employee_count': int(g['employee_count'][i]),
+                'avg_salary': float(g['avg_salary'][i]),
+                'median_salary': float(g['median_salary'][i]),
+            }
+            for i in order
+        ]
+
+    @staticmethod
+    def _city_inequality(salary, employee, city, cities):
+        keep = city >= 0
+        measures = grouped_inequality(city[keep], salary[keep], epsilon=INEQUALITY_EPSILON)
+        _, g = _group_aggregates(city[keep], salary[keep], employee[keep], median=False)
+        eligible = np.flatnonzero(measures['count'] >= INEQUALITY_MIN_GROUP_SIZE)
+        order = eligible[_top(measures['gini'][eligible])]
+        return [
+            {
+                'city': cities[measures['groups'][i]],
+                'employee_count': int(g['employee_count'][i]),
+                'gini': float(measures['gini'][i]),
+                'hoover': float(measures['hoover'][i]),
+                'atkinson': float(measures['atkinson'][i]),
+                'theil': float(measures['theil'][i]),
+            }
+            for i in order
+        ]
+
+    @staticmethod
+    def _salary_distribution(salary):
+        # width_bucket: number of bounds <= salary
+        buckets = np.searchsorted(np.asarray(SALARY_BUCKET_BOUNDS, dtype=np.float64), salary, side='right')
+        counts = np.bincount(buckets, minlength=len(SALARY_BUCKET_LABELS))
+        return [
+            {'salary_range': SALARY_BUCKET_LABELS[b], 'count': int(counts[b])}
+            for b in np.flatnonzero(counts)
+        ]
+
+    @staticmethod
+    def _top_companies(salary, employee, company, city, activity, companies, cities, activities):
+        # One int64 key per (company name, city, activity); NULL codes shift to 0
+        key = ((company.astype(np.int64) + 1) * (len(cities) + 1) + city + 1) * (len(activities) + 1) + activity + 1
+        groups, g = _group_aggregates(key, salary, employee, median=False)
+        eligible = np.flatnonzero(g['employee_count'] >= 3)
+        order = eligible[_top(g['avg_salary'][eligible])]
+
+        def label(code, dictionary):
+            return dictionary[code] if code >= 0 else None
+
+        rows = []
+        for i in order:
+            rest, activity_code = divmod(int(groups[i]), len(activities) + 1)
+            company_code, city_code = divmod(rest, len(cities) + 1)
+            rows.append({
+                'company_name': label(company_code - 1, companies),
+                'city': label(city_code - 1, cities),
+                'activity_description': label(activity_code - 1, activities),
+                'employee_count': int(g['employee_count'][i]),
+                'avg_salary': float(g['avg_salary'][i]),
+                'max_salary': float(g['max_salary'][i]),
+            })
+        return rows
+
+
+def _top(values, n=TOP_N):
+    """Indices of the n largest values, largest first"""
+    return np.argsort(-values, kind='stable')[:n]
+
+
+def _group_aggregates(keys, salary, employee, median=True):
+    """
+    Per-group aggregates over rows labelled by `keys`.
+
+    Returns (group_keys, {employee_count, avg_salary, median_salary,
+    max_salary}) with one entry per distinct key. The median interpolates
+    like PERCENTILE_CONT(0.5) and employee_count counts distinct employees.
+    """
+    groups, inverse = np.unique(keys, return_inverse=True)
+    n = len(groups)
+    if n == 0:
+        empty = np.zeros(0)
+        return groups, {'employee_count': empty, 'avg_salary': empty,
+                        'median_salary': empty, 'max_salary': empty}
+
+    counts = np.bincount(inverse, minlength=n)
+    result = {}
+    result['avg_salary'] = np.bincount(inverse, weights=salary, minlength=n) / counts
+
+    # Rows sorted by group, then salary: each group is a contiguous sorted run
+    by_salary = salary[np.lexsort((salary, inverse))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result['max_salary'] = by_salary[starts + counts - 1]
+    if median:
+        result['median_salary'] = (by_salary[starts + (counts - 1) // 2] + by_salary[starts + counts // 2]) / 2
+
+    # Distinct (group, employee) pairs, counted per group
+    order = np.lexsort((employee, inverse))
+    g, e = inverse[order], employee[order]
+    first = np.ones(len(g), dtype=bool)
+    first[1:] = (g[1:] != g[:-1]) | (e[1:] != e[:-1])
+    result['employee_count'] = np.bincount(g[first], minlength=n)
+    return groups, result
+
+
+def compare_stats(expected, actual, rel_tol=1e-6):
+    """
+    Differences between two /api/stats payloads, as human-readable strings.
+
+    Rows are matched by their group label (ties in avg_salary may be ordered
+    differently by the two engines) and numbers are compared with `rel_tol`.
+    """
+    problems = []
+    for section, rows in expected.items():
+        label_keys = [k for k in ('salary_range', 'company_name', 'city', 'activity_description')
+                      if rows and k in rows[0]]
+        # For the per-city/per-activity sections only the first label identifies the group
+        if section in ('city_stats', 'activity_stats'):
+            label_keys = label_keys[:1]
+
+        def index(payload):
+            return {tuple(row[k] for k in label_keys): row for row in payload}
+
+        want, got = index(rows), index(actual.get(section, []))
+        if want.keys() != got.keys():
+            problems.append(f"{section}: groups differ ({sorted(map(str, want.keys() ^ got.keys()))[:5]})")
+            continue
+        for label, row in want.items():
+            for field, value in row.items():
+                other = got[label][field]
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    if not np.isclose(value, other, rtol=rel_tol, atol=1e-9):
+                        problems.append(f"{section} {label} {field}: {value} != {other}")
+                elif value != other:
+                    problems.append(f"{section} {label} {field}: {value!r} != {other!r}")
+    return problems
+
+
+def check_consistency(snapshot, conn, filter_sets, rel_tol=1e-6):
+    """Run each filter set through both engines; returns {filter index: problems}"""
+    report = {}
+    for i, filters in enumerate(filter_sets):
+        if not snapshot.supports(filters):
+            continue
+        problems = compare_stats(fetch_stats(conn, filters, OPTIONAL_STATS_KEYS),
+                                 snapshot.stats(filters, OPTIONAL_STATS_KEYS), rel_tol)
+        if problems:
+            report[i] = problems
+    return report
+
+
+def snapshot_path(root, version):
+    """Directory holding the snapshot of a given data version"""
+    return os.path.join(root, f"v{version}")
+
+
+def prune_snapshots(root, keep=2):
+    """Delete all but the `keep` newest snapshot versions under `root`"""
+    versions = sorted(
+        int(name[1:]) for name in os.listdir(root)
+        if name.startswith('v') and name[1:].isdigit()
+    )
+    for version in versions[:-keep]:
+        # Processes still mapping the old files keep their pages until they unmap
+        shutil.rmtree(snapshot_path(root, version), ignore_errors=True)
+
+
+def load_or_build_snapshot(root, conn, version):
+    """
+    Open the saved snapshot for `version` under `root`, building and saving it
+    from the database first if no process has written it yet.
+    """
+    path = snapshot_path(root, version)
+    if not os.path.exists(os.path.join(path, 'manifest.json')):
+        SalarySnapshot.load(conn, version).save(path)
+        prune_snapshots(root)
+    return SalarySnapshot.open(path)
+
+
+class SnapshotManager:
+    """
+    Process-wide snapshot, rebuilt when the data version changes.
+
+    With `snapshot_dir`, snapshots are saved there and memory-mapped, so
+    worker processes share them and only the first one scans the table.
+    """
+
+    def __init__(self, connection_factory, snapshot_dir=None):
+        self._connection_factory = connection_factory
+        self.snapshot_dir = snapshot_dir
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self, version):
+        """Snapshot for `version`, loading it first if the current one is older"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                with self._connection_factory() as conn:
+                    if self.snapshot_dir:
+                        self._snapshot = load_or_build_snapshot(self.snapshot_dir, conn, version)
+                    else:
+                        self._snapshot = SalarySnapshot.load(conn, version)
+            return self._snapshot
+
+    def stats(self):
+        """Snapshot size for /api/metrics"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return {'rows': len(snapshot), 'bytes': snapshot.nbytes,
+                'memory_mapped': isinstance(snapshot.salary, np.memmap),
+                'version': snapshot.version, 'loaded_at': snapshot.loaded_at}
+
+
+if __name__ == "__main__":
+    import sys
+    from src.db import pooled_connection
+    from src.cache import read_data_version
+    from src.query_builder import parse_filters
+
+    # Optional argument: directory to write (or reuse) the on-disk snapshot in
+    snapshot_dir = sys.argv[1] if len(sys.argv) > 1 else None
+
+    with pooled_connection() as conn:
+        start = time.perf_counter()
+        if snapshot_dir:
+            snapshot = load_or_build_snapshot(snapshot_dir, conn, read_data_version(conn))
+        else:
+            snapshot = SalarySnapshot.load(conn)
+        print(f"Loaded {len(snapshot):,} rows ({snapshot.nbytes / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - start:.2f}s")
+
+        # Unfiltered, then one filter set per city
+        cities = snapshot.columns['city'][1]
+        filter_sets = [parse_filters({})] + [parse_filters({'city': c}) for c in cities[:10]]
+
+        start = time.perf_counter()
+        for filters in filter_sets:
+            snapshot.stats(filters)
+        print(f"Snapshot stats: {(time.perf_counter() - start) * 1000 / len(filter_sets):.2f} ms/request")
+
+        report = check_consistency(snapshot, conn, filter_sets)
+        if report:
+            for i, problems in report.items():
+                print(f"Mismatch for {filter_sets[i]}:")
+                for problem in problems[:10]:
+                    print(f"  {problem}")
+        else:
+            print(f"Snapshot matches SQL for {len(filter_sets)} filter sets")
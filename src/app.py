@@ -1,109 +1,171 @@
 import os
-from flask import Flask, render_template, request, jsonify
-import psycopg2
+from flask import Flask, render_template, request, jsonify, Response, make_response
+import hashlib
 from psycopg2.extras import RealDictCursor
 import pandas as pd
 import json
-from config import DB_CONFIG
+from src.db import pooled_connection, get_pool, pool_stats, PoolTimeout
+from src.stats import fetch_stats, fetch_inequality, parse_include, INEQUALITY_GROUPS
+from src.query_builder import parse_filters, search_query, encode_cursor, decode_cursor
+from src.export import stream_rows, gzip_stream, EXPORT_FORMATS
+from src.suggest import SUGGEST_SOURCES, normalize_term, fetch_suggestions
+from src.cache import (create_result_cache, normalize_filters, filters_key, read_data_version,
+                       ResultCache, LocalBackend)
+from src.analytics import SnapshotManager
+from config import (SEARCH_MAX_PAGE_SIZE, SEARCH_FUZZY_THRESHOLD, SUGGEST_MAX_LIMIT, SUGGEST_CACHE_ENTRIES,
+                    EXPORT_BATCH_SIZE, CACHE_CONFIG, STATS_ENGINE, SNAPSHOT_DIR)
 
 app = Flask(__name__)
 
-def connect_to_db():
-    """Establish a connection to the PostgreSQL database"""
-    conn = psycopg2.connect(**DB_CONFIG)
-    return conn
+def current_data_version():
+    """Read the data-version counter that loads bump"""
+    with pooled_connection() as conn:
+        return read_data_version(conn)
+
+# Cached /api/search and /api/stats payloads, invalidated when the data version changes
+result_cache = create_result_cache(CACHE_CONFIG, version_source=current_data_version)
+
+# Rendered index page, kept in-process and tied to the same data version
+page_cache = ResultCache(LocalBackend(max_entries=4), ttl=CACHE_CONFIG['ttl'],
+                         version_source=result_cache.data_version, version_check_interval=0)
+
+# Typeahead suggestions per (field, typed text, limit), kept in-process: they
+# are requested on nearly every keystroke and are tiny
+suggest_cache = ResultCache(LocalBackend(max_entries=SUGGEST_CACHE_ENTRIES), ttl=CACHE_CONFIG['ttl'],
+                            version_source=result_cache.data_version, version_check_interval=0)
+
+# Columnar copy of the salary facts, used when STATS_ENGINE=snapshot
+# (memory-mapped from SNAPSHOT_DIR when set, so workers share one copy)
+snapshots = SnapshotManager(pooled_connection, SNAPSHOT_DIR)
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(error):
+    """Tell the client to retry when every pooled connection is busy"""
+    return jsonify({"error": str(error)}), 503
 
 @app.route('/')
 def index():
-    """Render the main search page"""
-    # Get city options for dropdown only
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    
-    # Get all cities
-    cursor.execute("SELECT DISTINCT city FROM companies WHERE city IS NOT NULL ORDER BY city")
-    cities = [row[0] for row in cursor.fetchall()]
-    
-    cursor.close()
-    conn.close()
-    
-    return render_template('index.html', cities=cities)
+    """Render the main search page (304 when the client's copy is still current)"""
+    page = page_cache.get_or_compute('index', [], render_index)
+    response = make_response(page['html'])
+    response.set_etag(page['etag'])
+    return response.make_conditional(request)
+
+def render_index():
+    """Render the page with the city dropdowns (activities come from /api/suggest)"""
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+
+        # Get all cities
+        cursor.execute("SELECT DISTINCT city FROM companies WHERE city IS NOT NULL ORDER BY city")
+        cities = [row[0] for row in cursor.fetchall()]
+
+        cursor.close()
+
+    html = render_template('index.html', cities=cities)
+    return {'html': html, 'etag': hashlib.sha1(html.encode('utf-8')).hexdigest()}
 
 @app.route('/api/search', methods=['POST'])
 def search():
-    """API endpoint to search the database based on criteria"""
+    """API endpoint to search the database based on criteria (keyset-paginated)"""
     data = request.json
     
     # Extract search parameters
-    company_name = data.get('company_name', '')
-    employee_name = data.get('employee_name', '')
-    city = data.get('city', '')
-    activity = data.get('activity', '')
-    min_salary = data.get('min_salary', 0)
-    max_salary = data.get('max_salary', 1000000000)
-    limit = int(data.get('limit', 100))  # Use actual limit, no cap
+    filters = normalize_filters(parse_filters(data))
+    try:
+        limit = min(max(int(data.get('limit', 100)), 1), SEARCH_MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid limit"}), 400
     
-    # Build query conditions
-    conditions = []
-    params = []
+    mode = data.get('mode', 'substring')
+    if mode not in ('substring', 'fuzzy'):
+        return jsonify({"error": f"Unsupported search mode: {mode}"}), 400
+    fuzzy = mode == 'fuzzy'
     
-    if company_name:
-        conditions.append("LOWER(c.company_name) LIKE LOWER(%s)")
-        params.append(f"%{company_name}%")
+    # Resume after the last row of the previous page
+    keyset = None
+    if data.get('cursor'):
+        try:
+            keyset = decode_cursor(data['cursor'], fuzzy)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
     
-    if employee_name:
-        conditions.append("LOWER(e.full_name) LIKE LOWER(%s)")
-        params.append(f"%{employee_name}%")
+    fields = data.get('fields')
+    cache_parts = [filters_key(filters), sorted(fields or []), data.get('cursor'), limit, mode]
+    payload = result_cache.get_or_compute(
+        'search', cache_parts, lambda: run_search(filters, fields, keyset, limit, fuzzy)
+    )
+    return jsonify(payload)
+
+def set_fuzzy_threshold(cursor):
+    """Threshold of the <% operator, for the cursor's current transaction only"""
+    cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                   [str(SEARCH_FUZZY_THRESHOLD)])
+
+def run_search(filters, fields, keyset, limit, fuzzy=False):
+    """Run one search page query and build the /api/search payload"""
+    # One extra row tells us whether another page exists
+    query, params = search_query(filters, fields, keyset, limit + 1, fuzzy)
     
-    if city:
-        conditions.append("LOWER(c.city) LIKE LOWER(%s)")
-        params.append(f"%{city}%")
+    # Execute query
+    with pooled_connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        if fuzzy:
+            set_fuzzy_threshold(cursor)
+        cursor.execute(query, params)
+        results = cursor.fetchall()
+        cursor.close()
     
-    if activity:
-        conditions.append("LOWER(c.activity_description) LIKE LOWER(%s)")
-        params.append(f"%{activity}%")
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = encode_cursor(results[-1])
     
-    conditions.append("s.salary_amount BETWEEN %s AND %s")
-    params.extend([min_salary, max_salary])
+    # Format salary values for display
+    for result in results:
+        if result.get('salary_amount') is not None:
+            result['salary_amount'] = float(result['salary_amount'])
     
-    # Combine conditions
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    return {"results": results, "next_cursor": next_cursor, "limit": limit}
+
+@app.route('/api/export', methods=['POST'])
+def export():
+    """Stream every row matching the search filters (and mode) as NDJSON or CSV"""
+    data = request.json
     
-    # Create query
-    query = f"""
-        SELECT 
-            e.employee_id,
-            e.full_name,
-            c.company_id,
-            c.company_name,
-            c.activity_description,
-            c.city,
-            s.salary_amount,
-            d.filename
-        FROM salary_records s
-        JOIN employees e ON s.employee_id = e.employee_id
-        JOIN companies c ON s.company_id = c.company_id
-        JOIN documents d ON s.document_id = d.document_id
-        WHERE {where_clause}
-        ORDER BY s.salary_amount DESC
-        LIMIT %s
-    """
-    params.append(limit)
+    fmt = data.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+    compress = data.get('gzip', 'gzip' in request.accept_encodings)
     
-    # Execute query
-    conn = connect_to_db()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(query, params)
-    results = cursor.fetchall()
+    mode = data.get('mode', 'substring')
+    if mode not in ('substring', 'fuzzy'):
+        return jsonify({"error": f"Unsupported search mode: {mode}"}), 400
+    fuzzy = mode == 'fuzzy'
     
-    # Format salary values for display
-    for result in results:
-        result['salary_amount'] = float(result['salary_amount'])
+    # The search statement without its LIMIT, so the export has the same rows and order
+    filters = normalize_filters(parse_filters(data))
+    query, params = search_query(filters, data.get('fields'), limit=None, fuzzy=fuzzy)
     
-    cursor.close()
-    conn.close()
+    # The connection stays checked out while the response streams and is
+    # returned to the pool when the response is closed
+    pool = get_pool()
+    conn = pool.getconn()
+    if fuzzy:
+        cursor = conn.cursor()
+        set_fuzzy_threshold(cursor)
+        cursor.close()
+    chunks = stream_rows(conn, query, params, fmt, EXPORT_BATCH_SIZE)
+    if compress:
+        chunks = gzip_stream(chunks)
     
-    return jsonify({"results": results})
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    response = Response(chunks, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=cnss_export.{extension}'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.call_on_close(lambda: pool.putconn(conn))
+    return response
 
 @app.route('/api/stats', methods=['POST'])
 def get_stats():
@@ -111,172 +173,73 @@ def get_stats():
     data = request.json
     
     # Extract filter parameters (same as search)
-    company_name = data.get('company_name', '')
-    employee_name = data.get('employee_name', '')
-    city = data.get('city', '')
-    activity = data.get('activity', '')
-    min_salary = data.get('min_salary', 0)
-    max_salary = data.get('max_salary', 1000000000)
-    
-    # Build query conditions
-    conditions = []
-    params = []
-    
-    if company_name:
-        conditions.append("LOWER(c.company_name) LIKE LOWER(%s)")
-        params.append(f"%{company_name}%")
-    
-    if employee_name:
-        conditions.append("LOWER(e.full_name) LIKE LOWER(%s)")
-        params.append(f"%{employee_name}%")
-    
-    if city:
-        conditions.append("LOWER(c.city) LIKE LOWER(%s)")
-        params.append(f"%{city}%")
-    
-    if activity:
-        conditions.append("LOWER(c.activity_description) LIKE LOWER(%s)")
-        params.append(f"%{activity}%")
+    filters = normalize_filters(parse_filters(data))
+    # Optional sections such as city_inequality, only computed when asked for
+    include = parse_include(data)
     
-    conditions.append("s.salary_amount BETWEEN %s AND %s")
-    params.extend([min_salary, max_salary])
-    
-    # Combine conditions
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
-    
-    conn = connect_to_db()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
-    # Get salary distribution by city
-    city_query = f"""
-        SELECT 
-            c.city, 
-            COUNT(DISTINCT s.employee_id) as employee_count,
-            AVG(s.salary_amount) as avg_salary,
-            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY s.salary_amount) as median_salary,
-            MAX(s.salary_amount) as max_salary
-        FROM salary_records s
-        JOIN employees e ON s.employee_id = e.employee_id
-        JOIN companies c ON s.company_id = c.company_id
-        JOIN documents d ON s.document_id = d.document_id
-        WHERE {where_clause} AND c.city IS NOT NULL
-        GROUP BY c.city
-        ORDER BY avg_salary DESC
-        LIMIT 20
-    """
-    cursor.execute(city_query, params)
-    city_stats = cursor.fetchall()
-    
-    # Get salary distribution by activity
-    activity_query = f"""
-        SELECT 
-            c.activity_description, 
-            COUNT(DISTINCT s.employee_id) as employee_count,
-            AVG(s.salary_amount) as avg_salary,
-            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY s.salary_amount) as median_salary
-        FROM salary_records s
-        JOIN employees e ON s.employee_id = e.employee_id
-        JOIN companies c ON s.company_id = c.company_id
-        JOIN documents d ON s.document_id = d.document_id
-        WHERE {where_clause} AND c.activity_description IS NOT NULL
-        GROUP BY c.activity_description
-        ORDER BY avg_salary DESC
-        LIMIT 20
-    """
-    cursor.execute(activity_query, params)
-    activity_stats = cursor.fetchall()
-    
-    # Get salary distribution
-    salary_buckets_query = f"""
-        WITH salary_ranges AS (
-            SELECT 
-                CASE
-                    WHEN s.salary_amount < 5000 THEN '< 5K'
-                    WHEN s.salary_amount < 10000 THEN '5K-10K'
-                    WHEN s.salary_amount < 15000 THEN '10K-15K'
-                    WHEN s.salary_amount < 20000 THEN '15K-20K'
-                    WHEN s.salary_amount < 30000 THEN '20K-30K'
-                    WHEN s.salary_amount < 50000 THEN '30K-50K'
-                    WHEN s.salary_amount < 100000 THEN '50K-100K'
-                    WHEN s.salary_amount < 200000 THEN '100K-200K'
-                    WHEN s.salary_amount < 500000 THEN '200K-500K'
-                    WHEN s.salary_amount < 1000000 THEN '500K-1M'
-                    ELSE '1M+'
-                END AS salary_range,
-                COUNT(*) as count
-            FROM salary_records s
-            JOIN employees e ON s.employee_id = e.employee_id
-            JOIN companies c ON s.company_id = c.company_id
-            JOIN documents d ON s.document_id = d.document_id
-            WHERE {where_clause}
-            GROUP BY salary_range
-        )
-        SELECT * FROM salary_ranges
-        ORDER BY 
-            CASE salary_range
-                WHEN '< 5K' THEN 1
-                WHEN '5K-10K' THEN 2
-                WHEN '10K-15K' THEN 3
-                WHEN '15K-20K' THEN 4
-                WHEN '20K-30K' THEN 5
-                WHEN '30K-50K' THEN 6
-                WHEN '50K-100K' THEN 7
-                WHEN '100K-200K' THEN 8
-                WHEN '200K-500K' THEN 9
-                WHEN '500K-1M' THEN 10
-                WHEN '1M+' THEN 11
-            END
-    """
-    cursor.execute(salary_buckets_query, params)
-    salary_distribution = cursor.fetchall()
+    def compute():
+        # Filters the snapshot cannot evaluate (employee names) fall back to SQL
+        if STATS_ENGINE == 'snapshot':
+            snapshot = snapshots.get(result_cache.data_version())
+            if snapshot.supports(filters):
+                return snapshot.stats(filters, include)
+        
+        # Compute every aggregate from a single scan of the filtered rows
+        with pooled_connection() as conn:
+            return fetch_stats(conn, filters, include)
     
-    # Get top companies by avg salary
-    top_companies_query = f"""
-        SELECT 
-            c.company_name,
-            c.city,
-            c.activity_description,
-            COUNT(DISTINCT s.employee_id) as employee_count,
-            AVG(s.salary_amount) as avg_salary,
-            MAX(s.salary_amount) as max_salary
-        FROM salary_records s
-        JOIN employees e ON s.employee_id = e.employee_id
-        JOIN companies c ON s.company_id = c.company_id
-        JOIN documents d ON s.document_id = d.document_id
-        WHERE {where_clause}
-        GROUP BY c.company_name, c.city, c.activity_description
-        HAVING COUNT(DISTINCT s.employee_id) >= 3
-        ORDER BY avg_salary DESC
-        LIMIT 20
-    """
-    cursor.execute(top_companies_query, params)
-    top_companies = cursor.fetchall()
+    stats = result_cache.get_or_compute('stats', [filters_key(filters), include], compute)
+    return jsonify(stats)
+
+@app.route('/api/inequality', methods=['POST'])
+def get_inequality():
+    """Inequality measures and Lorenz curve for the filtered rows, optionally per city or activity"""
+    data = request.json
     
-    cursor.close()
-    conn.close()
+    filters = normalize_filters(parse_filters(data))
+    group_by = data.get('group_by') or None
+    if group_by is not None and group_by not in INEQUALITY_GROUPS:
+        return jsonify({"error": f"Unsupported group_by: {group_by}"}), 400
+    try:
+        epsilon = float(data.get('epsilon', 0.5))
+        min_group_size = max(int(data.get('min_group_size', 10)), 1)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid epsilon or min_group_size"}), 400
+    if epsilon <= 0:
+        return jsonify({"error": "epsilon must be positive"}), 400
     
-    # Format decimal values for JSON
-    for stat in city_stats:
-        for key in ['avg_salary', 'median_salary', 'max_salary']:
-            if key in stat and stat[key] is not None:
-                stat[key] = float(stat[key])
+    def compute():
+        # Only the aggregated measures leave the database
+        with pooled_connection() as conn:
+            return fetch_inequality(conn, filters, group_by, epsilon, min_group_size)
     
-    for stat in activity_stats:
-        for key in ['avg_salary', 'median_salary']:
-            if key in stat and stat[key] is not None:
-                stat[key] = float(stat[key])
+    cache_parts = [filters_key(filters), group_by, epsilon, min_group_size]
+    return jsonify(result_cache.get_or_compute('inequality', cache_parts, compute))
+
+@app.route('/api/suggest')
+def suggest():
+    """Typeahead: distinct company, employee or activity names matching the typed text"""
+    field = request.args.get('field', '')
+    if field not in SUGGEST_SOURCES:
+        return jsonify({"error": f"Unsupported field: {field}"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    term = normalize_term(request.args.get('q'))
     
-    for company in top_companies:
-        for key in ['avg_salary', 'max_salary']:
-            if key in company and company[key] is not None:
-                company[key] = float(company[key])
+    def compute():
+        with pooled_connection() as conn:
+            return fetch_suggestions(conn, field, term, limit, SEARCH_FUZZY_THRESHOLD)
     
-    return jsonify({
-        "city_stats": city_stats,
-        "activity_stats": activity_stats,
-        "salary_distribution": salary_distribution,
-        "top_companies": top_companies
-    })
+    suggestions = suggest_cache.get_or_compute('suggest', [field, term, limit], compute)
+    return jsonify({"field": field, "q": term, "suggestions": suggestions})
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Expose runtime metrics (connection pool usage, checkout latency, cache hit rate)"""
+    return jsonify({"pool": pool_stats(), "cache": result_cache.stats(), "snapshot": snapshots.stats(),
+                    "suggest_cache": suggest_cache.stats()})
 
 if __name__ == "__main__":
     # Create templates directory if it doesn't exist
@@ -522,11 +485,13 @@ if __name__ == "__main__":
                         <div class="form-row">
                             <div class="form-group">
                                 <label for="company-name">Company Name</label>
-                                <input type="text" id="company-name" placeholder="Enter company name...">
+                                <input type="text" id="company-name" list="company-suggestions" autocomplete="off" placeholder="Enter company name...">
+                                <datalist id="company-suggestions"></datalist>
                             </div>
                             <div class="form-group">
                                 <label for="employee-name">Employee Name</label>
-                                <input type="text" id="employee-name" placeholder="Enter employee name...">
+                                <input type="text" id="employee-name" list="employee-suggestions" autocomplete="off" placeholder="Enter employee name...">
+                                <datalist id="employee-suggestions"></datalist>
                             </div>
                         </div>
                         
@@ -542,7 +507,8 @@ if __name__ == "__main__":
                             </div>
                             <div class="form-group">
                                 <label for="activity">Activity (type to search)</label>
-                                <input type="text" id="activity" placeholder="Enter activity keywords...">
+                                <input type="text" id="activity" list="activity-suggestions" autocomplete="off" placeholder="Enter activity keywords...">
+                                <datalist id="activity-suggestions"></datalist>
                             </div>
                         </div>
                         
@@ -559,14 +525,13 @@ if __name__ == "__main__":
                         
                         <div class="form-row">
                             <div class="form-group">
-                                <label>Result Limit</label>
+                                <label>Results per Page</label>
                                 <div class="limit-options">
                                     <button class="limit-btn active" data-limit="100">100</button>
+                                    <button class="limit-btn" data-limit="250">250</button>
                                     <button class="limit-btn" data-limit="500">500</button>
                                     <button class="limit-btn" data-limit="1000">1K</button>
-                                    <button class="limit-btn" data-limit="5000">5K</button>
-                                    <button class="limit-btn" data-limit="10000">10K</button>
-                                    <input type="number" id="limit" placeholder="Custom limit..." value="100" style="width: 120px;">
+                                    <input type="number" id="limit" placeholder="Custom limit..." value="100" max="1000" style="width: 120px;">
                                 </div>
                             </div>
                         </div>
@@ -574,6 +539,7 @@ if __name__ == "__main__":
                         <div class="form-row">
                             <button id="search-button">Search</button>
                             <button id="reset-button">Reset</button>
+                            <button id="export-button">Export CSV</button>
                         </div>
                     </div>
                     
@@ -591,11 +557,11 @@ if __name__ == "__main__":
                         <div class="form-row">
                             <div class="form-group">
                                 <label for="viz-company-name">Company Name</label>
-                                <input type="text" id="viz-company-name" placeholder="Enter company name...">
+                                <input type="text" id="viz-company-name" list="company-suggestions" autocomplete="off" placeholder="Enter company name...">
                             </div>
                             <div class="form-group">
                                 <label for="viz-employee-name">Employee Name</label>
-                                <input type="text" id="viz-employee-name" placeholder="Enter employee name...">
+                                <input type="text" id="viz-employee-name" list="employee-suggestions" autocomplete="off" placeholder="Enter employee name...">
                             </div>
                         </div>
                         
@@ -611,7 +577,7 @@ if __name__ == "__main__":
                             </div>
                             <div class="form-group">
                                 <label for="viz-activity">Activity (type to search)</label>
-                                <input type="text" id="viz-activity" placeholder="Enter activity keywords...">
+                                <input type="text" id="viz-activity" list="activity-suggestions" autocomplete="off" placeholder="Enter activity keywords...">
                             </div>
                         </div>
                         
@@ -708,73 +674,197 @@ if __name__ == "__main__":
                     });
                 });
                 
+                // Search state (rows loaded so far and the cursor for the next page)
+                let searchState = {
+                    params: null,
+                    results: [],
+                    nextCursor: null
+                };
+                
+                function fetchSearchPage(cursor) {
+                    return fetch('/api/search', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json',
+                        },
+                        body: JSON.stringify(Object.assign({}, searchState.params, { cursor: cursor })),
+                    })
+                    .then(response => response.json())
+                    .then(data => {
+                        if (data.error) {
+                            throw new Error(data.error);
+                        }
+                        return data;
+                    });
+                }
+                
+                function renderResults() {
+                    const results = searchState.results;
+                    
+                    if (results.length === 0) {
+                        document.getElementById('results-table').innerHTML = '<p>No results found.</p>';
+                        return;
+                    }
+                    
+                    // Create table
+                    let table = '<table>';
+                    table += '<thead><tr>';
+                    table += '<th>Employee</th>';
+                    table += '<th>Company</th>';
+                    table += '<th>City</th>';
+                    table += '<th>Activity</th>';
+                    table += '<th>Salary (MAD)</th>';
+                    table += '</tr></thead>';
+                    
+                    table += '<tbody>';
+                    results.forEach(row => {
+                        table += '<tr>';
+                        table += `<td>${row.full_name}</td>`;
+                        table += `<td>${row.company_name}</td>`;
+                        table += `<td>${row.city || ''}</td>`;
+                        table += `<td>${(row.activity_description || '').substring(0, 50)}${row.activity_description && row.activity_description.length > 50 ? '...' : ''}</td>`;
+                        table += `<td>${formatCurrency(row.salary_amount)}</td>`;
+                        table += '</tr>';
+                    });
+                    table += '</tbody></table>';
+                    
+                    table += `<p><strong>Showing ${results.length} results</strong></p>`;
+                    if (searchState.nextCursor) {
+                        table += '<button id="load-more-button" class="limit-btn">Load more</button>';
+                    }
+                    
+                    document.getElementById('results-table').innerHTML = table;
+                    
+                    if (searchState.nextCursor) {
+                        document.getElementById('load-more-button').addEventListener('click', loadMoreResults);
+                    }
+                }
+                
+                function loadMoreResults() {
+                    const button = document.getElementById('load-more-button');
+                    button.disabled = true;
+                    button.textContent = 'Loading...';
+                    
+                    fetchSearchPage(searchState.nextCursor)
+                    .then(data => {
+                        searchState.results = searchState.results.concat(data.results);
+                        searchState.nextCursor = data.next_cursor;
+                        renderResults();
+                    })
+                    .catch(error => {
+                        console.error('Error:', error);
+                        button.disabled = false;
+                        button.textContent = 'Load more';
+                    });
+                }
+                
+                // Typeahead: once typing pauses, ask /api/suggest for matching names
+                function attachSuggestions(inputId, field, listId) {
+                    const input = document.getElementById(inputId);
+                    let timer = null;
+                    let latest = 0;
+                    input.addEventListener('input', function() {
+                        clearTimeout(timer);
+                        const q = input.value.trim();
+                        if (q.length < 3) {
+                            return;
+                        }
+                        timer = setTimeout(function() {
+                            const requestId = ++latest;
+                            fetch('/api/suggest?' + new URLSearchParams({ field: field, q: q, limit: 10 }))
+                            .then(response => response.json())
+                            .then(data => {
+                                // Drop answers overtaken by later keystrokes
+                                if (requestId !== latest || !data.suggestions) {
+                                    return;
+                                }
+                                const list = document.getElementById(listId);
+                                list.innerHTML = '';
+                                data.suggestions.forEach(name => {
+                                    const option = document.createElement('option');
+                                    option.value = name;
+                                    list.appendChild(option);
+                                });
+                            })
+                            .catch(error => console.error('Error:', error));
+                        }, 200);
+                    });
+                }
+                
+                attachSuggestions('company-name', 'company_name', 'company-suggestions');
+                attachSuggestions('employee-name', 'employee_name', 'employee-suggestions');
+                attachSuggestions('activity', 'activity', 'activity-suggestions');
+                attachSuggestions('viz-company-name', 'company_name', 'company-suggestions');
+                attachSuggestions('viz-employee-name', 'employee_name', 'employee-suggestions');
+                attachSuggestions('viz-activity', 'activity', 'activity-suggestions');
+                
+                // Read the search filters from the form
+                function readSearchForm() {
+                    return {
+                        company_name: document.getElementById('company-name').value,
+                        employee_name: document.getElementById('employee-name').value,
+                        city: document.getElementById('city').value,
+                        activity: document.getElementById('activity').value,
+                        min_salary: document.getElementById('min-salary').value,
+                        max_salary: document.getElementById('max-salary').value
+                    };
+                }
+                
                 // Handle search functionality
                 document.getElementById('search-button').addEventListener('click', function() {
-                    const company = document.getElementById('company-name').value;
-                    const employee = document.getElementById('employee-name').value;
-                    const city = document.getElementById('city').value;
-                    const activity = document.getElementById('activity').value;
-                    const minSalary = document.getElementById('min-salary').value;
-                    const maxSalary = document.getElementById('max-salary').value;
-                    const limit = document.getElementById('limit').value;
+                    searchState.params = Object.assign(readSearchForm(), {
+                        limit: document.getElementById('limit').value,
+                        fields: ['full_name', 'company_name', 'city', 'activity_description', 'salary_amount']
+                    });
                     
                     // Show loading state
                     document.getElementById('results-table').innerHTML = '<div class="loading"></div>';
                     
-                    // Make API call
-                    fetch('/api/search', {
+                    // Make API call for the first page
+                    fetchSearchPage(null)
+                    .then(data => {
+                        searchState.results = data.results;
+                        searchState.nextCursor = data.next_cursor;
+                        renderResults();
+                    })
+                    .catch(error => {
+                        console.error('Error:', error);
+                        document.getElementById('results-table').innerHTML = '<p>Error fetching results.</p>';
+                    });
+                });
+                
+                // Export every matching row as CSV (streamed by the server)
+                document.getElementById('export-button').addEventListener('click', function() {
+                    const button = this;
+                    button.disabled = true;
+                    
+                    fetch('/api/export', {
                         method: 'POST',
                         headers: {
                             'Content-Type': 'application/json',
                         },
-                        body: JSON.stringify({
-                            company_name: company,
-                            employee_name: employee,
-                            city: city,
-                            activity: activity,
-                            min_salary: minSalary,
-                            max_salary: maxSalary,
-                            limit: limit
-                        }),
+                        body: JSON.stringify(Object.assign(readSearchForm(), { format: 'csv' })),
                     })
-                    .then(response => response.json())
-                    .then(data => {
-                        const results = data.results;
-                        
-                        if (results.length === 0) {
-                            document.getElementById('results-table').innerHTML = '<p>No results found.</p>';
-                            return;
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error('Export failed');
                         }
-                        
-                        // Create table
-                        let table = '<table>';
-                        table += '<thead><tr>';
-                        table += '<th>Employee</th>';
-                        table += '<th>Company</th>';
-                        table += '<th>City</th>';
-                        table += '<th>Activity</th>';
-                        table += '<th>Salary (MAD)</th>';
-                        table += '</tr></thead>';
-                        
-                        table += '<tbody>';
-                        results.forEach(row => {
-                            table += '<tr>';
-                            table += `<td>${row.full_name}</td>`;
-                            table += `<td>${row.company_name}</td>`;
-                            table += `<td>${row.city || ''}</td>`;
-                            table += `<td>${(row.activity_description || '').substring(0, 50)}${row.activity_description && row.activity_description.length > 50 ? '...' : ''}</td>`;
-                            table += `<td>${formatCurrency(row.salary_amount)}</td>`;
-                            table += '</tr>';
-                        });
-                        table += '</tbody></table>';
-                        
-                        table += `<p><strong>Showing ${results.length} results</strong></p>`;
-                        
-                        document.getElementById('results-table').innerHTML = table;
+                        return response.blob();
+                    })
+                    .then(blob => {
+                        const url = URL.createObjectURL(blob);
+                        const link = document.createElement('a');
+                        link.href = url;
+                        link.download = 'cnss_export.csv';
+                        link.click();
+                        URL.revokeObjectURL(url);
                     })
                     .catch(error => {
                         console.error('Error:', error);
-                        document.getElementById('results-table').innerHTML = '<p>Error fetching results.</p>';
+                        alert('Error exporting results: ' + error);
+                    })
+                    .finally(() => {
+                        button.disabled = false;
                     });
                 });
                 
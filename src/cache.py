@@ -0,0 +1,213 @@
+"""
+Response cache for the read-only API endpoints.
+
+Entries are keyed on the normalized request (see normalize_filters) plus the
+current data version. Loading new declarations bumps the version stored in
+the database, so every entry computed from older data stops matching and
+simply ages out; nothing has to be deleted explicitly.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from src.query_builder import TEXT_FILTERS, DEFAULT_MIN_SALARY, DEFAULT_MAX_SALARY
+
+
+def _clamp_salary(value, default):
+    """Clamp a salary bound to the supported range, leaving invalid input untouched"""
+    if value is None or value == '':
+        return default
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return value
+    return min(max(value, DEFAULT_MIN_SALARY), DEFAULT_MAX_SALARY)
+
+
+def normalize_filters(filters):
+    """
+    Canonical form of the search/stats filters.
+
+    Text filters are stripped and lowercased (matching is case-insensitive
+    anyway) and the salary range is clamped to [DEFAULT_MIN_SALARY,
+    DEFAULT_MAX_SALARY]. Queries are run with the normalized filters so that
+    requests sharing a cache key always return the same rows.
+    """
+    normalized = {
+        key: str(filters.get(key) or '').strip().lower()
+        for key, _, _ in TEXT_FILTERS
+    }
+    normalized['min_salary'] = _clamp_salary(filters.get('min_salary'), DEFAULT_MIN_SALARY)
+    normalized['max_salary'] = _clamp_salary(filters.get('max_salary'), DEFAULT_MAX_SALARY)
+    return normalized
+
+
+def filters_key(filters):
+    """Hashable tuple identifying a normalized filter set"""
+    return tuple(filters[key] for key, _, _ in TEXT_FILTERS) + (filters['min_salary'], filters['max_salary'])
+
+
+class LocalBackend:
+    """In-process LRU store with per-entry expiry"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Shared store for several app processes; requires the optional redis package"""
+
+    def __init__(self, url, prefix='cnss:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl):
+        # Redis evicts by its own maxmemory policy (configure allkeys-lru)
+        self._client.set(self.prefix + key, json.dumps(value), ex=max(int(ttl), 1))
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+
+class ResultCache:
+    """
+    Read-through cache of JSON-serializable API payloads.
+
+    `version_source` is a callable returning the current data version; it is
+    consulted at most once every `version_check_interval` seconds.
+    """
+
+    def __init__(self, backend, ttl=300, version_source=None, version_check_interval=5.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.version_source = version_source
+        self.version_check_interval = version_check_interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def data_version(self):
+        """Current data version, re-read from the source once the check interval has passed"""
+        if self.version_source is None:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            fresh = (self._version_checked_at is not None
+                     and now - self._version_checked_at < self.version_check_interval)
+            if fresh:
+                return self._version
+        version = self.version_source()
+        with self._lock:
+            self._version = version
+            self._version_checked_at = now
+        return version
+
+    def make_key(self, namespace, parts):
+        """Backend key for a request: namespace, data version and a digest of the parts"""
+        digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+        return f"{namespace}:{self.data_version()}:{digest}"
+
+    def get_or_compute(self, namespace, parts, compute):
+        """Return the cached payload for `parts`, computing and storing it on a miss"""
+        key = self.make_key(namespace, parts)
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def stats(self):
+        """Hit/miss counters for /api/metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'data_version': self._version,
+            }
+        if isinstance(self.backend, LocalBackend):
+            stats['entries'] = len(self.backend)
+            stats['evictions'] = self.backend.evictions
+        return stats
+
+
+def read_data_version(conn):
+    """Current value of the data-version counter (0 when the table does not exist yet)"""
+    cursor = conn.cursor()
+    try:
+        # Checked first so a missing table does not abort the caller's transaction
+        cursor.execute("SELECT to_regclass('data_version') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            return 0
+        cursor.execute("SELECT version FROM data_version")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return row[0] if row else 0
+
+
+def bump_data_version(conn):
+    """Mark the data as changed; cached responses computed before this stop matching"""
+    cursor = conn.cursor()
+    cursor.execute("UPDATE data_version SET version = version + 1, updated_at = NOW() RETURNING version")
+    version = cursor.fetchone()[0]
+    cursor.close()
+    conn.commit()
+    return version
+
+
+def create_result_cache(config, version_source=None):
+    """Build the cache described by config.CACHE_CONFIG"""
+    if config.get('redis_url'):
+        backend = RedisBackend(config['redis_url'])
+    else:
+        backend = LocalBackend(config['max_entries'])
+    return ResultCache(backend, config['ttl'], version_source, config['version_check_interval'])
@@ -0,0 +1,165 @@
+"""Pooled PostgreSQL connections shared by the web app and the report generator"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+from config import DB_CONFIG, POOL_CONFIG
+
+
+class PoolTimeout(pg_pool.PoolError):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections.
+
+    Callers beyond `maxconn` wait (up to `timeout` seconds) instead of failing
+    immediately, and every checkout is health-checked so a connection dropped
+    by the server is replaced transparently.
+    """
+
+    def __init__(self, minconn=1, maxconn=10, timeout=30.0, health_check=True, **conn_kwargs):
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **conn_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check = health_check
+
+        # Metrics
+        self._waiters = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._checkout_total = 0.0
+        self._checkout_max = 0.0
+
+    def _is_healthy(self, conn):
+        """Check that a connection is still usable"""
+        if conn.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a healthy connection, waiting for a free slot if necessary"""
+        start = time.perf_counter()
+        with self._lock:
+            self._waiters += 1
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self._waiters -= 1
+            if not acquired:
+                self._timeouts += 1
+        if not acquired:
+            raise PoolTimeout(f"No database connection available after {self.timeout:.1f}s")
+
+        try:
+            conn = self._pool.getconn()
+            if not self._is_healthy(conn):
+                # Drop the broken connection and open a fresh one in its place
+                self._pool.putconn(conn, close=True)
+                with self._lock:
+                    self._discarded += 1
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._checkout_total += elapsed
+            self._checkout_max = max(self._checkout_max, elapsed)
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool (open transactions are rolled back)"""
+        try:
+            self._pool.putconn(conn, close=close or conn.closed)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it"""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        """Snapshot of pool metrics"""
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'in_use': self._in_use,
+                'idle': len(self._pool._pool),
+                'waiters': self._waiters,
+                'checkouts': checkouts,
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+                'avg_checkout_ms': (self._checkout_total / checkouts * 1000) if checkouts else 0.0,
+                'max_checkout_ms': self._checkout_max * 1000
+            }
+
+    def close(self):
+        """Close every connection held by the pool"""
+        self._pool.closeall()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # Connections must not be shared across fork(); start a new pool in children
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(**POOL_CONFIG, **DB_CONFIG)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+@contextmanager
+def pooled_connection():
+    """Borrow a connection from the process-wide pool"""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def pool_stats():
+    """Metrics of the process-wide pool, or None if it has not been created yet"""
+    return _pool.stats() if _pool is not None and _pool_pid == os.getpid() else None
+
+
+def close_pool():
+    """Close the process-wide pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
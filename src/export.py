@@ -0,0 +1,66 @@
+"""Streaming export of search results (NDJSON or CSV, optionally gzip-compressed)"""
+import csv
+import io
+import json
+import uuid
+import zlib
+from decimal import Decimal
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+
+def _json_default(value):
+    """Serialize the non-JSON types psycopg2 returns (salary amounts are Decimal)"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def stream_rows(conn, query, params, fmt='ndjson', batch_size=5000):
+    """
+    Yield the query result as encoded text chunks, one chunk per batch.
+
+    Rows are read through a named (server-side) cursor, so only `batch_size`
+    rows are held in Python memory at a time however many rows match.
+    """
+    cursor = conn.cursor(name=f"export_{uuid.uuid4().hex}")
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchmany(batch_size)
+        columns = [col.name for col in cursor.description]
+
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            while rows:
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                rows = cursor.fetchmany(batch_size)
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            while rows:
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+                    for row in rows
+                )
+                rows = cursor.fetchmany(batch_size)
+    finally:
+        cursor.close()
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a stream of text chunks on the fly into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
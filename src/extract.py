@@ -0,0 +1,185 @@
+"""
+Extraction of large query results into compact dataframes.
+
+copy_frame() is the fast path: the server serializes the result with
+COPY ... TO STDOUT (CSV), the bytes go to a temporary file, and pandas' C
+parser turns them straight into typed columns, so no Python object is
+created per value. read_compact_frame() goes
+through a server-side cursor instead and is kept as the baseline for
+`python -m src.extract`, which benchmarks the paths against each other.
+"""
+import sys
+import tempfile
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# How COPY writes NULL; unlike the CSV default (an empty field) it keeps NULL
+# and the empty string apart
+NULL_MARKER = '\\N'
+
+# Compact column types of the per-record extracts: repeated strings become
+# categoricals and ids nullable 32-bit integers. Salaries stay float64 so the
+# local aggregates match PostgreSQL's to the last digit.
+EXTRACT_DTYPES = {
+    'salary_amount': 'float64',
+    'city': 'category',
+    'activity_description': 'category',
+    'company_name': 'category',
+    'employee_id': 'Int32',
+    'company_id': 'Int32',
+}
+
+
+def _concat_compact(chunks):
+    """Concatenate compact chunks, merging the categoricals' dictionaries instead of decoding them"""
+    columns = {}
+    for name in chunks[0].columns:
+        parts = [chunk[name] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[name] = pd.Series(union_categoricals(parts, sort_categories=True), name=name)
+        else:
+            columns[name] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def read_compact_frame(conn, query, chunksize=100000, dtypes=EXTRACT_DTYPES):
+    """
+    Read a large query result with the compact dtypes of `dtypes`.
+
+    Rows come through a server-side cursor `chunksize` at a time and each
+    chunk is converted right away, so only one chunk of Python objects is
+    alive at any point instead of the whole result.
+    """
+    cursor = conn.cursor(name='report_extract')
+    cursor.itersize = chunksize
+    chunks = []
+    try:
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            columns = [column[0] for column in cursor.description]
+            if not rows:
+                break
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            chunks.append(chunk.astype({c: t for c, t in dtypes.items() if c in chunk.columns}))
+    finally:
+        cursor.close()
+    if not chunks:
+        empty = pd.DataFrame(columns=columns)
+        return empty.astype({c: t for c, t in dtypes.items() if c in empty.columns})
+    return _concat_compact(chunks)
+
+
+def _is_nullable_int(dtype):
+    dtype = pd.api.types.pandas_dtype(dtype)
+    return isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.kind in 'iu'
+
+
+def copy_frame(conn, query, dtypes=EXTRACT_DTYPES, chunksize=100000):
+    """
+    Read a query result through COPY ... TO STDOUT into a compact dataframe.
+
+    The CSV goes to an anonymous temporary file (psycopg2 writes it row by
+    row, which a buffered file takes at C speed; the OS cache keeps it in
+    memory while there is room) and is parsed `chunksize` rows at a time
+    with the `dtypes` of its columns. Floats are parsed round-trip exact, so the
+    values match what the server computed. `query` must not take parameters.
+    """
+    with tempfile.TemporaryFile() as buffer:
+        cursor = conn.cursor()
+        try:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER, NULL '{NULL_MARKER}')",
+                               buffer)
+        finally:
+            cursor.close()
+
+        # The C parser is much slower on nullable integers than on floats, and
+        # float64 holds every 32-bit id exactly: parse as float, convert after
+        nullable_ints = {c: t for c, t in dtypes.items() if _is_nullable_int(t)}
+        parse_dtypes = dict(dtypes, **{c: 'float64' for c in nullable_ints})
+        options = dict(dtype=parse_dtypes, na_values=[NULL_MARKER], keep_default_na=False,
+                       float_precision='round_trip')
+        buffer.seek(0)
+        chunks = [chunk.astype({c: t for c, t in nullable_ints.items() if c in chunk.columns})
+                  for chunk in pd.read_csv(buffer, chunksize=chunksize, **options)]
+        if not chunks:
+            buffer.seek(0)
+            empty = pd.read_csv(buffer, **options)
+            return empty.astype({c: t for c, t in nullable_ints.items() if c in empty.columns})
+    return _concat_compact(chunks)
+
+
+def memory_usage_mb(frames):
+    """Memory held by a dict of dataframes, in MB"""
+    return sum(frame.memory_usage(deep=True).sum() for frame in frames.values()
+               if isinstance(frame, pd.DataFrame)) / 1e6
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+BENCHMARK_QUERY = """
+    SELECT
+        s.salary_amount::float8 AS salary_amount,
+        c.city,
+        c.activity_description,
+        c.company_name,
+        s.employee_id,
+        c.company_id
+    FROM salary_records s
+    LEFT JOIN companies c ON s.company_id = c.company_id
+"""
+
+
+def _measure(extract):
+    """Run `extract` twice: timed, then under tracemalloc (which slows it down) for the peak; returns (frame, seconds, peak MB)"""
+    import time
+    import tracemalloc
+    start = time.perf_counter()
+    frame = extract()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        extract()
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+    return frame, seconds, peak
+
+
+if __name__ == "__main__":
+    import warnings
+    from src.db import pooled_connection
+
+    # Optional argument: a LIMIT for quick runs
+    query = BENCHMARK_QUERY + (f" LIMIT {int(sys.argv[1])}" if len(sys.argv) > 1 else "")
+    paths = {
+        'read_sql_query': lambda conn: pd.read_sql_query(query, conn),
+        'server-side cursor': lambda conn: read_compact_frame(conn, query),
+        'COPY (CSV)': lambda conn: copy_frame(conn, query),
+    }
+
+    warnings.filterwarnings('ignore', message='pandas only supports SQLAlchemy')
+    with pooled_connection() as conn:
+        frames = {}
+        print(f"{'path':<20} {'rows':>10} {'seconds':>8} {'peak MB':>8} {'frame MB':>9}")
+        for name, extract in paths.items():
+            frame, seconds, peak = _measure(lambda: extract(conn))
+            frames[name] = frame
+            print(f"{name:<20} {len(frame):>10,} {seconds:>8.2f} {peak:>8.1f} "
+                  f"{memory_usage_mb({name: frame}):>9.1f}")
+
+    # Same values whichever way they were read
+    baseline = frames['read_sql_query'].astype(object).where(frames['read_sql_query'].notna(), None)
+    for name, frame in frames.items():
+        same = frame.astype(object).where(frame.notna(), None).equals(baseline)
+        print(f"{name}: {'identical to read_sql_query' if same else 'DIFFERS from read_sql_query'}")
@@ -1,17 +1,37 @@
+import hashlib
+import io
+import json
 import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-import psycopg2
 from datetime import datetime
 import matplotlib.ticker as mtick
 from matplotlib.backends.backend_pdf import PdfPages
 from matplotlib.ticker import FuncFormatter
-from config import DB_CONFIG
-from sqlalchemy import create_engine  # ADD THIS LINE
-import urllib.parse as up
+from src.db import pooled_connection
+from src.matviews import salary_views_range
+from src.analytics import load_or_build_snapshot
+from src.cache import read_data_version
+from src.inequality import inequality_metrics, grouped_inequality
+from src.stats import fetch_inequality, inequality_aggregates_installed
+from src.query_builder import parse_filters
+from src.report_data import LOCAL_EXTRACT_QUERY, report_frames
+from src.extract import copy_frame, memory_usage_mb, peak_rss_mb
+from config import SNAPSHOT_DIR, REPORT_WORKERS, REPORT_FETCH_WORKERS, REPORT_COMPUTE, REPORT_CHUNK_SIZE
 import warnings
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # optional: without it the pages are rendered serially
+    PdfWriter = None
+
 warnings.filterwarnings("ignore")
 
 # Set the style for plots
@@ -19,24 +39,8 @@ plt.style.use('ggplot')
 sns.set(font_scale=1.2)
 plt.rcParams['figure.figsize'] = (12, 8)
 
-# Create output directory for visualizations
+# Output directory for visualizations (created when the report is written)
 OUTPUT_DIR = 'visualizations'
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
-
-def connect_to_db():
-    """Establish a connection to the PostgreSQL database"""
-    conn = psycopg2.connect(**DB_CONFIG)
-    return conn
-
-
-def get_sqlalchemy_engine():
-    user = os.getenv("DB_USER", "postgres")
-    pwd  = os.getenv("DB_PASSWORD", "")
-    host = os.getenv("DB_HOST", "localhost")
-    port = os.getenv("DB_PORT", "5432")
-    name = os.getenv("DB_NAME", "cnss_db")
-    return create_engine(f"postgresql://{up.quote(user)}:{up.quote(pwd)}@{host}:{port}/{name}")
 
 def format_number(num):
     """Format large numbers for readability"""
@@ -56,64 +60,80 @@ def money_formatter(x, pos):
     else:
         return f'{x:.0f} MAD'
 
-def calculate_gini(array):
-    """Calculate the Gini coefficient of an array (measure of inequality, 0 is total equality, 1 is total inequality)"""
-    array = np.array(array, dtype=np.float64)
-    array = array.flatten()
-    if np.amin(array) < 0:
-        array -= np.amin(array)  # Make all values positive
-    array += 0.0000001  # Prevent division by zero
-    array = np.sort(array)  # Sort values
-    index = np.arange(1, array.shape[0] + 1)  # Get indices
-    n = array.shape[0]  # Number of array elements
-    return ((np.sum((2 * index - n - 1) * array)) / (n * np.sum(array)))  # Calculate Gini
-
-def calculate_hoover_index(array):
-    """Calculate the Hoover index (Robin Hood index) - represents proportion of total income that would need
-    to be redistributed to achieve equality"""
-    array = np.array(array, dtype=np.float64)
-    array = array.flatten()
-    if len(array) == 0 or np.sum(array) == 0:
-        return 0
-    mean = np.mean(array)
-    return np.sum(np.abs(array - mean)) / (2 * np.sum(array))
-
-def calculate_atkinson_index(array, epsilon=0.5):
-    """Calculate the Atkinson index with inequality aversion parameter epsilon"""
-    array = np.array(array, dtype=np.float64)
-    array = array.flatten()
-    array = array[array > 0]  # Remove zeros or negative values
-    if len(array) == 0:
-        return 0
-    
-    n = len(array)
-    if epsilon == 1:
-        # Special case for epsilon = 1
-        geometric_mean = np.exp(np.sum(np.log(array)) / n)
-        arithmetic_mean = np.mean(array)
-        return 1 - (geometric_mean / arithmetic_mean)
-    else:
-        # General case
-        mean = np.mean(array)
-        sum_term = np.sum(np.power(array / mean, 1 - epsilon)) / n
-        return 1 - np.power(sum_term, 1 / (1 - epsilon))
+def _fetch_task(fetch):
+    """Run one fetch on its own pooled connection; returns (result, seconds)"""
+    start = time.perf_counter()
+    with pooled_connection() as conn:
+        result = fetch(conn)
+    return result, time.perf_counter() - start
 
-def fetch_data_for_analysis():
+def _run_fetch_tasks(tasks, workers):
+    """Run (key, label, fetch) tasks with at most `workers` queries in flight; returns {key: result}"""
+    print(f"Fetching {len(tasks)} datasets with up to {workers} concurrent queries...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [(key, label, executor.submit(_fetch_task, fetch)) for key, label, fetch in tasks]
+        results = {}
+        for key, label, future in futures:
+            results[key], seconds = future.result()
+            print(f"  {label}: {seconds:.2f}s")
+    print(f"Fetched all datasets in {time.perf_counter() - start:.2f}s")
+    return results
+
+def fetch_data_for_analysis(snapshot_dir=SNAPSHOT_DIR, workers=REPORT_FETCH_WORKERS, compute=REPORT_COMPUTE,
+                            chunksize=REPORT_CHUNK_SIZE):
     """
     Fetch comprehensive data for in-depth analysis.
     Returns dataframes for different analysis aspects.
+
+    With compute='local' the database is scanned once (LOCAL_EXTRACT_QUERY)
+    and every dataset is derived from that extract in pandas, with the same
+    numbers as the SQL queries; the snapshot is not used in that mode.
+    Otherwise see _fetch_from_database.
+
+    Per-record extracts are read with COPY and parsed `chunksize` rows at a
+    time into compact dtypes (categorical strings, 32-bit ids; see copy_frame).
     """
-    conn = connect_to_db()
-    engine = get_sqlalchemy_engine()
+    if compute == 'local':
+        fetch = partial(copy_frame, query=LOCAL_EXTRACT_QUERY, chunksize=chunksize)
+        extract = _run_fetch_tasks([('extract', "salary extract", fetch)], 1)['extract']
+        start = time.perf_counter()
+        data = report_frames(extract)
+        print(f"Derived report datasets locally in {time.perf_counter() - start:.2f}s")
+    else:
+        data = _fetch_from_database(snapshot_dir, workers, chunksize)
     
-    # Create a dictionary to store our dataframes
-    data = {}
+    # Calculate income share for each decile
+    total_salary = data['income_deciles_df']['total_salary'].sum()
+    data['income_deciles_df']['income_share'] = data['income_deciles_df']['total_salary'] / total_salary
     
-    try:
+    peak = peak_rss_mb()
+    print(f"Report datasets hold {memory_usage_mb(data):,.1f} MB"
+          + (f"; peak process memory {peak:,.1f} MB" if peak is not None else ""))
+    return data
+
+def _fetch_from_database(snapshot_dir, workers, chunksize):
+    """
+    Run one database query per report dataset.
+
+    The queries are independent, so up to `workers` of them run at the same
+    time, each on its own connection from the shared pool.
+
+    With `snapshot_dir`, the per-record salary frame is decoded from the
+    memory-mapped snapshot of the current data version (written on first
+    use) instead of being re-read from the database. The snapshot leaves out
+    records that lack an employee or document reference.
+    """
+    # (key in data, description, fetch(conn)), run concurrently below
+    tasks = []
+    
+    # One connection decides which sources to read; the queries themselves
+    # each check out their own connection from the pool
+    with pooled_connection() as conn:
         # 1. Get overall salary statistics for national analysis
         query = """
         SELECT 
-            s.salary_amount,
+            s.salary_amount::float8 AS salary_amount,
             c.city,
             c.activity_description,
             c.company_name,
@@ -122,8 +142,13 @@ def fetch_data_for_analysis():
         JOIN companies c ON s.company_id = c.company_id
         WHERE s.salary_amount >= 1
         """
-        print("Fetching overall salary data...")
-        data['salary_df'] = pd.read_sql_query(query, engine)
+        if snapshot_dir:
+            version = read_data_version(conn)
+            tasks.append(('salary_df', "overall salary data from snapshot",
+                          lambda c: load_or_build_snapshot(snapshot_dir, c, version).to_frame(min_salary=1)))
+        else:
+            tasks.append(('salary_df', "overall salary data",
+                          partial(copy_frame, query=query, chunksize=chunksize)))
         
         # 2. Get city statistics
         query = """
@@ -141,11 +166,25 @@ def fetch_data_for_analysis():
         FROM companies c
         JOIN salary_records s ON c.company_id = s.company_id
         WHERE c.city IS NOT NULL and s.salary_amount >= 1
+          AND s.employee_id IS NOT NULL AND s.document_id IS NOT NULL
         GROUP BY c.city
         ORDER BY employee_count DESC
         """
-        print("Fetching city statistics...")
-        data['city_df'] = pd.read_sql_query(query, engine)
+        # The materialized view holds the same aggregates (same rows, NULL
+        # foreign keys excluded) when no salary is below 1
+        views_range = salary_views_range(conn)
+        use_views = views_range is not None and views_range[0] >= 1
+        if use_views:
+            query = """
+            SELECT 
+                city, company_count, employee_count,
+                average_salary AS avg_salary, median_salary, p25_salary, p75_salary,
+                stddev_salary, max_salary, min_salary
+            FROM city_salary_stats
+            WHERE city IS NOT NULL
+            ORDER BY employee_count DESC
+            """
+        tasks.append(('city_df', "city statistics", partial(pd.read_sql_query, query)))
         
         # 3. Get activity statistics
         query = """
@@ -163,11 +202,21 @@ def fetch_data_for_analysis():
         FROM companies c
         JOIN salary_records s ON c.company_id = s.company_id
         WHERE c.activity_description IS NOT NULL and s.salary_amount >= 1
+          AND s.employee_id IS NOT NULL AND s.document_id IS NOT NULL
         GROUP BY c.activity_description
         ORDER BY employee_count DESC
         """
-        print("Fetching activity statistics...")
-        data['activity_df'] = pd.read_sql_query(query, engine)
+        if use_views:
+            query = """
+            SELECT 
+                activity_description, company_count, employee_count,
+                average_salary AS avg_salary, median_salary, p25_salary, p75_salary,
+                stddev_salary, max_salary, min_salary
+            FROM activity_salary_stats
+            WHERE activity_description IS NOT NULL
+            ORDER BY employee_count DESC
+            """
+        tasks.append(('activity_df', "activity statistics", partial(pd.read_sql_query, query)))
         
         # 4. Get company statistics
         query = """
@@ -190,8 +239,7 @@ def fetch_data_for_analysis():
         HAVING COUNT(DISTINCT s.employee_id) >= 10
         ORDER BY employee_count DESC
         """
-        print("Fetching company statistics...")
-        data['company_df'] = pd.read_sql_query(query, engine)
+        tasks.append(('company_df', "company statistics", partial(pd.read_sql_query, query)))
         
         # 5. Get salary distribution
         query = """
@@ -235,8 +283,7 @@ def fetch_data_for_analysis():
                 WHEN '1M+' THEN 13
             END
         """
-        print("Fetching salary distribution...")
-        data['salary_dist_df'] = pd.read_sql_query(query, engine)
+        tasks.append(('salary_dist_df', "salary distribution", partial(pd.read_sql_query, query)))
         
         # 6. Get percentile data for national analysis
         query = """
@@ -260,8 +307,7 @@ def fetch_data_for_analysis():
         WHERE s.salary_amount >= 1
 
         """
-        print("Fetching percentile data...")
-        data['percentiles_df'] = pd.read_sql_query(query, engine)
+        tasks.append(('percentiles_df', "percentile data", partial(pd.read_sql_query, query)))
         
         # 7. Get employee distribution by company size
         query = """
@@ -308,8 +354,7 @@ def fetch_data_for_analysis():
                 WHEN '1000+ employees' THEN 10
             END
         """
-        print("Fetching company size distribution...")
-        data['company_size_df'] = pd.read_sql_query(query, engine)
+        tasks.append(('company_size_df', "company size distribution", partial(pd.read_sql_query, query)))
         
         # 8. Get simpler income distribution data
         query = """
@@ -329,667 +374,965 @@ def fetch_data_for_analysis():
         GROUP BY decile
         ORDER BY decile
         """
-        print("Fetching income distribution by decile...")
-        data['income_deciles_df'] = pd.read_sql_query(query, engine)
+        tasks.append(('income_deciles_df', "income distribution by decile", partial(pd.read_sql_query, query)))
+        
+        # 9. Inequality measures and Lorenz curve, aggregated in the database
+        if inequality_aggregates_installed(conn):
+            tasks.append(('inequality', "inequality measures",
+                          partial(fetch_inequality, filters=parse_filters({'min_salary': 1}), lorenz_points=100)))
+    
+    return _run_fetch_tasks(tasks, workers)
 
-        # Calculate income share for each decile
-        total_salary = data['income_deciles_df']['total_salary'].sum()
-        data['income_deciles_df']['income_share'] = data['income_deciles_df']['total_salary'] / total_salary
-                
-    finally:
-        conn.close()
-        print("Database connection closed")
+def _page_title(data):
+    """Title page"""
+    # Generate title page
+    fig = plt.figure(figsize=(12, 10))
+    fig.suptitle("CNSS Data Analysis Report", fontsize=24, y=0.6)
+    fig.text(0.5, 0.5, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", 
+            ha='center', fontsize=14)
+    fig.text(0.5, 0.45, "Analysis of Moroccan Salary Data from CNSS Declarations", 
+            ha='center', fontsize=16)
     
-    return data
+    plt.axis('off')
+    
+    return fig
 
-def create_report_pdf(data):
-    """Generate a comprehensive PDF report with all analyses"""
-    print("Generating PDF report...")
+def _overall_figures(data):
+    """Percentile row plus the headline figures derived from it"""
+    percentiles = data['percentiles_df'].iloc[0]
+    total_employees = int(percentiles['count'])
+    total_salary = int(percentiles['total_salary'])
+    overall_mean = float(percentiles['avg'])
+    overall_median = float(percentiles['p50'])
+    mean_median_ratio = overall_mean / overall_median if overall_median > 0 else 0
+    return percentiles, total_employees, total_salary, overall_mean, overall_median, mean_median_ratio
+
+def _ensure_inequality(data):
+    """Fill data['inequality'] from the salaries when the database did not provide it"""
+    # Computed once in the parent so that every page renderer sees the same values
+    if 'inequality' in data:
+        return
+    salaries = np.sort(data['salary_df']['salary_amount'].to_numpy(dtype=np.float64))
+    data['inequality'] = {
+        'overall': inequality_metrics(salaries, epsilon=0.5, presorted=True),
+        'lorenz': np.column_stack((np.linspace(0, 1, len(salaries)),
+                                   np.cumsum(salaries) / np.sum(salaries))),
+    }
+
+def _page_summary(data):
+    """Summary statistics page"""
+
+    # Add summary statistics page
+    percentiles, total_employees, total_salary, overall_mean, overall_median, mean_median_ratio = _overall_figures(data)
+    inequality = data['inequality']['overall']
+
+    fig = plt.figure(figsize=(12, 10))
+    plt.axis('off')
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    pdf_path = f"{OUTPUT_DIR}/cnss_salary_analysis_{timestamp}.pdf"
+    # Create summary text
+    summary_text = (
+        "CNSS Data Analysis - Key Statistics\n"
+        "=================================\n\n"
+        f"Total Employees: {total_employees:,}\n\n"
+        f"Total Monthly Salary Mass: {total_salary:,} MAD\n\n"
+        f"Average (Mean) Monthly Salary: {overall_mean:,.2f} MAD\n\n"
+        f"Median Monthly Salary: {overall_median:,.2f} MAD\n\n"
+        f"Mean/Median Ratio: {mean_median_ratio:.2f}\n\n"
+        f"Minimum Salary: {percentiles['min']:,.2f} MAD\n\n"
+        f"Maximum Salary: {percentiles['max']:,.2f} MAD\n\n"
+        f"Salary Range (Max-Min): {(percentiles['max'] - percentiles['min']):,.2f} MAD\n\n"
+        f"Standard Deviation: {data['salary_df']['salary_amount'].std():,.2f} MAD\n\n"
+        "Salary Percentiles:\n"
+        f"  10th Percentile: {percentiles['p10']:,.2f} MAD\n"
+        f"  25th Percentile: {percentiles['p25']:,.2f} MAD\n"
+        f"  50th Percentile (Median): {percentiles['p50']:,.2f} MAD\n"
+        f"  75th Percentile: {percentiles['p75']:,.2f} MAD\n"
+        f"  90th Percentile: {percentiles['p90']:,.2f} MAD\n"
+        f"  95th Percentile: {percentiles['p95']:,.2f} MAD\n"
+        f"  99th Percentile: {percentiles['p99']:,.2f} MAD\n\n"
+        "Inequality Measures:\n"
+        f"  90/10 Ratio: {percentiles['p90']/percentiles['p10']:.2f}\n"
+        f"  75/25 Ratio: {percentiles['p75']/percentiles['p25']:.2f}\n"
+        f"  99/50 Ratio: {percentiles['p99']/percentiles['p50']:.2f}\n"
+        f"  Gini Coefficient: {inequality['gini']:.3f}\n"
+        f"  Hoover Index: {inequality['hoover']:.3f}\n"
+    )
     
-    with PdfPages(pdf_path) as pdf:
-        # Generate title page
-        fig = plt.figure(figsize=(12, 10))
-        fig.suptitle("CNSS Data Analysis Report", fontsize=24, y=0.6)
-        fig.text(0.5, 0.5, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", 
-                ha='center', fontsize=14)
-        fig.text(0.5, 0.45, "Analysis of Moroccan Salary Data from CNSS Declarations", 
-                ha='center', fontsize=16)
-        
-        plt.axis('off')
-        pdf.savefig(fig)
-        plt.close()
-        
-        # Add summary statistics page
-        percentiles = data['percentiles_df'].iloc[0]
-        total_employees = int(percentiles['count'])
-        total_salary = int(percentiles['total_salary'])
-        overall_mean = float(percentiles['avg'])
-        overall_median = float(percentiles['p50'])
-        mean_median_ratio = overall_mean / overall_median if overall_median > 0 else 0
-        
-        fig = plt.figure(figsize=(12, 10))
-        plt.axis('off')
-        
-        # Create summary text
-        summary_text = (
-            "CNSS Data Analysis - Key Statistics\n"
-            "=================================\n\n"
-            f"Total Employees: {total_employees:,}\n\n"
-            f"Total Monthly Salary Mass: {total_salary:,} MAD\n\n"
-            f"Average (Mean) Monthly Salary: {overall_mean:,.2f} MAD\n\n"
-            f"Median Monthly Salary: {overall_median:,.2f} MAD\n\n"
-            f"Mean/Median Ratio: {mean_median_ratio:.2f}\n\n"
-            f"Minimum Salary: {percentiles['min']:,.2f} MAD\n\n"
-            f"Maximum Salary: {percentiles['max']:,.2f} MAD\n\n"
-            f"Salary Range (Max-Min): {(percentiles['max'] - percentiles['min']):,.2f} MAD\n\n"
-            f"Standard Deviation: {data['salary_df']['salary_amount'].std():,.2f} MAD\n\n"
-            "Salary Percentiles:\n"
-            f"  10th Percentile: {percentiles['p10']:,.2f} MAD\n"
-            f"  25th Percentile: {percentiles['p25']:,.2f} MAD\n"
-            f"  50th Percentile (Median): {percentiles['p50']:,.2f} MAD\n"
-            f"  75th Percentile: {percentiles['p75']:,.2f} MAD\n"
-            f"  90th Percentile: {percentiles['p90']:,.2f} MAD\n"
-            f"  95th Percentile: {percentiles['p95']:,.2f} MAD\n"
-            f"  99th Percentile: {percentiles['p99']:,.2f} MAD\n\n"
-            "Inequality Measures:\n"
-            f"  90/10 Ratio: {percentiles['p90']/percentiles['p10']:.2f}\n"
-            f"  75/25 Ratio: {percentiles['p75']/percentiles['p25']:.2f}\n"
-            f"  99/50 Ratio: {percentiles['p99']/percentiles['p50']:.2f}\n"
-            f"  Gini Coefficient: {calculate_gini(data['salary_df']['salary_amount']):.3f}\n"
-            f"  Hoover Index: {calculate_hoover_index(data['salary_df']['salary_amount']):.3f}\n"
-        )
-        
-        fig.text(0.5, 0.95, "Summary Statistics", ha='center', fontsize=20)
-        fig.text(0.1, 0.85, summary_text, fontsize=12, va='top', family='monospace')
-        
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 1. Overall salary distribution
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        # Add a new column for proper ordering
-        order_map = {
-            '< 3K': 1, '3K-5K': 2, '5K-8K': 3, '8K-10K': 4, '10K-15K': 5,
-            '15K-20K': 6, '20K-30K': 7, '30K-50K': 8, '50K-100K': 9,
-            '100K-200K': 10, '200K-500K': 11, '500K-1M': 12, '1M+': 13
-        }
-        salary_dist = data['salary_dist_df'].copy()
-        salary_dist = salary_dist.sort_values(
-            by='salary_range', 
-            key=lambda x: x.map(order_map)
-        )
-        
-        # Calculate percentages
-        salary_dist['percentage'] = salary_dist['count'] / salary_dist['count'].sum() * 100
-        
-        bars = ax.bar(salary_dist['salary_range'], salary_dist['percentage'],
-                color=sns.color_palette("viridis", len(salary_dist)))
-        
-        # Add values on top of bars
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 0.5,
-                    f'{height:.1f}%', ha='center', va='bottom', rotation=0, fontsize=9)
-        
-        ax.set_title('Salary Distribution in Morocco (CNSS Data)', fontsize=16)
-        ax.set_xlabel('Monthly Salary Range (MAD)', fontsize=14)
-        ax.set_ylabel('Percentage of Employees', fontsize=14)
-        ax.set_ylim(0, max(salary_dist['percentage']) * 1.15)  # Add 15% headroom
-        plt.xticks(rotation=45)
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # Add text with key statistics
-        stats_text = (
-            f"Total Employees: {total_employees:,}\n"
-            f"Mean Salary: {overall_mean:,.0f} MAD\n"
-            f"Median Salary: {overall_median:,.0f} MAD\n"
-            f"Mean/Median Ratio: {mean_median_ratio:.2f}"
-        )
-        
-        props = dict(boxstyle='round', facecolor='white', alpha=0.8)
-        ax.text(0.02, 0.98, stats_text, transform=ax.transAxes, fontsize=10,
-                verticalalignment='top', bbox=props)
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 2. Percentile comparison chart
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        percentile_keys = ['p01', 'p05', 'p10', 'p25', 'p50', 'p75', 'p90', 'p95', 'p99', 'p999']
-        percentile_labels = ['1%', '5%', '10%', '25%', '50%\n(Median)', '75%', '90%', '95%', '99%', '99.9%']
-        percentile_values = [percentiles[key] for key in percentile_keys]
-        
-        # Plot bars with gradient color
-        colors = plt.cm.viridis(np.linspace(0, 1, len(percentile_keys)))
-        bars = ax.bar(percentile_labels, percentile_values, color=colors)
-        
-        # Add values on top of bars
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height * 1.05,
-                    f'{height:,.0f}', ha='center', va='bottom', rotation=0, fontsize=9)
-        
-        ax.set_title('Salary by Percentile in Morocco (CNSS Data)', fontsize=16)
-        ax.set_xlabel('Percentile', fontsize=14)
-        ax.set_ylabel('Monthly Salary (MAD)', fontsize=14)
-        ax.yaxis.set_major_formatter(FuncFormatter(money_formatter))
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # Add a line for mean
-        plt.axhline(y=overall_mean, color='red', linestyle='--', linewidth=2, 
-                   label=f'Mean: {overall_mean:,.0f} MAD')
-        plt.legend(loc='upper left')
-        
-        # Add growth rates between percentiles
-        growth_text = "Percentile Ratios:\n"
-        for i in range(len(percentile_keys)-1):
-            ratio = percentile_values[i+1] / percentile_values[i]
-            growth_text += f"{percentile_labels[i+1]}/{percentile_labels[i]}: {ratio:.1f}x\n"
-        
-        props = dict(boxstyle='round', facecolor='white', alpha=0.8)
-        ax.text(0.02, 0.5, growth_text, transform=ax.transAxes, fontsize=9,
-                verticalalignment='center', bbox=props)
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 3. Calculate and plot the Lorenz curve
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        # Get salary data and sort it
-        salaries = data['salary_df']['salary_amount'].sort_values().reset_index(drop=True)
-        
-        # Calculate cumulative distribution
-        lorenz_x = np.linspace(0, 1, len(salaries))
-        lorenz_y = np.cumsum(salaries) / np.sum(salaries)
-        
-        # Calculate Gini coefficient using our function
-        gini = calculate_gini(salaries)
-        hoover_idx = calculate_hoover_index(salaries)
-        atkinson_idx = calculate_atkinson_index(salaries, epsilon=0.5)
-        
-        # Plot the Lorenz curve
-        ax.plot(lorenz_x, lorenz_y, 'b-', linewidth=2, label=f'Lorenz Curve (Gini={gini:.3f})')
-        
-        # Plot the line of perfect equality
-        ax.plot([0, 1], [0, 1], 'k--', label='Perfect Equality')
-        
-        # Shade the area between the curves
-        ax.fill_between(lorenz_x, lorenz_y, lorenz_x, alpha=0.2, color='blue')
-        
-        # Add grid, title, and labels
-        ax.grid(True, linestyle='--', alpha=0.7)
-        ax.set_title('Lorenz Curve of Income Distribution', fontsize=16)
-        ax.set_xlabel('Cumulative Share of Population', fontsize=14)
-        ax.set_ylabel('Cumulative Share of Income', fontsize=14)
-        
-        # Format axes as percentages
-        ax.xaxis.set_major_formatter(mtick.PercentFormatter(1.0))
-        ax.yaxis.set_major_formatter(mtick.PercentFormatter(1.0))
-        
-        # Add text annotation with inequality metrics
-        textstr = (
-            f'Inequality Metrics:\n'
-            f'Gini Coefficient: {gini:.3f}\n'
-            f'Hoover Index: {hoover_idx:.3f}\n'
-            f'Atkinson Index (ε=0.5): {atkinson_idx:.3f}\n'
-            f'P90/P10 Ratio: {percentiles["p90"]/percentiles["p10"]:.2f}\n'
-            f'P75/P25 Ratio: {percentiles["p75"]/percentiles["p25"]:.2f}\n'
-            f'P99/P50 Ratio: {percentiles["p99"]/percentiles["p50"]:.2f}\n'
-            f'Top 1% Min Salary: {percentiles["p99"]:,.0f} MAD'
-        )
-        
-        props = dict(boxstyle='round', facecolor='white', alpha=0.8)
-        ax.text(0.05, 0.95, textstr, transform=ax.transAxes, fontsize=10,
-            verticalalignment='top', bbox=props)
-        
-        # Add legend
-        ax.legend(loc='lower right')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        fig, ax = plt.subplots(figsize=(12, 8))
-
-        # Create a bar chart showing income share by decile
-        deciles = data['income_deciles_df']
-        bars = ax.bar(deciles['decile'], deciles['income_share'] * 100,
-                    color=sns.color_palette("viridis", len(deciles)))
-
-        # Add values on top of bars
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 0.5,
-                f'{height:.1f}%', ha='center', va='bottom', rotation=0)
-
-        ax.set_title('Income Share by Decile', fontsize=16)
-        ax.set_xlabel('Income Decile (1 = Lowest 10%, 10 = Highest 10%)', fontsize=14)
-        ax.set_ylabel('Share of Total Income (%)', fontsize=14)
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-
-        # Calculate top income concentration
-        top_10_percent = deciles[deciles['decile'] == 10]['income_share'].sum() * 100
-        top_20_percent = deciles[deciles['decile'] >= 9]['income_share'].sum() * 100
-        bottom_50_percent = deciles[deciles['decile'] <= 5]['income_share'].sum() * 100
-
-        # Add a text box with stats
-        stats_text = (
-            f"Income Concentration:\n"
-            f"Top 10%: {top_10_percent:.1f}%\n"
-            f"Top 20%: {top_20_percent:.1f}%\n"
-            f"Bottom 50%: {bottom_50_percent:.1f}%\n"
-        )
+    fig.text(0.5, 0.95, "Summary Statistics", ha='center', fontsize=20)
+    fig.text(0.1, 0.85, summary_text, fontsize=12, va='top', family='monospace')
+    
+    return fig
+
+def _page_salary_distribution(data):
+    """Overall salary distribution"""
+    
+    _, total_employees, _, overall_mean, overall_median, mean_median_ratio = _overall_figures(data)
 
-        props = dict(boxstyle='round', facecolor='white', alpha=0.8)
-        ax.text(0.05, 0.95, stats_text, transform=ax.transAxes, fontsize=10,
+    # 1. Overall salary distribution
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
+    # Add a new column for proper ordering
+    order_map = {
+        '< 3K': 1, '3K-5K': 2, '5K-8K': 3, '8K-10K': 4, '10K-15K': 5,
+        '15K-20K': 6, '20K-30K': 7, '30K-50K': 8, '50K-100K': 9,
+        '100K-200K': 10, '200K-500K': 11, '500K-1M': 12, '1M+': 13
+    }
+    salary_dist = data['salary_dist_df'].copy()
+    salary_dist = salary_dist.sort_values(
+        by='salary_range', 
+        key=lambda x: x.map(order_map)
+    )
+    
+    # Calculate percentages
+    salary_dist['percentage'] = salary_dist['count'] / salary_dist['count'].sum() * 100
+    
+    bars = ax.bar(salary_dist['salary_range'], salary_dist['percentage'],
+            color=sns.color_palette("viridis", len(salary_dist)))
+    
+    # Add values on top of bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.5,
+                f'{height:.1f}%', ha='center', va='bottom', rotation=0, fontsize=9)
+    
+    ax.set_title('Salary Distribution in Morocco (CNSS Data)', fontsize=16)
+    ax.set_xlabel('Monthly Salary Range (MAD)', fontsize=14)
+    ax.set_ylabel('Percentage of Employees', fontsize=14)
+    ax.set_ylim(0, max(salary_dist['percentage']) * 1.15)  # Add 15% headroom
+    plt.xticks(rotation=45)
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    
+    # Add text with key statistics
+    stats_text = (
+        f"Total Employees: {total_employees:,}\n"
+        f"Mean Salary: {overall_mean:,.0f} MAD\n"
+        f"Median Salary: {overall_median:,.0f} MAD\n"
+        f"Mean/Median Ratio: {mean_median_ratio:.2f}"
+    )
+    
+    props = dict(boxstyle='round', facecolor='white', alpha=0.8)
+    ax.text(0.02, 0.98, stats_text, transform=ax.transAxes, fontsize=10,
             verticalalignment='top', bbox=props)
+    
+    plt.tight_layout()
+    
+    return fig
 
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 5. Company size distribution
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        # Sort company size data by size range
-        company_sizes = data['company_size_df'].copy()
-        
-        # Create bar chart
-        bars = ax.bar(company_sizes['size_range'], company_sizes['company_count'],
-                     color=sns.color_palette("viridis", len(company_sizes)))
-        
-        # Add company counts as labels
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 5,
-                   f'{int(height):,}', ha='center', va='bottom')
-        
-        ax.set_title('Distribution of Companies by Size', fontsize=16)
-        ax.set_xlabel('Company Size', fontsize=14)
-        ax.set_ylabel('Number of Companies', fontsize=14)
-        plt.xticks(rotation=45, ha='right')
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # Add a second y-axis for employee count
-        ax2 = ax.twinx()
-        ax2.plot(company_sizes['size_range'], company_sizes['employee_count'], 
-                'ro-', linewidth=2, markersize=6)
-        ax2.set_ylabel('Number of Employees', color='r', fontsize=14)
-        ax2.tick_params(axis='y', labelcolor='r')
-        
-        # Add employee counts as labels
-        for i, count in enumerate(company_sizes['employee_count']):
-            ax2.text(i, count + 0.05 * max(company_sizes['employee_count']),
-                    f'{int(count):,}', ha='center', va='bottom', color='r')
-        
-        # Add summary text
-        summary_text = (
-            f"Total Companies: {company_sizes['company_count'].sum():,}\n"
-            f"Total Employees: {company_sizes['employee_count'].sum():,}\n"
-            f"Avg. Company Size: {company_sizes['employee_count'].sum() / company_sizes['company_count'].sum():.1f} employees"
-        )
-        
-        props = dict(boxstyle='round', facecolor='white', alpha=0.8)
-        ax.text(0.02, 0.98, summary_text, transform=ax.transAxes, fontsize=10,
-               verticalalignment='top', bbox=props)
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 6. Top 15 cities by employee count
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        # Select top 15 cities by employee count
-        top_cities = data['city_df'].sort_values('employee_count', ascending=False).head(15)
-        top_cities = top_cities.sort_values('employee_count')  # For better viz
-        
-        # Create bar chart
-        bars = ax.barh(top_cities['city'], top_cities['employee_count'],
-                      color=sns.color_palette("viridis", len(top_cities)))
-        
-        # Add employee counts as labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.02 * max(top_cities['employee_count']), bar.get_y() + bar.get_height()/2.,
-                   f'{int(width):,}', va='center')
-        
-        ax.set_title('Top 15 Cities by Number of Employees', fontsize=16)
-        ax.set_xlabel('Number of Employees', fontsize=14)
-        ax.set_ylabel('City', fontsize=14)
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        
-        # Add city stats
-        for i, city in enumerate(top_cities['city']):
-            avg_salary = top_cities.iloc[i]['avg_salary']
-            company_count = top_cities.iloc[i]['company_count']
-            ax.text(10, i - 0.25, 
-                   f"Companies: {int(company_count):,} | Avg Salary: {int(avg_salary):,} MAD", 
-                   fontsize=8, color='blue')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 7. Top 15 cities by average salary
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        # Select top 15 cities by average salary (with at least 100 employees)
-        top_salary_cities = data['city_df'][data['city_df']['employee_count'] >= 100]
-        top_salary_cities = top_salary_cities.sort_values('avg_salary', ascending=False).head(15)
-        top_salary_cities = top_salary_cities.sort_values('avg_salary')  # For better viz
-        
-        # Create bar chart
-        bars = ax.barh(top_salary_cities['city'], top_salary_cities['avg_salary'],
-                      color=sns.color_palette("viridis", len(top_salary_cities)))
-        
-        # Add salary values as labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.02 * max(top_salary_cities['avg_salary']), bar.get_y() + bar.get_height()/2.,
-                   f'{int(width):,} MAD', va='center')
-        
-        ax.set_title('Top 15 Cities by Average Salary (Min 100 Employees)', fontsize=16)
-        ax.set_xlabel('Average Monthly Salary (MAD)', fontsize=14)
-        ax.set_ylabel('City', fontsize=14)
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        
-        # Add city stats
-        for i, city in enumerate(top_salary_cities['city']):
-            employee_count = top_salary_cities.iloc[i]['employee_count']
-            company_count = top_salary_cities.iloc[i]['company_count']
-            ax.text(10, i - 0.25, 
-                   f"Employees: {int(employee_count):,} | Companies: {int(company_count):,}", 
-                   fontsize=8, color='blue')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 8. Top 15 activities by employee count
-        fig, ax = plt.subplots(figsize=(14, 10))
-        
-        # Select top 15 activities by employee count
-        top_activities = data['activity_df'].sort_values('employee_count', ascending=False).head(15)
-        top_activities = top_activities.sort_values('employee_count')  # For better viz
-        
-        # Shorten activity names for better display
-        top_activities['short_name'] = top_activities['activity_description'].apply(
-            lambda x: x[:50] + '...' if len(x) > 50 else x
-        )
-        
-        # Create bar chart
-        bars = ax.barh(top_activities['short_name'], top_activities['employee_count'],
-                      color=sns.color_palette("viridis", len(top_activities)))
-        
-        # Add employee counts as labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.02 * max(top_activities['employee_count']), bar.get_y() + bar.get_height()/2.,
-                   f'{int(width):,}', va='center')
-        
-        ax.set_title('Top 15 Business Activities by Number of Employees', fontsize=16)
-        ax.set_xlabel('Number of Employees', fontsize=14)
-        ax.set_ylabel('Business Activity', fontsize=14)
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        
-        # Add activity stats
-        for i, activity in enumerate(top_activities['short_name']):
-            avg_salary = top_activities.iloc[i]['avg_salary']
-            company_count = top_activities.iloc[i]['company_count']
-            ax.text(10, i - 0.25, 
-                   f"Companies: {int(company_count):,} | Avg Salary: {int(avg_salary):,} MAD", 
-                   fontsize=8, color='blue')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 9. Top 15 activities by average salary
-        fig, ax = plt.subplots(figsize=(14, 10))
-        
-        # Select top 15 activities by average salary (with at least 100 employees)
-        top_salary_activities = data['activity_df'][data['activity_df']['employee_count'] >= 100]
-        top_salary_activities = top_salary_activities.sort_values('avg_salary', ascending=False).head(15)
-        top_salary_activities = top_salary_activities.sort_values('avg_salary')  # For better viz
-        
-        # Shorten activity names for better display
-        top_salary_activities['short_name'] = top_salary_activities['activity_description'].apply(
-            lambda x: x[:50] + '...' if len(x) > 50 else x
-        )
-        
-        # Create bar chart
-        bars = ax.barh(top_salary_activities['short_name'], top_salary_activities['avg_salary'],
-                      color=sns.color_palette("viridis", len(top_salary_activities)))
-        
-        # Add salary values as labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.02 * max(top_salary_activities['avg_salary']), bar.get_y() + bar.get_height()/2.,
-                   f'{int(width):,} MAD', va='center')
-        
-        ax.set_title('Top 15 Business Activities by Average Salary (Min 100 Employees)', fontsize=16)
-        ax.set_xlabel('Average Monthly Salary (MAD)', fontsize=14)
-        ax.set_ylabel('Business Activity', fontsize=14)
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        
-        # Add activity stats
-        for i, activity in enumerate(top_salary_activities['short_name']):
-            employee_count = top_salary_activities.iloc[i]['employee_count']
-            company_count = top_salary_activities.iloc[i]['company_count']
-            median = top_salary_activities.iloc[i]['median_salary']
-            ax.text(10, i - 0.25, 
-                   f"Employees: {int(employee_count):,} | Companies: {int(company_count):,} | Median: {int(median):,} MAD", 
-                   fontsize=8, color='blue')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 10. Mean/Median comparison by city
-        fig, ax = plt.subplots(figsize=(14, 10))
-        
-        # Select top 15 cities by employee count
-        top_mm_cities = data['city_df'].sort_values('employee_count', ascending=False).head(15)
-        top_mm_cities = top_mm_cities.copy()
-        
-        # Calculate mean/median ratio
-        top_mm_cities['mean_median_ratio'] = top_mm_cities['avg_salary'] / top_mm_cities['median_salary']
-        top_mm_cities = top_mm_cities.sort_values('mean_median_ratio', ascending=False)
-        
-        # Create bar chart
-        bars = ax.barh(top_mm_cities['city'], top_mm_cities['mean_median_ratio'],
-                      color=sns.color_palette("viridis", len(top_mm_cities)))
-        
-        # Add ratio values as labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.02, bar.get_y() + bar.get_height()/2.,
-                   f'{width:.2f}', va='center')
-        
-        ax.set_title('Income Inequality: Mean/Median Ratio by City', fontsize=16)
-        ax.set_xlabel('Mean/Median Ratio (Higher = More Inequality)', fontsize=14)
-        ax.set_ylabel('City', fontsize=14)
-        ax.set_xlim(1, max(top_mm_cities['mean_median_ratio']) * 1.1)
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        
-        # Add city stats
-        for i, city in enumerate(top_mm_cities['city']):
-            avg = int(top_mm_cities.iloc[i]['avg_salary'])
-            median = int(top_mm_cities.iloc[i]['median_salary'])
-            employee_count = top_mm_cities.iloc[i]['employee_count']
-            ax.text(1.0, i - 0.25, 
-                   f"Mean: {avg:,} MAD | Median: {median:,} MAD | Employees: {int(employee_count):,}", 
-                   fontsize=8, color='blue')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 11. Standard deviation by city
-        fig, ax = plt.subplots(figsize=(14, 10))
-        
-        # Select top 15 cities by employee count
-        top_sd_cities = data['city_df'].sort_values('employee_count', ascending=False).head(15)
-        
-        # Calculate coefficient of variation (standardized measure of dispersion)
-        top_sd_cities['cv'] = top_sd_cities['stddev_salary'] / top_sd_cities['avg_salary']
-        top_sd_cities = top_sd_cities.sort_values('cv', ascending=False)
-        
-        # Create bar chart
-        bars = ax.barh(top_sd_cities['city'], top_sd_cities['cv'],
-                      color=sns.color_palette("viridis", len(top_sd_cities)))
-        
-        # Add CV values as labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.02, bar.get_y() + bar.get_height()/2.,
-                   f'{width:.2f}', va='center')
-        
-        ax.set_title('Salary Variability: Coefficient of Variation by City', fontsize=16)
-        ax.set_xlabel('Coefficient of Variation (StdDev/Mean)', fontsize=14)
-        ax.set_ylabel('City', fontsize=14)
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        
-        # Add city stats
-        for i, city in enumerate(top_sd_cities['city']):
-            stddev = int(top_sd_cities.iloc[i]['stddev_salary'])
-            avg = int(top_sd_cities.iloc[i]['avg_salary'])
-            employee_count = top_sd_cities.iloc[i]['employee_count']
-            ax.text(0, i - 0.25, 
-                   f"StdDev: {stddev:,} MAD | Mean: {avg:,} MAD | Employees: {int(employee_count):,}", 
-                   fontsize=8, color='blue')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 12. Interquartile Range by city (measure of dispersion)
-        fig, ax = plt.subplots(figsize=(14, 10))
-        
-        # Select top 15 cities by employee count
-        top_iqr_cities = data['city_df'].sort_values('employee_count', ascending=False).head(15)
-        
-        # Calculate IQR and IQR ratio
-        top_iqr_cities['iqr'] = top_iqr_cities['p75_salary'] - top_iqr_cities['p25_salary']
-        top_iqr_cities['iqr_ratio'] = top_iqr_cities['p75_salary'] / top_iqr_cities['p25_salary']
-        top_iqr_cities = top_iqr_cities.sort_values('iqr_ratio', ascending=False)
-        
-        # Create bar chart
-        bars = ax.barh(top_iqr_cities['city'], top_iqr_cities['iqr_ratio'],
-                      color=sns.color_palette("viridis", len(top_iqr_cities)))
-        
-        # Add IQR ratio values as labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.1, bar.get_y() + bar.get_height()/2.,
-                   f'{width:.2f}x', va='center')
-        
-        ax.set_title('Income Inequality: 75th/25th Percentile Ratio by City', fontsize=16)
-        ax.set_xlabel('75th/25th Percentile Ratio', fontsize=14)
-        ax.set_ylabel('City', fontsize=14)
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        
-        # Add city stats
-        for i, city in enumerate(top_iqr_cities['city']):
-            p25 = int(top_iqr_cities.iloc[i]['p25_salary'])
-            p75 = int(top_iqr_cities.iloc[i]['p75_salary'])
-            iqr = int(top_iqr_cities.iloc[i]['iqr'])
-            employee_count = top_iqr_cities.iloc[i]['employee_count']
-            ax.text(1.0, i - 0.25, 
-                   f"25th: {p25:,} MAD | 75th: {p75:,} MAD | IQR: {iqr:,} MAD | Employees: {int(employee_count):,}", 
-                   fontsize=8, color='blue')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 13. Top 15 companies by employee count
-        fig, ax = plt.subplots(figsize=(14, 10))
-        
-        # Select top 15 companies by employee count
-        top_companies = data['company_df'].sort_values('employee_count', ascending=False).head(15)
-        top_companies = top_companies.sort_values('employee_count')  # For better viz
-        
-        # Create bar chart
-        bars = ax.barh(top_companies['company_name'], top_companies['employee_count'],
-                      color=sns.color_palette("viridis", len(top_companies)))
-        
-        # Add employee counts as labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.02 * max(top_companies['employee_count']), bar.get_y() + bar.get_height()/2.,
-                   f'{int(width):,}', va='center')
-        
-        ax.set_title('Top 15 Companies by Number of Employees', fontsize=16)
-        ax.set_xlabel('Number of Employees', fontsize=14)
-        ax.set_ylabel('Company', fontsize=14)
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        
-        # Add company stats
-        for i, company in enumerate(top_companies['company_name']):
-            city = top_companies.iloc[i]['city'] or 'Unknown'
-            activity = top_companies.iloc[i]['activity_description']
-            if activity and len(activity) > 40:
-                activity = activity[:37] + '...'
-            avg_salary = int(top_companies.iloc[i]['avg_salary'])
-            
-            ax.text(10, i - 0.25, 
-                   f"City: {city} | Activity: {activity} | Avg Salary: {avg_salary:,} MAD", 
-                   fontsize=8, color='blue')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
-        
-        # 14. Top 15 companies by average salary (min 30 employees)
-        fig, ax = plt.subplots(figsize=(14, 10))
-        
-        # Select top 15 companies by average salary (with at least 30 employees)
-        top_salary_companies = data['company_df'][data['company_df']['employee_count'] >= 30]
-        top_salary_companies = top_salary_companies.sort_values('avg_salary', ascending=False).head(15)
-        top_salary_companies = top_salary_companies.sort_values('avg_salary')  # For better viz
-        
-        # Create bar chart
-        bars = ax.barh(top_salary_companies['company_name'], top_salary_companies['avg_salary'],
-                      color=sns.color_palette("viridis", len(top_salary_companies)))
-        
-        # Add salary values as labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.02 * max(top_salary_companies['avg_salary']), bar.get_y() + bar.get_height()/2.,
-                   f'{int(width):,} MAD', va='center')
-        
-        ax.set_title('Top 15 Companies by Average Salary (Min 30 Employees)', fontsize=16)
-        ax.set_xlabel('Average Monthly Salary (MAD)', fontsize=14)
-        ax.set_ylabel('Company', fontsize=14)
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        
-        # Add company stats
-        for i, company in enumerate(top_salary_companies['company_name']):
-            city = top_salary_companies.iloc[i]['city'] or 'Unknown'
-            activity = top_salary_companies.iloc[i]['activity_description']
-            if activity and len(activity) > 40:
-                activity = activity[:37] + '...'
-            employee_count = top_salary_companies.iloc[i]['employee_count']
-            median = int(top_salary_companies.iloc[i]['median_salary'])
-            
-            ax.text(10, i - 0.25, 
-                   f"City: {city} | Activity: {activity} | Employees: {int(employee_count):,} | Median: {median:,} MAD", 
-                   fontsize=8, color='blue')
-        
-        plt.tight_layout()
-        pdf.savefig(fig)
-        plt.close()
+def _page_percentiles(data):
+    """Salary by percentile"""
+    
+    percentiles, _, _, overall_mean, _, _ = _overall_figures(data)
+
+    # 2. Percentile comparison chart
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
+    percentile_keys = ['p01', 'p05', 'p10', 'p25', 'p50', 'p75', 'p90', 'p95', 'p99', 'p999']
+    percentile_labels = ['1%', '5%', '10%', '25%', '50%\n(Median)', '75%', '90%', '95%', '99%', '99.9%']
+    percentile_values = [percentiles[key] for key in percentile_keys]
+    
+    # Plot bars with gradient color
+    colors = plt.cm.viridis(np.linspace(0, 1, len(percentile_keys)))
+    bars = ax.bar(percentile_labels, percentile_values, color=colors)
+    
+    # Add values on top of bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height * 1.05,
+                f'{height:,.0f}', ha='center', va='bottom', rotation=0, fontsize=9)
+    
+    ax.set_title('Salary by Percentile in Morocco (CNSS Data)', fontsize=16)
+    ax.set_xlabel('Percentile', fontsize=14)
+    ax.set_ylabel('Monthly Salary (MAD)', fontsize=14)
+    ax.yaxis.set_major_formatter(FuncFormatter(money_formatter))
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    
+    # Add a line for mean
+    plt.axhline(y=overall_mean, color='red', linestyle='--', linewidth=2, 
+               label=f'Mean: {overall_mean:,.0f} MAD')
+    plt.legend(loc='upper left')
+    
+    # Add growth rates between percentiles
+    growth_text = "Percentile Ratios:\n"
+    for i in range(len(percentile_keys)-1):
+        ratio = percentile_values[i+1] / percentile_values[i]
+        growth_text += f"{percentile_labels[i+1]}/{percentile_labels[i]}: {ratio:.1f}x\n"
+    
+    props = dict(boxstyle='round', facecolor='white', alpha=0.8)
+    ax.text(0.02, 0.5, growth_text, transform=ax.transAxes, fontsize=9,
+            verticalalignment='center', bbox=props)
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_lorenz_curve(data):
+    """Lorenz curve with the national inequality measures"""
+    
+    percentiles = _overall_figures(data)[0]
+    inequality = data['inequality']['overall']
+    lorenz_x, lorenz_y = np.asarray(data['inequality']['lorenz']).T
+
+    # 3. Calculate and plot the Lorenz curve
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    gini = inequality['gini']
+    hoover_idx = inequality['hoover']
+    atkinson_idx = inequality['atkinson']
+    theil_idx = inequality['theil']
+    
+    # Plot the Lorenz curve
+    ax.plot(lorenz_x, lorenz_y, 'b-', linewidth=2, label=f'Lorenz Curve (Gini={gini:.3f})')
+    
+    # Plot the line of perfect equality
+    ax.plot([0, 1], [0, 1], 'k--', label='Perfect Equality')
+    
+    # Shade the area between the curves
+    ax.fill_between(lorenz_x, lorenz_y, lorenz_x, alpha=0.2, color='blue')
+    
+    # Add grid, title, and labels
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.set_title('Lorenz Curve of Income Distribution', fontsize=16)
+    ax.set_xlabel('Cumulative Share of Population', fontsize=14)
+    ax.set_ylabel('Cumulative Share of Income', fontsize=14)
+    
+    # Format axes as percentages
+    ax.xaxis.set_major_formatter(mtick.PercentFormatter(1.0))
+    ax.yaxis.set_major_formatter(mtick.PercentFormatter(1.0))
+    
+    # Add text annotation with inequality metrics
+    textstr = (
+        f'Inequality Metrics:\n'
+        f'Gini Coefficient: {gini:.3f}\n'
+        f'Hoover Index: {hoover_idx:.3f}\n'
+        f'Atkinson Index (ε=0.5): {atkinson_idx:.3f}\n'
+        f'Theil Index: {theil_idx:.3f}\n'
+        f'P90/P10 Ratio: {percentiles["p90"]/percentiles["p10"]:.2f}\n'
+        f'P75/P25 Ratio: {percentiles["p75"]/percentiles["p25"]:.2f}\n'
+        f'P99/P50 Ratio: {percentiles["p99"]/percentiles["p50"]:.2f}\n'
+        f'Top 1% Min Salary: {percentiles["p99"]:,.0f} MAD'
+    )
+    
+    props = dict(boxstyle='round', facecolor='white', alpha=0.8)
+    ax.text(0.05, 0.95, textstr, transform=ax.transAxes, fontsize=10,
+        verticalalignment='top', bbox=props)
+    
+    # Add legend
+    ax.legend(loc='lower right')
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_income_deciles(data):
+    """Income share by decile"""
+    
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
+    # Create a bar chart showing income share by decile
+    deciles = data['income_deciles_df']
+    bars = ax.bar(deciles['decile'], deciles['income_share'] * 100,
+                color=sns.color_palette("viridis", len(deciles)))
+    
+    # Add values on top of bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.5,
+            f'{height:.1f}%', ha='center', va='bottom', rotation=0)
+    
+    ax.set_title('Income Share by Decile', fontsize=16)
+    ax.set_xlabel('Income Decile (1 = Lowest 10%, 10 = Highest 10%)', fontsize=14)
+    ax.set_ylabel('Share of Total Income (%)', fontsize=14)
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    
+    # Calculate top income concentration
+    top_10_percent = deciles[deciles['decile'] == 10]['income_share'].sum() * 100
+    top_20_percent = deciles[deciles['decile'] >= 9]['income_share'].sum() * 100
+    bottom_50_percent = deciles[deciles['decile'] <= 5]['income_share'].sum() * 100
+    
+    # Add a text box with stats
+    stats_text = (
+        f"Income Concentration:\n"
+        f"Top 10%: {top_10_percent:.1f}%\n"
+        f"Top 20%: {top_20_percent:.1f}%\n"
+        f"Bottom 50%: {bottom_50_percent:.1f}%\n"
+    )
+    
+    props = dict(boxstyle='round', facecolor='white', alpha=0.8)
+    ax.text(0.05, 0.95, stats_text, transform=ax.transAxes, fontsize=10,
+        verticalalignment='top', bbox=props)
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_company_sizes(data):
+    """Company size distribution"""
+    
+    # 5. Company size distribution
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
+    # Sort company size data by size range
+    company_sizes = data['company_size_df'].copy()
+    
+    # Create bar chart
+    bars = ax.bar(company_sizes['size_range'], company_sizes['company_count'],
+                 color=sns.color_palette("viridis", len(company_sizes)))
+    
+    # Add company counts as labels
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 5,
+               f'{int(height):,}', ha='center', va='bottom')
+    
+    ax.set_title('Distribution of Companies by Size', fontsize=16)
+    ax.set_xlabel('Company Size', fontsize=14)
+    ax.set_ylabel('Number of Companies', fontsize=14)
+    plt.xticks(rotation=45, ha='right')
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    
+    # Add a second y-axis for employee count
+    ax2 = ax.twinx()
+    ax2.plot(company_sizes['size_range'], company_sizes['employee_count'], 
+            'ro-', linewidth=2, markersize=6)
+    ax2.set_ylabel('Number of Employees', color='r', fontsize=14)
+    ax2.tick_params(axis='y', labelcolor='r')
+    
+    # Add employee counts as labels
+    for i, count in enumerate(company_sizes['employee_count']):
+        ax2.text(i, count + 0.05 * max(company_sizes['employee_count']),
+                f'{int(count):,}', ha='center', va='bottom', color='r')
+    
+    # Add summary text
+    summary_text = (
+        f"Total Companies: {company_sizes['company_count'].sum():,}\n"
+        f"Total Employees: {company_sizes['employee_count'].sum():,}\n"
+        f"Avg. Company Size: {company_sizes['employee_count'].sum() / company_sizes['company_count'].sum():.1f} employees"
+    )
+    
+    props = dict(boxstyle='round', facecolor='white', alpha=0.8)
+    ax.text(0.02, 0.98, summary_text, transform=ax.transAxes, fontsize=10,
+           verticalalignment='top', bbox=props)
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_cities_by_employees(data):
+    """Top 15 cities by employee count"""
+    
+    # 6. Top 15 cities by employee count
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
+    # Select top 15 cities by employee count
+    top_cities = data['city_df'].sort_values('employee_count', ascending=False).head(15)
+    top_cities = top_cities.sort_values('employee_count')  # For better viz
+    
+    # Create bar chart
+    bars = ax.barh(top_cities['city'], top_cities['employee_count'],
+                  color=sns.color_palette("viridis", len(top_cities)))
+    
+    # Add employee counts as labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.02 * max(top_cities['employee_count']), bar.get_y() + bar.get_height()/2.,
+               f'{int(width):,}', va='center')
+    
+    ax.set_title('Top 15 Cities by Number of Employees', fontsize=16)
+    ax.set_xlabel('Number of Employees', fontsize=14)
+    ax.set_ylabel('City', fontsize=14)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Add city stats
+    for i, city in enumerate(top_cities['city']):
+        avg_salary = top_cities.iloc[i]['avg_salary']
+        company_count = top_cities.iloc[i]['company_count']
+        ax.text(10, i - 0.25, 
+               f"Companies: {int(company_count):,} | Avg Salary: {int(avg_salary):,} MAD", 
+               fontsize=8, color='blue')
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_cities_by_salary(data):
+    """Top 15 cities by average salary"""
+    
+    # 7. Top 15 cities by average salary
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
+    # Select top 15 cities by average salary (with at least 100 employees)
+    top_salary_cities = data['city_df'][data['city_df']['employee_count'] >= 100]
+    top_salary_cities = top_salary_cities.sort_values('avg_salary', ascending=False).head(15)
+    top_salary_cities = top_salary_cities.sort_values('avg_salary')  # For better viz
+    
+    # Create bar chart
+    bars = ax.barh(top_salary_cities['city'], top_salary_cities['avg_salary'],
+                  color=sns.color_palette("viridis", len(top_salary_cities)))
+    
+    # Add salary values as labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.02 * max(top_salary_cities['avg_salary']), bar.get_y() + bar.get_height()/2.,
+               f'{int(width):,} MAD', va='center')
+    
+    ax.set_title('Top 15 Cities by Average Salary (Min 100 Employees)', fontsize=16)
+    ax.set_xlabel('Average Monthly Salary (MAD)', fontsize=14)
+    ax.set_ylabel('City', fontsize=14)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Add city stats
+    for i, city in enumerate(top_salary_cities['city']):
+        employee_count = top_salary_cities.iloc[i]['employee_count']
+        company_count = top_salary_cities.iloc[i]['company_count']
+        ax.text(10, i - 0.25, 
+               f"Employees: {int(employee_count):,} | Companies: {int(company_count):,}", 
+               fontsize=8, color='blue')
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_activities_by_employees(data):
+    """Top 15 activities by employee count"""
+    
+    # 8. Top 15 activities by employee count
+    fig, ax = plt.subplots(figsize=(14, 10))
+    
+    # Select top 15 activities by employee count
+    top_activities = data['activity_df'].sort_values('employee_count', ascending=False).head(15)
+    top_activities = top_activities.sort_values('employee_count')  # For better viz
+    
+    # Shorten activity names for better display
+    top_activities['short_name'] = top_activities['activity_description'].apply(
+        lambda x: x[:50] + '...' if len(x) > 50 else x
+    )
+    
+    # Create bar chart
+    bars = ax.barh(top_activities['short_name'], top_activities['employee_count'],
+                  color=sns.color_palette("viridis", len(top_activities)))
+    
+    # Add employee counts as labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.02 * max(top_activities['employee_count']), bar.get_y() + bar.get_height()/2.,
+               f'{int(width):,}', va='center')
+    
+    ax.set_title('Top 15 Business Activities by Number of Employees', fontsize=16)
+    ax.set_xlabel('Number of Employees', fontsize=14)
+    ax.set_ylabel('Business Activity', fontsize=14)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Add activity stats
+    for i, activity in enumerate(top_activities['short_name']):
+        avg_salary = top_activities.iloc[i]['avg_salary']
+        company_count = top_activities.iloc[i]['company_count']
+        ax.text(10, i - 0.25, 
+               f"Companies: {int(company_count):,} | Avg Salary: {int(avg_salary):,} MAD", 
+               fontsize=8, color='blue')
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_activities_by_salary(data):
+    """Top 15 activities by average salary"""
+    
+    # 9. Top 15 activities by average salary
+    fig, ax = plt.subplots(figsize=(14, 10))
+    
+    # Select top 15 activities by average salary (with at least 100 employees)
+    top_salary_activities = data['activity_df'][data['activity_df']['employee_count'] >= 100]
+    top_salary_activities = top_salary_activities.sort_values('avg_salary', ascending=False).head(15)
+    top_salary_activities = top_salary_activities.sort_values('avg_salary')  # For better viz
+    
+    # Shorten activity names for better display
+    top_salary_activities['short_name'] = top_salary_activities['activity_description'].apply(
+        lambda x: x[:50] + '...' if len(x) > 50 else x
+    )
+    
+    # Create bar chart
+    bars = ax.barh(top_salary_activities['short_name'], top_salary_activities['avg_salary'],
+                  color=sns.color_palette("viridis", len(top_salary_activities)))
+    
+    # Add salary values as labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.02 * max(top_salary_activities['avg_salary']), bar.get_y() + bar.get_height()/2.,
+               f'{int(width):,} MAD', va='center')
+    
+    ax.set_title('Top 15 Business Activities by Average Salary (Min 100 Employees)', fontsize=16)
+    ax.set_xlabel('Average Monthly Salary (MAD)', fontsize=14)
+    ax.set_ylabel('Business Activity', fontsize=14)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Add activity stats
+    for i, activity in enumerate(top_salary_activities['short_name']):
+        employee_count = top_salary_activities.iloc[i]['employee_count']
+        company_count = top_salary_activities.iloc[i]['company_count']
+        median = top_salary_activities.iloc[i]['median_salary']
+        ax.text(10, i - 0.25, 
+               f"Employees: {int(employee_count):,} | Companies: {int(company_count):,} | Median: {int(median):,} MAD", 
+               fontsize=8, color='blue')
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_city_mean_median(data):
+    """Mean/median comparison by city"""
+    
+    # 10. Mean/Median comparison by city
+    fig, ax = plt.subplots(figsize=(14, 10))
+    
+    # Select top 15 cities by employee count
+    top_mm_cities = data['city_df'].sort_values('employee_count', ascending=False).head(15)
+    top_mm_cities = top_mm_cities.copy()
+    
+    # Calculate mean/median ratio
+    top_mm_cities['mean_median_ratio'] = top_mm_cities['avg_salary'] / top_mm_cities['median_salary']
+    top_mm_cities = top_mm_cities.sort_values('mean_median_ratio', ascending=False)
+    
+    # Create bar chart
+    bars = ax.barh(top_mm_cities['city'], top_mm_cities['mean_median_ratio'],
+                  color=sns.color_palette("viridis", len(top_mm_cities)))
+    
+    # Add ratio values as labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.02, bar.get_y() + bar.get_height()/2.,
+               f'{width:.2f}', va='center')
+    
+    ax.set_title('Income Inequality: Mean/Median Ratio by City', fontsize=16)
+    ax.set_xlabel('Mean/Median Ratio (Higher = More Inequality)', fontsize=14)
+    ax.set_ylabel('City', fontsize=14)
+    ax.set_xlim(1, max(top_mm_cities['mean_median_ratio']) * 1.1)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Add city stats
+    for i, city in enumerate(top_mm_cities['city']):
+        avg = int(top_mm_cities.iloc[i]['avg_salary'])
+        median = int(top_mm_cities.iloc[i]['median_salary'])
+        employee_count = top_mm_cities.iloc[i]['employee_count']
+        ax.text(1.0, i - 0.25, 
+               f"Mean: {avg:,} MAD | Median: {median:,} MAD | Employees: {int(employee_count):,}", 
+               fontsize=8, color='blue')
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_city_variability(data):
+    """Coefficient of variation by city"""
+    
+    # 11. Standard deviation by city
+    fig, ax = plt.subplots(figsize=(14, 10))
+    
+    # Select top 15 cities by employee count
+    top_sd_cities = data['city_df'].sort_values('employee_count', ascending=False).head(15)
+    
+    # Calculate coefficient of variation (standardized measure of dispersion)
+    top_sd_cities['cv'] = top_sd_cities['stddev_salary'] / top_sd_cities['avg_salary']
+    top_sd_cities = top_sd_cities.sort_values('cv', ascending=False)
+    
+    # Create bar chart
+    bars = ax.barh(top_sd_cities['city'], top_sd_cities['cv'],
+                  color=sns.color_palette("viridis", len(top_sd_cities)))
+    
+    # Add CV values as labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.02, bar.get_y() + bar.get_height()/2.,
+               f'{width:.2f}', va='center')
+    
+    ax.set_title('Salary Variability: Coefficient of Variation by City', fontsize=16)
+    ax.set_xlabel('Coefficient of Variation (StdDev/Mean)', fontsize=14)
+    ax.set_ylabel('City', fontsize=14)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Add city stats
+    for i, city in enumerate(top_sd_cities['city']):
+        stddev = int(top_sd_cities.iloc[i]['stddev_salary'])
+        avg = int(top_sd_cities.iloc[i]['avg_salary'])
+        employee_count = top_sd_cities.iloc[i]['employee_count']
+        ax.text(0, i - 0.25, 
+               f"StdDev: {stddev:,} MAD | Mean: {avg:,} MAD | Employees: {int(employee_count):,}", 
+               fontsize=8, color='blue')
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_city_iqr(data):
+    """75th/25th percentile ratio by city"""
+    
+    # 12. Interquartile Range by city (measure of dispersion)
+    fig, ax = plt.subplots(figsize=(14, 10))
+    
+    # Select top 15 cities by employee count
+    top_iqr_cities = data['city_df'].sort_values('employee_count', ascending=False).head(15)
+    
+    # Calculate IQR and IQR ratio
+    top_iqr_cities['iqr'] = top_iqr_cities['p75_salary'] - top_iqr_cities['p25_salary']
+    top_iqr_cities['iqr_ratio'] = top_iqr_cities['p75_salary'] / top_iqr_cities['p25_salary']
+    top_iqr_cities = top_iqr_cities.sort_values('iqr_ratio', ascending=False)
+    
+    # Create bar chart
+    bars = ax.barh(top_iqr_cities['city'], top_iqr_cities['iqr_ratio'],
+                  color=sns.color_palette("viridis", len(top_iqr_cities)))
+    
+    # Add IQR ratio values as labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.1, bar.get_y() + bar.get_height()/2.,
+               f'{width:.2f}x', va='center')
+    
+    ax.set_title('Income Inequality: 75th/25th Percentile Ratio by City', fontsize=16)
+    ax.set_xlabel('75th/25th Percentile Ratio', fontsize=14)
+    ax.set_ylabel('City', fontsize=14)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Add city stats
+    for i, city in enumerate(top_iqr_cities['city']):
+        p25 = int(top_iqr_cities.iloc[i]['p25_salary'])
+        p75 = int(top_iqr_cities.iloc[i]['p75_salary'])
+        iqr = int(top_iqr_cities.iloc[i]['iqr'])
+        employee_count = top_iqr_cities.iloc[i]['employee_count']
+        ax.text(1.0, i - 0.25, 
+               f"25th: {p25:,} MAD | 75th: {p75:,} MAD | IQR: {iqr:,} MAD | Employees: {int(employee_count):,}", 
+               fontsize=8, color='blue')
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_city_inequality(data):
+    """Inequality measures and Lorenz curves by city"""
+    # 12b. Gini/Hoover/Atkinson/Theil and Lorenz curves by city (one grouped pass)
+    fig, (ax, lorenz_ax) = plt.subplots(1, 2, figsize=(16, 10), gridspec_kw={'width_ratios': [3, 2]})
+    
+    # Select top 15 cities by employee count
+    top_ineq_cities = data['city_df'].sort_values('employee_count', ascending=False).head(15)['city']
+    city_salaries = data['salary_df'][data['salary_df']['city'].isin(top_ineq_cities)]
+    codes, city_names = pd.factorize(city_salaries['city'])
+    measures = grouped_inequality(codes, city_salaries['salary_amount'], epsilon=0.5, lorenz_points=50)
+    city_ineq = pd.DataFrame({
+        'city': city_names[measures['groups']],
+        'gini': measures['gini'],
+        'hoover': measures['hoover'],
+        'atkinson': measures['atkinson'],
+        'theil': measures['theil'],
+    }).sort_values('gini', ascending=True)
+    
+    # Create bar chart
+    bars = ax.barh(city_ineq['city'], city_ineq['gini'],
+                  color=sns.color_palette("viridis", len(city_ineq)))
+    for bar, (_, row) in zip(bars, city_ineq.iterrows()):
+        ax.text(bar.get_width() + 0.005, bar.get_y() + bar.get_height()/2.,
+               f"{row['gini']:.3f}  (Hoover {row['hoover']:.2f}, Atkinson {row['atkinson']:.2f}, Theil {row['theil']:.2f})",
+               va='center', fontsize=8)
+    ax.set_title('Gini Coefficient by City', fontsize=16)
+    ax.set_xlabel('Gini Coefficient', fontsize=14)
+    ax.set_xlim(0, min(1, city_ineq['gini'].max() * 1.6 + 0.01))
+    ax.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Lorenz curves of the five largest cities
+    shares = np.linspace(0, 1, 51)
+    # The result arrays are aligned with measures['groups'] by position
+    for i, city in enumerate(city_names[measures['groups']]):
+        if city in list(top_ineq_cities.head(5)):
+            lorenz_ax.plot(shares, np.concatenate(([0], measures['lorenz'][i])), label=city)
+    lorenz_ax.plot([0, 1], [0, 1], 'k--', label='Perfect Equality')
+    lorenz_ax.set_title('Lorenz Curves (5 Largest Cities)', fontsize=16)
+    lorenz_ax.set_xlabel('Cumulative Share of Population', fontsize=12)
+    lorenz_ax.set_ylabel('Cumulative Share of Income', fontsize=12)
+    lorenz_ax.xaxis.set_major_formatter(mtick.PercentFormatter(1.0))
+    lorenz_ax.yaxis.set_major_formatter(mtick.PercentFormatter(1.0))
+    lorenz_ax.legend(fontsize=9)
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_companies_by_employees(data):
+    """Top 15 companies by employee count"""
+    # 13. Top 15 companies by employee count
+    fig, ax = plt.subplots(figsize=(14, 10))
+    
+    # Select top 15 companies by employee count
+    top_companies = data['company_df'].sort_values('employee_count', ascending=False).head(15)
+    top_companies = top_companies.sort_values('employee_count')  # For better viz
+    
+    # Create bar chart
+    bars = ax.barh(top_companies['company_name'], top_companies['employee_count'],
+                  color=sns.color_palette("viridis", len(top_companies)))
+    
+    # Add employee counts as labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.02 * max(top_companies['employee_count']), bar.get_y() + bar.get_height()/2.,
+               f'{int(width):,}', va='center')
+    
+    ax.set_title('Top 15 Companies by Number of Employees', fontsize=16)
+    ax.set_xlabel('Number of Employees', fontsize=14)
+    ax.set_ylabel('Company', fontsize=14)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Add company stats
+    for i, company in enumerate(top_companies['company_name']):
+        city = top_companies.iloc[i]['city'] or 'Unknown'
+        activity = top_companies.iloc[i]['activity_description']
+        if activity and len(activity) > 40:
+            activity = activity[:37] + '...'
+        avg_salary = int(top_companies.iloc[i]['avg_salary'])
+    
+        ax.text(10, i - 0.25, 
+               f"City: {city} | Activity: {activity} | Avg Salary: {avg_salary:,} MAD", 
+               fontsize=8, color='blue')
+    
+    plt.tight_layout()
+    
+    return fig
+
+def _page_companies_by_salary(data):
+    """Top 15 companies by average salary (min 30 employees)"""
+    
+    # 14. Top 15 companies by average salary (min 30 employees)
+    fig, ax = plt.subplots(figsize=(14, 10))
+    
+    # Select top 15 companies by average salary (with at least 30 employees)
+    top_salary_companies = data['company_df'][data['company_df']['employee_count'] >= 30]
+    top_salary_companies = top_salary_companies.sort_values('avg_salary', ascending=False).head(15)
+    top_salary_companies = top_salary_companies.sort_values('avg_salary')  # For better viz
+    
+    # Create bar chart
+    bars = ax.barh(top_salary_companies['company_name'], top_salary_companies['avg_salary'],
+                  color=sns.color_palette("viridis", len(top_salary_companies)))
+    
+    # Add salary values as labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.02 * max(top_salary_companies['avg_salary']), bar.get_y() + bar.get_height()/2.,
+               f'{int(width):,} MAD', va='center')
+    
+    ax.set_title('Top 15 Companies by Average Salary (Min 30 Employees)', fontsize=16)
+    ax.set_xlabel('Average Monthly Salary (MAD)', fontsize=14)
+    ax.set_ylabel('Company', fontsize=14)
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    
+    # Add company stats
+    for i, company in enumerate(top_salary_companies['company_name']):
+        city = top_salary_companies.iloc[i]['city'] or 'Unknown'
+        activity = top_salary_companies.iloc[i]['activity_description']
+        if activity and len(activity) > 40:
+            activity = activity[:37] + '...'
+        employee_count = top_salary_companies.iloc[i]['employee_count']
+        median = int(top_salary_companies.iloc[i]['median_salary'])
+    
+        ax.text(10, i - 0.25, 
+               f"City: {city} | Activity: {activity} | Employees: {int(employee_count):,} | Median: {median:,} MAD", 
+               fontsize=8, color='blue')
+    
+    plt.tight_layout()
+    
+    return fig
+
+REPORT_PAGES = [
+    _page_title,
+    _page_summary,
+    _page_salary_distribution,
+    _page_percentiles,
+    _page_lorenz_curve,
+    _page_income_deciles,
+    _page_company_sizes,
+    _page_cities_by_employees,
+    _page_cities_by_salary,
+    _page_activities_by_employees,
+    _page_activities_by_salary,
+    _page_city_mean_median,
+    _page_city_variability,
+    _page_city_iqr,
+    _page_city_inequality,
+    _page_companies_by_employees,
+    _page_companies_by_salary,
+]
+
+# Datasets each page reads. A page is re-rendered only when the content hash
+# of its inputs (or this module's code) changed since the cached render;
+# None means never cached (the title page carries the generation date)
+PAGE_INPUTS = {
+    '_page_title': None,
+    '_page_summary': ['percentiles_df', 'salary_df', 'inequality'],
+    '_page_salary_distribution': ['salary_dist_df', 'percentiles_df'],
+    '_page_percentiles': ['percentiles_df'],
+    '_page_lorenz_curve': ['percentiles_df', 'inequality'],
+    '_page_income_deciles': ['income_deciles_df'],
+    '_page_company_sizes': ['company_size_df'],
+    '_page_cities_by_employees': ['city_df'],
+    '_page_cities_by_salary': ['city_df'],
+    '_page_activities_by_employees': ['activity_df'],
+    '_page_activities_by_salary': ['activity_df'],
+    '_page_city_mean_median': ['city_df'],
+    '_page_city_variability': ['city_df'],
+    '_page_city_iqr': ['city_df'],
+    '_page_city_inequality': ['city_df', 'salary_df'],
+    '_page_companies_by_employees': ['company_df'],
+    '_page_companies_by_salary': ['company_df'],
+}
+
+# Rendered single-page PDFs of the last run plus manifest.json
+PAGE_CACHE_DIR = os.path.join(OUTPUT_DIR, '.pages')
+
+with open(__file__, 'rb') as _source:
+    _CODE_HASH = hashlib.sha1(_source.read()).hexdigest()
+
+def _update_hash(digest, value):
+    """Feed a dataset into `digest`; dataframe hashes ignore row order"""
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr([(c, str(t)) for c, t in value.dtypes.items()]).encode())
+        rows = pd.util.hash_pandas_object(value, index=False).to_numpy()
+        digest.update(np.array([len(rows), rows.sum(dtype=np.uint64)], dtype=np.uint64).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(repr(key).encode())
+            _update_hash(digest, value[key])
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        array = np.asarray(value)
+        digest.update(f"{array.dtype}{array.shape}".encode())
+        digest.update(array.tobytes())
+    else:
+        digest.update(repr(value).encode())
+
+def page_hash(page, data):
+    """Content hash of a page's inputs and the rendering code, or None if the page is never cached"""
+    inputs = PAGE_INPUTS[page.__name__]
+    if inputs is None:
+        return None
+    digest = hashlib.sha1(f"{_CODE_HASH}:{page.__name__}:{matplotlib.__version__}".encode())
+    for key in inputs:
+        digest.update(key.encode())
+        _update_hash(digest, data.get(key))
+    return digest.hexdigest()
+
+def _load_manifest():
+    """Page entries of the previous run ({name: {'hash', 'file', 'seconds', ...}})"""
+    try:
+        with open(os.path.join(PAGE_CACHE_DIR, 'manifest.json')) as f:
+            return json.load(f).get('pages', {})
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(pages, pdf_path):
+    with open(os.path.join(PAGE_CACHE_DIR, 'manifest.json'), 'w') as f:
+        json.dump({'report': pdf_path, 'generated_at': datetime.now().isoformat(timespec='seconds'),
+                   'pages': pages}, f, indent=2)
+
+def _render_page(page, data):
+    """Render one report page to single-page PDF bytes"""
+    fig = page(data)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='pdf')
+    plt.close(fig)
+    return buffer.getvalue()
+
+# Report data of a worker process, set once by _init_worker instead of being
+# pickled with every task
+_worker_data = None
+
+def _init_worker(data):
+    """Pool initializer: keep the report data and render off-screen"""
+    global _worker_data
+    _worker_data = data
+    plt.switch_backend('Agg')
+
+def _render_page_task(index):
+    """Render REPORT_PAGES[index] in a worker; returns (index, pdf bytes, seconds)"""
+    start = time.perf_counter()
+    content = _render_page(REPORT_PAGES[index], _worker_data)
+    return index, content, time.perf_counter() - start
+
+def _render_pages(indexes, data, workers):
+    """Render the given pages, in a process pool when workers > 1; returns [(index, pdf bytes, seconds)]"""
+    if workers > 1 and len(indexes) > 1:
+        # fork shares the already-fetched data with the workers for free
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        max_workers = min(workers, len(indexes))
+        print(f"Rendering {len(indexes)} pages with {max_workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(data,)) as pool:
+            return list(pool.map(_render_page_task, indexes))
+    
+    rendered = []
+    for index in indexes:
+        start = time.perf_counter()
+        content = _render_page(REPORT_PAGES[index], data)
+        rendered.append((index, content, time.perf_counter() - start))
+    return rendered
+
+def create_report_pdf(data, workers=REPORT_WORKERS):
+    """
+    Generate a comprehensive PDF report with all analyses.
+
+    Pages are rendered to single-page PDFs and merged in page order (needs
+    the optional pypdf package). A page whose inputs hash the same as in the
+    previous run reuses its cached PDF from PAGE_CACHE_DIR; the others are
+    rendered, in a process pool when workers > 1. The manifest records each
+    page's hash and render time. Without pypdf every page is rendered one
+    after the other into a single PdfPages file.
+    """
+    print("Generating PDF report...")
+    start = time.perf_counter()
+    
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pdf_path = f"{OUTPUT_DIR}/cnss_salary_analysis_{timestamp}.pdf"
+    
+    _ensure_inequality(data)
+    
+    if PdfWriter is None:
+        with PdfPages(pdf_path) as pdf:
+            for page in REPORT_PAGES:
+                fig = page(data)
+                pdf.savefig(fig)
+                plt.close(fig)
+        print(f"Rendered {len(REPORT_PAGES)} pages in {time.perf_counter() - start:.2f}s")
+        print(f"PDF report saved to {pdf_path}")
+        return pdf_path
+    
+    os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+    previous = _load_manifest()
+    manifest = {}
+    contents = {}
+    for index, page in enumerate(REPORT_PAGES):
+        name = page.__name__[len('_page_'):]
+        digest = page_hash(page, data)
+        entry = previous.get(name, {})
+        path = os.path.join(PAGE_CACHE_DIR, f"{name}.pdf")
+        if digest is not None and entry.get('hash') == digest and os.path.exists(path):
+            with open(path, 'rb') as f:
+                contents[index] = f.read()
+            manifest[name] = dict(entry, reused=True)
+        else:
+            manifest[name] = {'hash': digest, 'file': f"{name}.pdf", 'reused': False}
+    
+    stale = [index for index in range(len(REPORT_PAGES)) if index not in contents]
+    for index, content, seconds in _render_pages(stale, data, workers):
+        name = REPORT_PAGES[index].__name__[len('_page_'):]
+        with open(os.path.join(PAGE_CACHE_DIR, manifest[name]['file']), 'wb') as f:
+            f.write(content)
+        contents[index] = content
+        manifest[name]['seconds'] = round(seconds, 3)
+        print(f"  {name}: {seconds:.2f}s")
+    
+    writer = PdfWriter()
+    for index in range(len(REPORT_PAGES)):
+        writer.append(io.BytesIO(contents[index]))
+    with open(pdf_path, 'wb') as f:
+        writer.write(f)
+    _save_manifest(manifest, pdf_path)
     
+    print(f"Rendered {len(stale)} of {len(REPORT_PAGES)} pages ({len(REPORT_PAGES) - len(stale)} unchanged) "
+          f"in {time.perf_counter() - start:.2f}s")
     print(f"PDF report saved to {pdf_path}")
     return pdf_path
 
@@ -0,0 +1,210 @@
+"""
+Before/after benchmark of the salary_records indexes of sql/Indexes.sql.
+
+A generated dataset of the requested size is built in a scratch schema
+(index_bench, dropped at the end unless --keep), so the real tables are never
+touched. The queries the app actually sends (search pages from
+src.query_builder, the single-pass statement of src.stats) run under
+EXPLAIN ANALYZE, first with the previous single-column indexes and then with
+the B-tree indexes of sql/Indexes.sql. For each query it prints the median
+execution time of both index sets and the scans the plan used; --plans
+prints the full plans too.
+
+    python -m src.index_benchmark [ROWS] [--keep] [--plans]
+"""
+import json
+import os
+import re
+import statistics
+import sys
+
+from src.query_builder import parse_filters, plan_query, search_query, employee_count_expr
+from src.stats import build_stats_query
+
+SCHEMA = 'index_bench'
+RUNS = 5
+
+CITIES = ['Casablanca', 'Rabat', 'Marrakech', 'Fes', 'Tanger', 'Agadir', 'Meknes', 'Oujda', 'Kenitra',
+          'Tetouan', 'Safi', 'El Jadida']
+
+# Dataset: ~100 records per company (skewed towards low ids), one per employee,
+# log-normal salaries around 5,400 MAD
+GENERATE_DATA = [
+    """CREATE TABLE companies (
+        company_id INTEGER PRIMARY KEY, company_name VARCHAR(255) NOT NULL,
+        activity_description TEXT, city VARCHAR(100))""",
+    """CREATE TABLE employees (employee_id INTEGER PRIMARY KEY, full_name VARCHAR(255) NOT NULL)""",
+    """CREATE TABLE documents (
+        document_id INTEGER PRIMARY KEY, filename VARCHAR(255) NOT NULL,
+        company_id INTEGER REFERENCES companies, employee_count INTEGER, total_salary_mass DECIMAL(15, 2))""",
+    """CREATE TABLE salary_records (
+        record_id INTEGER PRIMARY KEY, employee_id INTEGER REFERENCES employees,
+        company_id INTEGER REFERENCES companies, document_id INTEGER REFERENCES documents,
+        salary_amount DECIMAL(15, 2))""",
+    "SELECT setseed(0.42)",
+    """INSERT INTO companies
+       SELECT i, 'Company ' || i, 'Activity ' || (i %% 40),
+              (%(cities)s)[1 + i %% array_length(%(cities)s, 1)]
+       FROM generate_series(1, %(companies)s) i""",
+    """INSERT INTO employees SELECT i, 'Employee ' || i FROM generate_series(1, %(rows)s) i""",
+    """INSERT INTO documents SELECT i, 'declaration-' || i || '.pdf', i FROM generate_series(1, %(companies)s) i""",
+    """INSERT INTO salary_records
+       SELECT i, i, company_id, company_id,
+              round(exp(8.6 + 0.7 * sqrt(-2 * ln(1 - random())) * cos(2 * pi() * random()))::numeric, 2)
+       FROM (SELECT i, 1 + floor(power(random(), 2) * %(companies)s)::int AS company_id
+             FROM generate_series(1, %(rows)s) i) r""",
+]
+
+# What sql/Indexes.sql created on these tables before the tuned indexes
+BASELINE_INDEXES = [
+    "CREATE INDEX idx_company_city ON companies (lower(city))",
+    "CREATE INDEX idx_salary_amount ON salary_records (salary_amount)",
+    "CREATE INDEX idx_document_company ON documents (company_id)",
+    "CREATE INDEX idx_salary_employee ON salary_records (employee_id)",
+    "CREATE INDEX idx_salary_company ON salary_records (company_id)",
+    "CREATE INDEX idx_salary_document ON salary_records (document_id)",
+]
+
+INDEXES_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql', 'Indexes.sql')
+
+
+def tuned_indexes(path=INDEXES_SQL):
+    """B-tree CREATE INDEX statements of sql/Indexes.sql (the trigram ones need pg_trgm and do not change)"""
+    with open(path, encoding='utf-8') as f:
+        text = re.sub(r'--[^\n]*', '', f.read())
+    statements = [' '.join(part.split()) for part in text.split(';')]
+    return [s for s in statements if s.upper().startswith('CREATE INDEX') and 'USING GIN' not in s.upper()]
+
+
+def benchmark_queries(cursor):
+    """Name -> (SQL, params) of the app queries to time (pages of 100 rows, fetched as 101 like /api/search)"""
+    unfiltered = parse_filters({})
+    # Where the 50th page of 100 rows starts
+    cursor.execute("SELECT salary_amount, record_id FROM salary_records "
+                   "ORDER BY salary_amount DESC, record_id OFFSET 4900 LIMIT 1")
+    salary, record_id = cursor.fetchone()
+
+    page = 101
+    queries = {
+        'search, first page': search_query(unfiltered, limit=page),
+        'search, page 50 (keyset)': search_query(unfiltered, keyset=[salary, salary, salary, record_id], limit=page),
+        'search, page 50 of a city': search_query(parse_filters({'city': 'Rabat'}),
+                                                  keyset=[salary, salary, salary, record_id], limit=page),
+        'search, 10K-20K MAD': search_query(parse_filters({'min_salary': 10000, 'max_salary': 20000}), limit=page),
+        'search, one city': search_query(parse_filters({'city': 'Rabat'}), limit=page),
+        'search, one company': search_query(parse_filters({'company_name': 'Company 1234'}), limit=page),
+    }
+    stats_sections = ['city_stats', 'activity_stats', 'salary_distribution', 'top_companies']
+    for name, filters in [('stats, one company', {'company_name': 'Company 1234'}),
+                          ('stats, 10K-20K MAD', {'min_salary': 10000, 'max_salary': 20000})]:
+        from_clause, where_clause, params = plan_query(parse_filters(filters), required_tables={'c'})
+        query = build_stats_query(from_clause, where_clause, employee_count_expr(False), stats_sections)
+        queries[name] = (query, params)
+    return queries
+
+
+def _scans(plan):
+    """Scan nodes of a JSON plan tree, e.g. 'Index Only Scan idx_salary_search'"""
+    found = []
+    if 'Scan' in plan['Node Type']:
+        found.append(' '.join(filter(None, [plan['Node Type'], plan.get('Index Name') or plan.get('Relation Name')])))
+    for child in plan.get('Plans', []):
+        found.extend(_scans(child))
+    return found
+
+
+def measure(cursor, query, params, runs=RUNS):
+    """
+    EXPLAIN ANALYZE a query `runs` times. Returns the median execution time
+    (ms), the shared buffers the plan touched (stable where warm-cache timings
+    are noisy), the scans it used and the text plan.
+    """
+    times = []
+    for _ in range(runs):
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+        result = cursor.fetchone()[0]
+        result = result[0] if isinstance(result, list) else json.loads(result)[0]
+        times.append(result['Execution Time'])
+    plan = result['Plan']
+    buffers = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+    text_plan = '\n'.join(row[0] for row in cursor.fetchall())
+    return statistics.median(times), buffers, sorted(set(_scans(plan))), text_plan
+
+
+def use_indexes(conn, statements):
+    """Replace the scratch tables' secondary indexes with `statements`, then VACUUM ANALYZE"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT i.indexrelid::regclass::text FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE n.nspname = %s AND NOT i.indisprimary
+    """, [SCHEMA])
+    for (index,) in cursor.fetchall():
+        cursor.execute(f"DROP INDEX {index}")
+    for statement in statements:
+        cursor.execute(statement)
+    # Visibility map for index-only scans, fresh statistics for the planner
+    cursor.execute("VACUUM ANALYZE companies, employees, documents, salary_records")
+    cursor.execute("""
+        SELECT COALESCE(SUM(pg_relation_size(i.indexrelid)), 0) FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        WHERE t.relname = 'salary_records' AND t.relnamespace = %s::regnamespace
+    """, [SCHEMA])
+    size = int(cursor.fetchone()[0])
+    cursor.close()
+    return size
+
+
+def run(conn, rows, show_plans=False, keep=False):
+    """Build the scratch dataset and compare both index sets; returns {query: {phase: (ms, buffers)}}"""
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    # Unqualified names in the app's queries now resolve to the scratch tables
+    cursor.execute(f"SET search_path = {SCHEMA}, public")
+    try:
+        print(f"Generating {rows:,} salary records in schema {SCHEMA}...")
+        values = {'rows': rows, 'companies': max(rows // 100, 1), 'cities': CITIES}
+        for statement in GENERATE_DATA:
+            cursor.execute(statement, values if '%(' in statement else None)
+
+        queries = benchmark_queries(cursor)
+        results = {}
+        for phase, statements in [('before', BASELINE_INDEXES), ('after', tuned_indexes())]:
+            size = use_indexes(conn, statements)
+            print(f"\n== {phase}: salary_records indexes {size / 1e6:,.1f} MB")
+            for name, (query, params) in queries.items():
+                ms, buffers, scans, text_plan = measure(cursor, query, params)
+                results.setdefault(name, {})[phase] = (ms, buffers)
+                print(f"{name:<26} {ms:>10.2f} ms {buffers:>8,} buffers   {', '.join(scans)}")
+                if show_plans:
+                    print(text_plan + '\n')
+
+        print(f"\n{'query':<26} {'before ms':>10} {'after ms':>10} {'speedup':>8} "
+              f"{'buffers before':>15} {'after':>8}")
+        for name, timing in results.items():
+            (before, buffers_before), (after, buffers_after) = timing['before'], timing['after']
+            print(f"{name:<26} {before:>10.2f} {after:>10.2f} {before / after if after else 0:>7.1f}x "
+                  f"{buffers_before:>15,} {buffers_after:>8,}")
+        return results
+    finally:
+        if not keep:
+            cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        cursor.close()
+
+
+if __name__ == "__main__":
+    from config import DB_CONFIG
+    import psycopg2
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    rows = int(args[0]) if args else 1000000
+    # A dedicated connection: the benchmark changes search_path and autocommit
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        run(conn, rows, show_plans='--plans' in sys.argv, keep='--keep' in sys.argv)
+    finally:
+        conn.close()
@@ -0,0 +1,348 @@
+"""
+Income inequality measures: Gini, Hoover, Atkinson and Theil.
+
+Two modes:
+- inequality_metrics() is exact. It makes one sorted float64 copy of the
+  input (none if it is already sorted) and derives every measure from it,
+  walking it in fixed-size blocks so no other full-length temporaries exist.
+- StreamingInequality consumes the salaries chunk by chunk and keeps only a
+  log-spaced histogram (per-bin counts and sums) plus running power sums, so
+  memory does not grow with the population. Atkinson and Theil are exact;
+  Gini and Hoover come with an error bound derived from the bin widths.
+"""
+import math
+
+import numpy as np
+
+# Elements processed per block when walking a full-length buffer
+BLOCK_SIZE = 1 << 20
+
+
+def _prepare(values, presorted=False):
+    """One sorted float64 copy of the input (no copy if it already is one and presorted)"""
+    array = np.asarray(values, dtype=np.float64).ravel()
+    if not presorted:
+        array = np.sort(array)
+    return array
+
+
+def inequality_metrics(values, epsilon=0.5, presorted=False):
+    """
+    Compute Gini, Hoover, Atkinson(epsilon) and Theil T in one pass over one sorted buffer.
+
+    Gini shifts negative inputs so the minimum is zero; Atkinson and Theil
+    are defined on the positive values only. Returns a dict with `count`,
+    `mean`, `gini`, `hoover`, `atkinson` and `theil`.
+    """
+    x = _prepare(values, presorted)
+    n = len(x)
+    result = {'count': n, 'mean': 0.0, 'gini': 0.0, 'hoover': 0.0, 'atkinson': 0.0, 'theil': 0.0}
+    if n == 0:
+        return result
+
+    shift = -x[0] if x[0] < 0 else 0.0
+    first_positive = int(np.searchsorted(x, 0.0, side='right'))
+
+    # Running sums over the sorted buffer, block by block
+    total = 0.0
+    weighted = 0.0          # sum of rank * value (ranks from 1)
+    positive_total = 0.0
+    power_sum = 0.0         # sum of x ** (1 - epsilon) over positive x
+    log_sum = 0.0           # sum of log(x) over positive x
+    xlogx_sum = 0.0         # sum of x * log(x) over positive x
+    for start in range(0, n, BLOCK_SIZE):
+        block = x[start:start + BLOCK_SIZE]
+        ranks = np.arange(start + 1, start + len(block) + 1, dtype=np.float64)
+        total += block.sum()
+        weighted += np.dot(ranks, block)
+
+        positive = block[max(first_positive - start, 0):]
+        if len(positive):
+            logs = np.log(positive)
+            positive_total += positive.sum()
+            log_sum += logs.sum()
+            xlogx_sum += np.dot(positive, logs)
+            if epsilon != 1:
+                power_sum += np.power(positive, 1 - epsilon).sum()
+
+    mean = total / n
+    result['mean'] = mean
+
+    # Gini on the sorted values: sum((2i - n - 1) * x_i) / (n * sum(x))
+    shifted_total = total + shift * n
+    if shifted_total > 0:
+        shifted_weighted = weighted + shift * n * (n + 1) / 2
+        result['gini'] = (2 * shifted_weighted - (n + 1) * shifted_total) / (n * shifted_total)
+
+    # Hoover: the values below the mean are a prefix of the sorted buffer
+    if total != 0:
+        below = int(np.searchsorted(x, mean, side='left'))
+        below_total = x[:below].sum()
+        absolute_deviation = (mean * below - below_total) + (total - below_total - mean * (n - below))
+        result['hoover'] = absolute_deviation / (2 * total)
+
+    m = n - first_positive
+    if m:
+        positive_mean = positive_total / m
+        result['atkinson'] = _atkinson(positive_mean, m, epsilon, power_sum, log_sum)
+        result['theil'] = xlogx_sum / positive_total - math.log(positive_mean)
+    return {key: value if key == 'count' else float(value) for key, value in result.items()}
+
+
+def _atkinson(mean, count, epsilon, power_sum, log_sum):
+    """Atkinson index from the positive values' mean and power sums"""
+    if epsilon == 1:
+        return 1 - math.exp(log_sum / count) / mean
+    return 1 - (power_sum / count) ** (1 / (1 - epsilon)) / mean
+
+
+def calculate_gini(array):
+    """Calculate the Gini coefficient of an array (measure of inequality, 0 is total equality, 1 is total inequality)"""
+    return inequality_metrics(array)['gini']
+
+
+def calculate_hoover_index(array):
+    """Calculate the Hoover index (Robin Hood index) - represents proportion of total income that would need
+    to be redistributed to achieve equality"""
+    return inequality_metrics(array)['hoover']
+
+
+def calculate_atkinson_index(array, epsilon=0.5):
+    """Calculate the Atkinson index with inequality aversion parameter epsilon"""
+    return inequality_metrics(array, epsilon=epsilon)['atkinson']
+
+
+def calculate_theil_index(array):
+    """Calculate the Theil T index (0 is total equality, ln(n) is one person earning everything)"""
+    return inequality_metrics(array)['theil']
+
+
+def grouped_inequality(codes, values, epsilon=0.5, lorenz_points=0):
+    """
+    Gini, Hoover, Atkinson and Theil for every group in one vectorized pass.
+
+    `codes` labels each value with its group (any integer codes). Rows are
+    sorted once by (group, value), after which each group is a contiguous
+    sorted run and every measure is a segmented reduction (np.add.reduceat)
+    over the runs. With `lorenz_points` = K, also returns each group's Lorenz
+    curve sampled at population shares 1/K .. K/K (linear interpolation).
+
+    Returns a dict of arrays aligned with `groups` (sorted distinct codes):
+    groups, count, mean, gini, hoover, atkinson, theil [, lorenz].
+    """
+    codes = np.asarray(codes).ravel()
+    values = np.asarray(values, dtype=np.float64).ravel()
+    order = np.lexsort((values, codes))
+    x, g = values[order], codes[order]
+
+    groups, starts, counts = np.unique(g, return_index=True, return_counts=True)
+    result = {'groups': groups, 'count': counts}
+    if len(groups) == 0:
+        for key in ('mean', 'gini', 'hoover', 'atkinson', 'theil'):
+            result[key] = np.zeros(0)
+        if lorenz_points:
+            result['lorenz'] = np.zeros((0, lorenz_points))
+        return result
+
+    def segment_sum(array):
+        return np.add.reduceat(array, starts)
+
+    totals = segment_sum(x)
+    mean = totals / counts
+    result['mean'] = mean
+    valid = totals > 0
+    safe_totals = np.where(valid, totals, 1.0)
+
+    # Gini from within-group ranks: sum((2r - n - 1) * x) / (n * sum(x))
+    ranks = np.arange(1, len(x) + 1, dtype=np.float64) - np.repeat(starts, counts)
+    weighted = segment_sum(ranks * x)
+    result['gini'] = np.where(valid, (2 * weighted - (counts + 1) * totals) / (counts * safe_totals), 0.0)
+
+    # Hoover: sum |x - group mean| / (2 * sum(x))
+    deviation = segment_sum(np.abs(x - np.repeat(mean, counts)))
+    result['hoover'] = np.where(valid, deviation / (2 * safe_totals), 0.0)
+
+    # Atkinson and Theil over the positive values of each group
+    positive = x > 0
+    logs = np.log(np.where(positive, x, 1.0))
+    m = segment_sum(positive.astype(np.float64))
+    positive_totals = segment_sum(np.where(positive, x, 0.0))
+    has_positive = m > 0
+    safe_m = np.where(has_positive, m, 1.0)
+    positive_mean = np.where(has_positive, positive_totals / safe_m, 1.0)
+    if epsilon == 1:
+        equally_distributed = np.exp(segment_sum(logs) / safe_m)
+    else:
+        power = segment_sum(np.where(positive, np.power(np.where(positive, x, 1.0), 1 - epsilon), 0.0))
+        equally_distributed = np.power(power / safe_m, 1 / (1 - epsilon))
+    result['atkinson'] = np.where(has_positive, 1 - equally_distributed / positive_mean, 0.0)
+    xlogx = segment_sum(x * logs)
+    result['theil'] = np.where(
+        has_positive,
+        xlogx / np.where(has_positive, positive_totals, 1.0) - np.log(positive_mean),
+        0.0,
+    )
+
+    if lorenz_points:
+        # Lorenz curve through (i/n, C_i/S) with C_i the within-group cumulative sum
+        cumulative = np.cumsum(x)
+        offsets = np.repeat(cumulative[starts] - x[starts], counts)
+        within = cumulative - offsets
+        shares = np.arange(1, lorenz_points + 1) / lorenz_points
+        position = shares[None, :] * counts[:, None]            # fractional rank t
+        whole = np.minimum(np.floor(position).astype(np.int64), counts[:, None] - 1)
+        base = np.where(whole > 0, within[starts[:, None] + np.maximum(whole - 1, 0)], 0.0)
+        partial = (position - whole) * x[starts[:, None] + whole]
+        result['lorenz'] = (base + partial) / safe_totals[:, None]
+    return result
+
+
+def gini_by(codes, values):
+    """Gini coefficient per group: (sorted distinct codes, gini array)"""
+    result = grouped_inequality(codes, values)
+    return result['groups'], result['gini']
+
+
+class StreamingInequality:
+    """
+    Bounded-memory inequality measures over salaries fed in chunks.
+
+    Values are binned on a log scale between `lower` and `upper` with
+    `bins_per_decade` bins per factor of ten (values outside go to an
+    underflow/overflow bin). Each bin keeps its exact count and sum, and the
+    power sums Atkinson and Theil need are accumulated exactly. Only Gini and
+    Hoover depend on the order of values within a bin; result() reports how
+    far they can be off.
+    """
+
+    def __init__(self, lower=1.0, upper=1e9, bins_per_decade=200, epsilon=0.5):
+        decades = math.log10(upper / lower)
+        self.edges = np.logspace(math.log10(lower), math.log10(upper),
+                                 int(math.ceil(decades * bins_per_decade)) + 1)
+        self.epsilon = epsilon
+        # Bin 0 is [-inf, lower), the last bin is [upper, inf)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.sums = np.zeros(len(self.edges) + 1, dtype=np.float64)
+        self.low = math.inf
+        self.high = -math.inf
+        self.positive_count = 0
+        self.positive_total = 0.0
+        self.power_sum = 0.0
+        self.log_sum = 0.0
+        self.xlogx_sum = 0.0
+
+    def update(self, chunk):
+        """Add a chunk of salaries"""
+        x = np.asarray(chunk, dtype=np.float64).ravel()
+        if not len(x):
+            return
+        bins = np.searchsorted(self.edges, x, side='right')
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+        self.sums += np.bincount(bins, weights=x, minlength=len(self.sums))
+        self.low = min(self.low, float(x.min()))
+        self.high = max(self.high, float(x.max()))
+
+        positive = x[x > 0]
+        if len(positive):
+            logs = np.log(positive)
+            self.positive_count += len(positive)
+            self.positive_total += float(positive.sum())
+            self.log_sum += float(logs.sum())
+            self.xlogx_sum += float(np.dot(positive, logs))
+            if self.epsilon != 1:
+                self.power_sum += float(np.power(positive, 1 - self.epsilon).sum())
+
+    def _bin_bounds(self):
+        """Lower and upper value bound of every bin, clipped to the observed range"""
+        lows = np.concatenate(([self.low], self.edges))
+        highs = np.concatenate((self.edges, [self.high]))
+        return np.maximum(lows, self.low), np.minimum(highs, self.high)
+
+    def result(self):
+        """Measures for everything seen so far, plus `gini_error` and `hoover_error` bounds"""
+        n = int(self.counts.sum())
+        total = float(self.sums.sum())
+        result = {'count': n, 'mean': 0.0, 'gini': 0.0, 'hoover': 0.0, 'atkinson': 0.0,
+                  'theil': 0.0, 'gini_error': 0.0, 'hoover_error': 0.0}
+        if n == 0:
+            return result
+        mean = total / n
+        result['mean'] = mean
+
+        occupied = self.counts > 0
+        counts = self.counts[occupied].astype(np.float64)
+        sums = self.sums[occupied]
+        lows, highs = (bound[occupied] for bound in self._bin_bounds())
+
+        if self.low >= 0 and total > 0:
+            # Between-bin Gini from the Lorenz curve through the bin endpoints
+            # (exact up to the inequality inside each bin, which is ignored)
+            shares = sums / total
+            lorenz = np.cumsum(shares)
+            previous = np.concatenate(([0.0], lorenz[:-1]))
+            between = 1 - float(np.dot(counts / n, previous + lorenz))
+            # Within-bin terms: (n_b/n) * (S_b/S) * G_b, with G_b <= (high - low) / (4 low);
+            # the true value lies in [between, between + bound], report the midpoint
+            within = np.where(lows > 0, (highs - lows) / (4 * np.where(lows > 0, lows, 1)), 1.0)
+            bound = float(np.dot(counts / n * shares, np.minimum(within, 1.0)))
+            result['gini'] = between + bound / 2
+            result['gini_error'] = bound / 2
+
+        if total != 0:
+            # Bins entirely below/above the mean contribute exactly; only the
+            # bin straddling the mean is uncertain
+            below = highs <= mean
+            above = lows >= mean
+            straddle = ~(below | above)
+            deviation = (mean * counts[below] - sums[below]).sum() + (sums[above] - mean * counts[above]).sum()
+            # Straddling bin: |x - mean| summed is between |S_b - mean n_b| and the width times n_b
+            straddle_low = np.abs(sums[straddle] - mean * counts[straddle]).sum()
+            straddle_high = (np.maximum(mean - lows[straddle], highs[straddle] - mean) * counts[straddle]).sum()
+            result['hoover'] = float(deviation + (straddle_low + straddle_high) / 2) / (2 * total)
+            result['hoover_error'] = float((straddle_high - straddle_low) / 2) / (2 * abs(total))
+
+        if self.positive_count:
+            positive_mean = self.positive_total / self.positive_count
+            result['atkinson'] = _atkinson(positive_mean, self.positive_count, self.epsilon,
+                                           self.power_sum, self.log_sum)
+            result['theil'] = self.xlogx_sum / self.positive_total - math.log(positive_mean)
+        return result
+
+
+def streaming_inequality_metrics(chunks, **kwargs):
+    """Run StreamingInequality over an iterable of salary chunks"""
+    stream = StreamingInequality(**kwargs)
+    for chunk in chunks:
+        stream.update(chunk)
+    return stream.result()
+
+
+def salary_chunks(conn, query="SELECT salary_amount::float8 FROM salary_records WHERE salary_amount >= 1",
+                  batch_size=100000):
+    """Yield salaries from the database as float64 arrays, `batch_size` rows at a time"""
+    cursor = conn.cursor(name='salary_chunks')
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield np.fromiter((row[0] for row in rows), dtype=np.float64, count=len(rows))
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    import time
+    from src.db import pooled_connection
+
+    # National figures, streamed (bounded memory) and exact for comparison
+    with pooled_connection() as conn:
+        start = time.perf_counter()
+        approx = streaming_inequality_metrics(salary_chunks(conn))
+        print(f"Streaming ({time.perf_counter() - start:.2f}s): {approx}")
+
+        start = time.perf_counter()
+        exact = inequality_metrics(np.concatenate(list(salary_chunks(conn))))
+        print(f"Exact ({time.perf_counter() - start:.2f}s): {exact}")
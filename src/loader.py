@@ -0,0 +1,218 @@
+"""
+Bulk loader for parsed salary declarations.
+
+Each batch runs in one transaction: the rows are COPYed into the unlogged
+staging_salary_rows table, new companies and employees are inserted set-wise
+with ON CONFLICT DO NOTHING on their natural keys (company name and city;
+CNSS registration number, or full name for rows without one), and one
+statement creates a document per file and moves the rows into salary_records. A file whose name or content hash is already in
+documents is skipped along with its rows, so loading the same declarations
+twice does not duplicate them. TRUNCATE locks the staging table until
+the batch commits, so concurrent loaders take turns instead of mixing rows.
+
+After the last batch the materialized views touched by the new documents
+are refreshed and the data version is bumped, which retires cached API
+responses.
+"""
+import csv
+import io
+import time
+from collections.abc import Mapping
+
+from src.cache import bump_data_version
+from src.extract import NULL_MARKER
+from src.matviews import refresh_materialized_views
+
+# Fields of a parsed declaration row, in staging_salary_rows column order.
+# The trailing content_hash and file_size (see src.registry) and the employee's
+# CNSS registration number are optional.
+LOAD_COLUMNS = ['filename', 'company_name', 'activity_description', 'city', 'full_name', 'salary_amount',
+                'content_hash', 'file_size', 'cnss_number']
+
+INSERT_COMPANIES = """
+    INSERT INTO companies (company_name, activity_description, city)
+    SELECT DISTINCT ON (company_name, COALESCE(city, '')) company_name, activity_description, city
+    FROM staging_salary_rows
+    ORDER BY company_name, COALESCE(city, ''), activity_description NULLS LAST
+    ON CONFLICT (company_name, COALESCE(city, '')) DO NOTHING
+"""
+
+# Employees are keyed on their registration number, so namesakes stay apart;
+# the first name seen for a number is kept
+INSERT_EMPLOYEES = """
+    INSERT INTO employees (cnss_number, full_name)
+    SELECT DISTINCT ON (cnss_number) cnss_number, full_name
+    FROM staging_salary_rows
+    WHERE cnss_number IS NOT NULL
+    ORDER BY cnss_number, full_name
+    ON CONFLICT (cnss_number) DO NOTHING
+"""
+
+# Rows without a registration number fall back to the full name
+INSERT_UNNUMBERED_EMPLOYEES = """
+    INSERT INTO employees (full_name)
+    SELECT DISTINCT full_name FROM staging_salary_rows
+    WHERE cnss_number IS NULL
+    ON CONFLICT (full_name) WHERE cnss_number IS NULL DO NOTHING
+"""
+
+# Documents and salary records in one statement; returns the new documents
+# with their record counts.
+# Files already registered (same filename or content hash) get no document,
+# and without one their rows are not inserted either.
+INSERT_FACTS = """
+    WITH staged AS (
+        SELECT st.filename, st.salary_amount, st.content_hash, st.file_size, c.company_id,
+               COALESCE(en.employee_id, ef.employee_id) AS employee_id
+        FROM staging_salary_rows st
+        JOIN companies c ON c.company_name = st.company_name AND COALESCE(c.city, '') = COALESCE(st.city, '')
+        LEFT JOIN employees en ON en.cnss_number = st.cnss_number
+        LEFT JOIN employees ef ON st.cnss_number IS NULL AND ef.cnss_number IS NULL
+                              AND ef.full_name = st.full_name
+    ),
+    new_documents AS (
+        INSERT INTO documents (filename, company_id, employee_count, total_salary_mass, content_hash, file_size)
+        SELECT filename, company_id, COUNT(*), SUM(salary_amount), MAX(content_hash), MAX(file_size)
+        FROM staged
+        GROUP BY filename, company_id
+        ON CONFLICT DO NOTHING
+        RETURNING document_id, filename, company_id, employee_count
+    ),
+    new_records AS (
+        INSERT INTO salary_records (employee_id, company_id, document_id, salary_amount)
+        SELECT st.employee_id, st.company_id, d.document_id, st.salary_amount
+        FROM staged st
+        JOIN new_documents d ON d.filename = st.filename AND d.company_id = st.company_id
+    )
+    SELECT document_id, employee_count FROM new_documents
+"""
+
+
+def _copy_buffer(rows):
+    """CSV text of the rows for COPY, NULL written as NULL_MARKER"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        if isinstance(row, Mapping):
+            values = [row.get(column) for column in LOAD_COLUMNS]
+        else:
+            values = list(row) + [None] * (len(LOAD_COLUMNS) - len(row))
+        writer.writerow([NULL_MARKER if value is None else value for value in values])
+    buffer.seek(0)
+    return buffer
+
+
+def _filename(row):
+    return row.get('filename') if isinstance(row, Mapping) else row[0]
+
+
+def batches(rows, batch_size):
+    """
+    Split rows into lists of at least `batch_size` rows (except the last),
+    cutting only between files so that each file becomes one document.
+    Expects each file's rows to be contiguous, as the parser emits them.
+    """
+    batch = []
+    previous = None
+    for row in rows:
+        filename = _filename(row)
+        if len(batch) >= batch_size and filename != previous:
+            yield batch
+            batch = []
+        batch.append(row)
+        previous = filename
+    if batch:
+        yield batch
+
+
+def load_batch(conn, rows):
+    """
+    Load one batch of rows in a single transaction.
+
+    Returns (rows staged, new document ids, rows loaded); the rows of files
+    already registered are staged but not loaded.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("TRUNCATE staging_salary_rows")
+        cursor.copy_expert(
+            f"COPY staging_salary_rows ({', '.join(LOAD_COLUMNS)}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')",
+            _copy_buffer(rows),
+        )
+        staged = cursor.rowcount
+        # Fresh statistics so the set-wise joins below get a sensible plan
+        cursor.execute("ANALYZE staging_salary_rows")
+        cursor.execute(INSERT_COMPANIES)
+        cursor.execute(INSERT_EMPLOYEES)
+        cursor.execute(INSERT_UNNUMBERED_EMPLOYEES)
+        cursor.execute(INSERT_FACTS)
+        documents = cursor.fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return staged, [document_id for document_id, _ in documents], sum(count for _, count in documents)
+
+
+def load_rows(conn, rows, batch_size=50000, refresh=True, on_batch=None):
+    """
+    Load parsed declaration rows (dicts keyed by LOAD_COLUMNS, or sequences
+    in that order) in batches of about `batch_size` rows. `on_batch` is
+    called with each batch once it is committed. Returns a summary with the
+    row and document counts, elapsed seconds and throughput.
+    """
+    document_ids = []
+    total = 0
+    loaded = 0
+    start = time.perf_counter()
+    for batch in batches(rows, batch_size):
+        batch_start = time.perf_counter()
+        staged, new_documents, batch_loaded = load_batch(conn, batch)
+        seconds = time.perf_counter() - batch_start
+        total += staged
+        loaded += batch_loaded
+        document_ids.extend(new_documents)
+        if on_batch is not None:
+            on_batch(batch)
+        skipped = f", {staged - batch_loaded:,} rows of known files skipped" if staged != batch_loaded else ""
+        print(f"Batch of {staged:,} rows, {len(new_documents)} documents{skipped} in {seconds:.2f}s "
+              f"({staged / seconds if seconds else 0:,.0f} rows/s)")
+    seconds = time.perf_counter() - start
+
+    summary = {
+        'rows': total,
+        'loaded_rows': loaded,
+        'documents': len(document_ids),
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(total / seconds) if seconds else None,
+    }
+    print(f"Loaded {loaded:,} of {total:,} rows into {len(document_ids)} documents in {seconds:.2f}s "
+          f"({summary['rows_per_sec'] or 0:,} rows/s)")
+
+    if refresh and document_ids:
+        refresh_materialized_views(conn, document_ids)
+        summary['data_version'] = bump_data_version(conn)
+    return summary
+
+
+def read_rows_csv(path):
+    """Rows of a CSV file with a LOAD_COLUMNS header; empty fields become NULL"""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield {column: (row.get(column) or None) for column in LOAD_COLUMNS}
+
+
+if __name__ == "__main__":
+    import sys
+    from itertools import chain
+    from config import LOAD_BATCH_SIZE
+    from src.db import pooled_connection
+
+    if len(sys.argv) < 2:
+        sys.exit(f"usage: python -m src.loader ROWS.csv [...]  (columns: {', '.join(LOAD_COLUMNS)})")
+
+    with pooled_connection() as conn:
+        load_rows(conn, chain.from_iterable(read_rows_csv(path) for path in sys.argv[1:]), LOAD_BATCH_SIZE)
@@ -0,0 +1,155 @@
+"""
+Refresh orchestration for the materialized views in sql/Views.sql.
+
+Loaders call refresh_materialized_views() with the ids of the documents they
+just inserted; only the views whose contents those documents change (and that
+have not already been refreshed past them) are refreshed, concurrently when
+possible so readers are never blocked.
+"""
+import time
+
+MATERIALIZED_VIEWS = ['company_summary', 'city_salary_stats', 'activity_salary_stats']
+
+# Views aggregating only records that carry a salary
+SALARY_VIEWS = ['city_salary_stats', 'activity_salary_stats']
+
+
+def populated_views(conn):
+    """Names of the materialized views that exist and hold data"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT matviewname FROM pg_matviews WHERE ispopulated AND matviewname = ANY(%s)",
+        (MATERIALIZED_VIEWS,)
+    )
+    names = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return names
+
+
+def salary_views_range(conn):
+    """
+    (min, max) salary aggregated by the salary views, or None when they are not
+    populated or empty. Used to tell whether a request's salary range covers
+    every row the views were built from.
+    """
+    if not set(SALARY_VIEWS) <= populated_views(conn):
+        return None
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(min_salary), MAX(max_salary) FROM city_salary_stats")
+    low, high = cursor.fetchone()
+    cursor.close()
+    if low is None:
+        return None
+    return float(low), float(high)
+
+
+def touched_views(conn, document_ids):
+    """Materialized views whose contents change when the given documents are loaded"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT
+            EXISTS (SELECT 1 FROM salary_records WHERE document_id = ANY(%(ids)s)) AS has_records,
+            EXISTS (SELECT 1 FROM salary_records
+                    WHERE document_id = ANY(%(ids)s) AND salary_amount IS NOT NULL) AS has_salaries
+    """, {'ids': list(document_ids)})
+    has_records, has_salaries = cursor.fetchone()
+    cursor.close()
+
+    views = set()
+    # company_summary LEFT JOINs companies, so any new company row also changes it
+    if has_records or _has_unsummarized_companies(conn, document_ids):
+        views.add('company_summary')
+    if has_salaries:
+        views.update(SALARY_VIEWS)
+    return views
+
+
+def _has_unsummarized_companies(conn, document_ids):
+    """Whether the documents reference companies missing from company_summary"""
+    if 'company_summary' not in populated_views(conn):
+        return True
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM documents d
+            WHERE d.document_id = ANY(%s)
+              AND d.company_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM company_summary cs WHERE cs.company_id = d.company_id)
+        )
+    """, (list(document_ids),))
+    result = cursor.fetchone()[0]
+    cursor.close()
+    return result
+
+
+def _refresh_log(conn):
+    """Newest document id each view was last refreshed with"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT view_name, last_document_id FROM matview_refresh_log")
+    log = dict(cursor.fetchall())
+    cursor.close()
+    return log
+
+
+def refresh_materialized_views(conn, document_ids=None, views=None):
+    """
+    Refresh the materialized views affected by newly loaded documents.
+
+    With `document_ids`, only views those documents touch are refreshed, and a
+    view already refreshed past the newest of them is skipped. Without it (and
+    without an explicit `views` list) every view is refreshed. Each refresh is
+    committed on its own. Returns {view_name: duration_ms}.
+    """
+    if views is None:
+        if document_ids is None:
+            views = list(MATERIALIZED_VIEWS)
+        else:
+            document_ids = list(document_ids)
+            if not document_ids:
+                return {}
+            newest = max(document_ids)
+            log = _refresh_log(conn)
+            touched = touched_views(conn, document_ids)
+            views = [
+                name for name in MATERIALIZED_VIEWS
+                if name in touched and (log.get(name) or 0) < newest
+            ]
+
+    populated = populated_views(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(document_id) FROM documents")
+    latest_document = cursor.fetchone()[0]
+
+    timings = {}
+    for name in views:
+        if name not in MATERIALIZED_VIEWS:
+            raise ValueError(f"Unknown materialized view: {name}")
+        # CONCURRENTLY keeps the view readable but needs it to be populated already
+        mode = "CONCURRENTLY " if name in populated else ""
+        start = time.perf_counter()
+        cursor.execute(f"REFRESH MATERIALIZED VIEW {mode}{name}")
+        duration_ms = int((time.perf_counter() - start) * 1000)
+        cursor.execute("""
+            INSERT INTO matview_refresh_log (view_name, last_document_id, refreshed_at, duration_ms)
+            VALUES (%s, %s, NOW(), %s)
+            ON CONFLICT (view_name) DO UPDATE
+            SET last_document_id = EXCLUDED.last_document_id,
+                refreshed_at = EXCLUDED.refreshed_at,
+                duration_ms = EXCLUDED.duration_ms
+        """, (name, latest_document, duration_ms))
+        conn.commit()
+        timings[name] = duration_ms
+        print(f"Refreshed {name} in {duration_ms} ms")
+
+    cursor.close()
+    return timings
+
+
+if __name__ == "__main__":
+    from src.db import pooled_connection
+    from src.cache import bump_data_version
+
+    # Full refresh of every materialized view, then invalidate cached responses
+    with pooled_connection() as conn:
+        refresh_materialized_views(conn)
+        bump_data_version(conn)
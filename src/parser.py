@@ -0,0 +1,225 @@
+"""
+Parsing stage of the ingestion pipeline: CNSS declaration PDFs -> loader rows.
+
+Text extraction (pdfplumber) is CPU-bound and independent per file, so the
+files are fanned out over a process pool. At most `queue_size` parsed files
+wait for the loader at any time: no new file is submitted until the loader
+has taken one, which bounds memory however large the directory is. The rows
+of each file are handed to src.loader together, so every file becomes one
+document.
+
+Before anything is parsed, files already loaded under the same name or with
+the same content (src.registry) are skipped. A progress file also records
+each filename once its rows are committed, or once it is known to hold no
+rows or to duplicate another file. A crashed or interrupted run started
+again with the same progress file skips those files instead of re-parsing
+them.
+
+Expected text layout of a declaration (one PDF per company and period):
+
+    Raison sociale : ATLAS BANK
+    Activité : Banking and Financial Services
+    Ville : Rabat
+    ...
+    <immatriculation> <NOM PRENOM> <jours> <salaire>
+    123456789 EL AMRANI SARA 26 12 345,67
+"""
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src.loader import load_rows
+from src.registry import DocumentRegistry
+
+HEADER_FIELDS = {
+    'raison sociale': 'company_name',
+    'activité': 'activity_description',
+    'activite': 'activity_description',
+    'ville': 'city',
+}
+HEADER_LINE = re.compile(r'^\s*(raison sociale|activit[ée]|ville)\s*:\s*(.*?)\s*$', re.IGNORECASE)
+
+# Registration number, name, days worked, salary ("12 345,67", "12345.67")
+EMPLOYEE_LINE = re.compile(
+    r'^\s*(?P<number>\d{6,10})\s+(?P<name>\D+?)\s+(?P<days>\d{1,2})\s+'
+    r'(?P<salary>\d{1,3}(?:[ \u00a0.]\d{3})*(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)\s*$'
+)
+
+
+def parse_amount(text):
+    """'12 345,67' / '12.345,67' / '12345.67' -> 12345.67"""
+    text = re.sub(r'[ \u00a0]', '', text)
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    elif text.count('.') > 1 or re.search(r'\.\d{3}$', text):
+        text = text.replace('.', '')
+    return float(text)
+
+
+def parse_declaration_text(text, filename):
+    """Loader rows (dicts keyed by LOAD_COLUMNS) for the text of one declaration"""
+    header = {}
+    rows = []
+    for line in text.splitlines():
+        match = HEADER_LINE.match(line)
+        if match:
+            field = HEADER_FIELDS[match.group(1).lower()]
+            header.setdefault(field, ' '.join(match.group(2).split()) or None)
+            continue
+        match = EMPLOYEE_LINE.match(line)
+        if match:
+            rows.append({
+                'cnss_number': match.group('number'),
+                'full_name': ' '.join(match.group('name').split()),
+                'salary_amount': parse_amount(match.group('salary')),
+            })
+
+    if not header.get('company_name'):
+        return []
+    common = {
+        'filename': filename,
+        'company_name': header['company_name'],
+        'activity_description': header.get('activity_description'),
+        'city': header.get('city'),
+    }
+    return [dict(common, **row) for row in rows]
+
+
+def extract_text(path):
+    """Text of every page of a PDF; requires the optional pdfplumber package"""
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        return '\n'.join(page.extract_text() or '' for page in pdf.pages)
+
+
+def parse_file(path):
+    """Parse one declaration PDF; returns (filename, rows)"""
+    filename = os.path.basename(path)
+    return filename, parse_declaration_text(extract_text(path), filename)
+
+
+class ProgressLog:
+    """Append-only record of the filenames whose ingestion has completed"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = {line.rstrip('\n') for line in f if line.strip()}
+
+    def record(self, filenames):
+        new = sorted(set(filenames) - self.done)
+        if not new:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(name + '\n' for name in new)
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(new)
+
+
+def parse_files(paths, workers=1, queue_size=None, on_empty=None):
+    """
+    Yield the rows of each declaration, file after file, in completion order.
+
+    With workers > 1 the files are parsed in a process pool, keeping at most
+    `queue_size` (default 2 * workers) parsed or in-progress files ahead of
+    the consumer. `on_empty` is called with the filename of every file that
+    yields no rows. A file that fails to parse is reported and skipped.
+    """
+    def handle(path, result):
+        try:
+            filename, rows = result()
+        except Exception as exc:
+            print(f"Could not parse {path}: {exc}")
+            return []
+        if not rows and on_empty is not None:
+            on_empty(filename)
+        return rows
+
+    if workers <= 1:
+        for path in paths:
+            yield from handle(path, lambda: parse_file(path))
+        return
+
+    queue_size = queue_size or 2 * workers
+    paths = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        while True:
+            for path in paths:
+                pending[pool.submit(parse_file, path)] = path
+                if len(pending) >= queue_size:
+                    break
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield from handle(pending.pop(future), future.result)
+
+
+def declaration_paths(directory):
+    """PDF files of a directory, in name order"""
+    return [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+        if name.lower().endswith('.pdf')
+    ]
+
+
+def ingest(conn, paths, progress_path, workers=1, batch_size=50000, queue_size=None, registry=None):
+    """
+    Parse the new declarations and load them.
+
+    Files in the progress file or in the document registry (same name, or
+    same content under another name) are skipped without being parsed.
+    Filenames are recorded once the batch holding their rows is committed, so
+    an interrupted run can be restarted with the same progress file. A copy
+    of a file first seen in this run is recorded with its original's batch,
+    never while the original may still fail to load.
+    """
+    progress = ProgressLog(progress_path)
+    registry = registry if registry is not None else DocumentRegistry.load(conn)
+    pending = []
+    document_fields = {}
+    duplicates = []
+    copies = {}     # original filename -> copies of it found in this run
+    for path in paths:
+        filename = os.path.basename(path)
+        if filename in progress.done:
+            continue
+        status, detail = registry.classify(path)
+        if status == 'new':
+            pending.append(path)
+            document_fields[filename] = detail
+        elif status == 'duplicate':
+            print(f"{filename} has the same content as {detail}, skipping")
+            if detail in document_fields:
+                copies.setdefault(detail, []).append(filename)
+            else:
+                duplicates.append(filename)
+    progress.record(duplicates)
+    print(f"{len(pending)} declarations to parse ({len(paths) - len(pending)} already ingested or duplicates)")
+
+    rows = parse_files(pending, workers, queue_size, on_empty=lambda name: progress.record([name]))
+    rows = (dict(row, **document_fields[row['filename']]) for row in rows)
+
+    def record_batch(batch):
+        loaded = {row['filename'] for row in batch}
+        progress.record(list(loaded) + [copy for name in loaded for copy in copies.get(name, [])])
+
+    return load_rows(conn, rows, batch_size, on_batch=record_batch)
+
+
+if __name__ == "__main__":
+    import sys
+    from config import LOAD_BATCH_SIZE, PARSE_WORKERS
+    from src.db import pooled_connection
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m src.parser DECLARATIONS_DIR [PROGRESS_FILE]")
+    directory = sys.argv[1]
+    progress_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(directory, '.ingested')
+
+    with pooled_connection() as conn:
+        ingest(conn, declaration_paths(directory), progress_path, PARSE_WORKERS, LOAD_BATCH_SIZE)
@@ -0,0 +1,275 @@
+"""
+Query planning helpers for the salary search and statistics endpoints.
+
+Every query starts from `salary_records s` and only joins the dimension tables
+that the active filters or the requested output columns actually reference.
+"""
+import base64
+import json
+import math
+from decimal import Decimal, InvalidOperation
+
+# Dimension joins by table alias, with the foreign key that links them to s
+JOINS = {
+    'c': ("JOIN companies c ON s.company_id = c.company_id", 'company_id'),
+    'e': ("JOIN employees e ON s.employee_id = e.employee_id", 'employee_id'),
+    'd': ("JOIN documents d ON s.document_id = d.document_id", 'document_id'),
+}
+
+# Text filters: request key, SQL condition, table alias it needs. The LOWER()
+# expressions match the trigram indexes of sql/Indexes.sql.
+TEXT_FILTERS = [
+    ('company_name', "LOWER(c.company_name) LIKE LOWER(%s)", 'c'),
+    ('employee_name', "LOWER(e.full_name) LIKE LOWER(%s)", 'e'),
+    ('city', "LOWER(c.city) = LOWER(%s)", 'c'),
+    ('activity', "LOWER(c.activity_description) LIKE LOWER(%s)", 'c'),
+]
+
+# Filters compared with the whole value (city comes from a dropdown); the
+# others match anywhere in the text
+EXACT_FILTERS = {'city'}
+
+# Fuzzy search mode: these filters match when the term is similar to a word
+# sequence of the column (pg_trgm's <% operator, word_similarity() at least
+# pg_trgm.word_similarity_threshold), which the same trigram indexes serve
+FUZZY_FILTERS = {
+    'company_name': "LOWER(c.company_name)",
+    'employee_name': "LOWER(e.full_name)",
+    'activity': "LOWER(c.activity_description)",
+}
+
+# Columns /api/search can return: output name, SQL expression, table alias it needs
+SEARCH_COLUMNS = [
+    ('record_id', 's.record_id', None),
+    ('employee_id', 's.employee_id', None),
+    ('full_name', 'e.full_name', 'e'),
+    ('company_id', 's.company_id', None),
+    ('company_name', 'c.company_name', 'c'),
+    ('activity_description', 'c.activity_description', 'c'),
+    ('city', 'c.city', 'c'),
+    ('salary_amount', 's.salary_amount', None),
+    ('filename', 'd.filename', 'd'),
+]
+
+DEFAULT_MIN_SALARY = 0
+DEFAULT_MAX_SALARY = 1000000000
+
+
+def parse_filters(data):
+    """Extract the filter parameters shared by search and stats from a request payload"""
+    return {
+        'company_name': data.get('company_name', ''),
+        'employee_name': data.get('employee_name', ''),
+        'city': data.get('city', ''),
+        'activity': data.get('activity', ''),
+        'min_salary': data.get('min_salary', DEFAULT_MIN_SALARY),
+        'max_salary': data.get('max_salary', DEFAULT_MAX_SALARY),
+    }
+
+
+def plan_query(filters, required_tables=(), fuzzy=False):
+    """
+    Build the FROM and WHERE clauses for a filtered salary query.
+
+    With `fuzzy`, the FUZZY_FILTERS use trigram word similarity instead of
+    substring matching; the caller sets the similarity threshold.
+
+    `required_tables` lists the aliases the caller's SELECT/GROUP BY uses. A
+    dimension that is neither filtered on nor selected is not joined; its
+    foreign key is checked for NULL instead, which keeps the inner-join
+    semantics (the FK constraint already guarantees the referenced row exists).
+
+    Returns (from_clause, where_clause, params).
+    """
+    conditions = []
+    params = []
+    tables = set(required_tables)
+
+    for key, condition, alias in TEXT_FILTERS:
+        value = filters.get(key)
+        if not value:
+            continue
+        if fuzzy and key in FUZZY_FILTERS:
+            conditions.append(f"LOWER(%s) <%% {FUZZY_FILTERS[key]}")
+            params.append(value)
+        else:
+            conditions.append(condition)
+            params.append(value if key in EXACT_FILTERS else f"%{value}%")
+        tables.add(alias)
+
+    conditions.append("s.salary_amount BETWEEN %s AND %s")
+    params.extend([filters['min_salary'], filters['max_salary']])
+
+    from_clauses = ["salary_records s"]
+    for alias, (join, foreign_key) in JOINS.items():
+        if alias in tables:
+            from_clauses.append(join)
+        else:
+            conditions.append(f"s.{foreign_key} IS NOT NULL")
+
+    return "\n            ".join(from_clauses), " AND ".join(conditions), params
+
+
+# Columns every search page returns because the next-page cursor is built from them
+KEYSET_COLUMNS = ('record_id', 'salary_amount')
+
+# Search order and the keyset predicate that resumes it after a given row
+SEARCH_ORDER = "s.salary_amount DESC, s.record_id"
+# The leading bound repeats what the OR implies, so the planner can start the
+# scan of idx_salary_search at the cursor instead of filtering rows up to it.
+KEYSET_CONDITION = ("s.salary_amount <= %s"
+                    " AND (s.salary_amount < %s OR (s.salary_amount = %s AND s.record_id > %s))")
+
+# Fuzzy search: most relevant first, then the usual order. Both apply to the
+# output columns of the ranked subquery (see relevance()).
+FUZZY_SEARCH_ORDER = "relevance DESC, salary_amount DESC, record_id"
+FUZZY_KEYSET_CONDITION = (
+    "(relevance < %s::real OR (relevance = %s::real"
+    " AND (salary_amount < %s OR (salary_amount = %s AND record_id > %s))))"
+)
+
+
+def relevance(filters):
+    """
+    SQL expression ranking a row by how well it matches the fuzzy filters:
+    the sum of their word_similarity() scores. Returns (expression, params).
+    """
+    terms = []
+    params = []
+    for key, column in FUZZY_FILTERS.items():
+        value = filters.get(key)
+        if value:
+            terms.append(f"word_similarity(LOWER(%s), {column})")
+            params.append(value)
+    return " + ".join(terms) or "0::real", params
+
+
+def search_columns(fields=None):
+    """
+    Resolve the requested output fields into a SELECT list.
+
+    Unknown names are ignored; no (or no valid) fields selects every column.
+    The keyset columns are always included.
+    Returns (select_list, required_tables).
+    """
+    columns = SEARCH_COLUMNS
+    if fields:
+        wanted = set(fields) | set(KEYSET_COLUMNS)
+        columns = [col for col in SEARCH_COLUMNS if col[0] in wanted]
+        if len(columns) == len(KEYSET_COLUMNS):
+            columns = SEARCH_COLUMNS
+
+    select_list = ",\n            ".join(
+        expr if expr.endswith('.' + name) else f"{expr} AS {name}"
+        for name, expr, _ in columns
+    )
+    required = {alias for _, _, alias in columns if alias}
+    return select_list, required
+
+
+def search_query(filters, fields=None, keyset=None, limit=100, fuzzy=False):
+    """
+    SQL and parameters of one /api/search page of up to `limit` rows, resuming
+    after `keyset` (decode_cursor's parameters for the same mode) when given.
+    With `limit` None every matching row is returned (used by /api/export).
+    """
+    # Only join the tables the filters and requested columns need
+    select_list, required_tables = search_columns(fields)
+    from_clause, where_clause, params = plan_query(filters, required_tables, fuzzy)
+
+    if fuzzy:
+        # Rank inside a subquery so the order and keyset can use its output
+        rank, rank_params = relevance(filters)
+        params = rank_params + params
+        query = f"""
+            SELECT * FROM (
+                SELECT
+                    {select_list},
+                    {rank} AS relevance
+                FROM {from_clause}
+                WHERE {where_clause}
+            ) ranked
+            {f"WHERE {FUZZY_KEYSET_CONDITION}" if keyset else ""}
+            ORDER BY {FUZZY_SEARCH_ORDER}
+            {"LIMIT %s" if limit is not None else ""}
+        """
+    else:
+        if keyset:
+            where_clause += f" AND {KEYSET_CONDITION}"
+        query = f"""
+            SELECT
+                {select_list}
+            FROM {from_clause}
+            WHERE {where_clause}
+            ORDER BY {SEARCH_ORDER}
+            {"LIMIT %s" if limit is not None else ""}
+        """
+    return query, params + list(keyset or []) + ([limit] if limit is not None else [])
+
+
+def encode_cursor(row):
+    """Build the opaque next-page token from the last row of a search page"""
+    values = [str(row['salary_amount']), row['record_id']]
+    if 'relevance' in row:
+        values.append(row['relevance'])
+    payload = json.dumps(values)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fuzzy=False):
+    """
+    Decode a next-page token into the keyset predicate parameters
+    (FUZZY_KEYSET_CONDITION's with `fuzzy`, else KEYSET_CONDITION's).
+
+    Raises ValueError for malformed tokens or tokens of the other mode.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != (3 if fuzzy else 2):
+            raise ValueError
+        salary = Decimal(values[0])
+        record_id = int(values[1])
+        score = float(values[2]) if fuzzy else None
+    except (ValueError, TypeError, InvalidOperation, UnicodeDecodeError):
+        raise ValueError("Invalid pagination cursor")
+    if not salary.is_finite() or (fuzzy and not math.isfinite(score)):
+        raise ValueError("Invalid pagination cursor")
+    if fuzzy:
+        return [score, score, salary, salary, record_id]
+    return [salary, salary, salary, record_id]
+
+
+_employee_records_unique = None
+
+
+def employee_records_unique(conn):
+    """
+    Whether the schema guarantees one salary record per employee.
+
+    True only when a unique index exists on salary_records(employee_id); in
+    that case COUNT(*) equals COUNT(DISTINCT employee_id) for any grouping and
+    the cheaper form can be used. The catalog lookup is cached per process.
+    """
+    global _employee_records_unique
+    if _employee_records_unique is None:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT EXISTS (
+                SELECT 1
+                FROM pg_index i
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+                WHERE i.indrelid = 'salary_records'::regclass
+                  AND i.indisunique
+                  AND i.indnkeyatts = 1
+                  AND a.attname = 'employee_id'
+            )
+        """)
+        _employee_records_unique = cursor.fetchone()[0]
+        cursor.close()
+    return _employee_records_unique
+
+
+def employee_count_expr(unique):
+    """SQL expression counting employees within a group"""
+    return "COUNT(*)" if unique else "COUNT(DISTINCT employee_id)"
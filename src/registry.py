@@ -0,0 +1,62 @@
+"""
+Registry of the declaration files already loaded, backed by documents.
+
+documents keeps the filename (UNIQUE) and the SHA-256 and size of every file
+the parser loaded. Before a run the registry reads the filenames and hashes
+once into memory, so telling whether a file is new costs a set lookup (same
+name) or one hash of the file (same content filed under another name) instead
+of a full parse. Files registered during the run count too, so two identical
+new files are only loaded once.
+"""
+import hashlib
+import os
+
+
+def file_digest(path):
+    """(SHA-256 hex digest, size in bytes) of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+        return digest.hexdigest(), os.fstat(f.fileno()).st_size
+
+
+class DocumentRegistry:
+    """Filenames and content hashes of the loaded declarations"""
+
+    def __init__(self, documents=()):
+        self.filenames = set()
+        self.hashes = {}
+        for filename, content_hash in documents:
+            self.filenames.add(filename)
+            if content_hash is not None:
+                self.hashes[content_hash.strip()] = filename
+
+    @classmethod
+    def load(cls, conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT filename, content_hash FROM documents")
+            return cls(cursor)
+        finally:
+            cursor.close()
+
+    def classify(self, path):
+        """
+        Where a declaration file stands, as (status, detail):
+
+        ('known', filename) when a document of that filename exists,
+        ('duplicate', original filename) when one with the same content does,
+        otherwise ('new', loader fields with the hash and size), after which
+        the file counts as registered.
+        """
+        filename = os.path.basename(path)
+        if filename in self.filenames:
+            return 'known', filename
+        content_hash, size = file_digest(path)
+        original = self.hashes.get(content_hash)
+        if original is not None:
+            return 'duplicate', original
+        self.filenames.add(filename)
+        self.hashes[content_hash] = filename
+        return 'new', {'content_hash': content_hash, 'file_size': size}
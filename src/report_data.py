@@ -0,0 +1,160 @@
+"""
+Local computation of the report datasets.
+
+fetch_data_for_analysis() normally asks PostgreSQL for each dataset
+separately, which re-scans salary_records for every one of them. In local
+mode the report instead reads LOCAL_EXTRACT_QUERY once and report_frames()
+derives the same dataframes from it with pandas/NumPy, reproducing the SQL
+semantics: PERCENTILE_CONT interpolates linearly, STDDEV is the sample
+standard deviation, COUNT(DISTINCT) ignores NULLs, GROUP BY keeps NULL keys
+and NTILE hands the remainder rows to the first tiles.
+"""
+import numpy as np
+import pandas as pd
+
+# One row per salary record the report looks at. The LEFT JOIN keeps records
+# without a company: the national figures (percentiles, deciles, buckets)
+# count them, the per-company/city/activity ones do not.
+LOCAL_EXTRACT_QUERY = """
+    SELECT
+        s.salary_amount::float8 AS salary_amount,
+        c.city,
+        c.activity_description,
+        c.company_name,
+        s.employee_id,
+        c.company_id
+    FROM salary_records s
+    LEFT JOIN companies c ON s.company_id = c.company_id
+    WHERE s.salary_amount >= 1
+"""
+
+# Salary ranges of the report's distribution chart; salaries at or above the
+# last bound fall into the last label
+REPORT_SALARY_BOUNDS = [3000, 5000, 8000, 10000, 15000, 20000, 30000, 50000, 100000, 200000, 500000, 1000000]
+REPORT_SALARY_LABELS = ['< 3K', '3K-5K', '5K-8K', '8K-10K', '10K-15K', '15K-20K', '20K-30K', '30K-50K',
+                        '50K-100K', '100K-200K', '200K-500K', '500K-1M', '1M+']
+
+# Company size ranges as (label, smallest size); sizes below 1 fall through
+# to the last label, like the ELSE branch of the SQL CASE
+COMPANY_SIZE_RANGES = [
+    ('1 employee', 1), ('2-5 employees', 2), ('6-10 employees', 6), ('11-20 employees', 11),
+    ('21-50 employees', 21), ('51-100 employees', 51), ('101-200 employees', 101),
+    ('201-500 employees', 201), ('501-1000 employees', 501), ('1000+ employees', 1001),
+]
+
+NATIONAL_PERCENTILES = {
+    'p01': 0.01, 'p05': 0.05, 'p10': 0.10, 'p25': 0.25, 'p50': 0.50,
+    'p75': 0.75, 'p90': 0.90, 'p95': 0.95, 'p99': 0.99, 'p999': 0.999,
+}
+
+
+def ntile(n, buckets):
+    """NTILE(buckets) numbers for n rows in window order"""
+    size, extra = divmod(n, buckets)
+    sizes = np.full(buckets, size)
+    sizes[:extra] += 1
+    return np.repeat(np.arange(1, buckets + 1), sizes)
+
+
+def _by_employee_count(frame):
+    """ORDER BY employee_count DESC, ties kept in group-key order"""
+    return frame.sort_values('employee_count', ascending=False, kind='mergesort').reset_index(drop=True)
+
+
+def _group_stats(df, keys, company_count=False):
+    """Per-group employee count and salary statistics, one row per distinct key"""
+    grouped = df.groupby(keys, dropna=False, sort=True, observed=True)
+    salaries = grouped['salary_amount']
+    frame = pd.DataFrame({
+        'employee_count': grouped['employee_id'].nunique(),
+        'avg_salary': salaries.mean(),
+        'median_salary': salaries.quantile(0.5),
+        'p25_salary': salaries.quantile(0.25),
+        'p75_salary': salaries.quantile(0.75),
+        'stddev_salary': salaries.std(),
+        'max_salary': salaries.max(),
+        'min_salary': salaries.min(),
+    })
+    if company_count:
+        frame.insert(0, 'company_count', grouped['company_id'].nunique())
+    frame = frame.reset_index()
+    # Group keys are few; give them back as plain strings like the SQL frames
+    categorical = [name for name in frame.columns if isinstance(frame[name].dtype, pd.CategoricalDtype)]
+    return frame.astype({name: object for name in categorical})
+
+
+def salary_distribution(salaries):
+    """Record count per report salary range, in range order, empty ranges left out"""
+    buckets = np.searchsorted(REPORT_SALARY_BOUNDS, salaries, side='right')
+    counts = np.bincount(buckets, minlength=len(REPORT_SALARY_LABELS))
+    present = np.flatnonzero(counts)
+    return pd.DataFrame({
+        'salary_range': [REPORT_SALARY_LABELS[i] for i in present],
+        'count': counts[present],
+    })
+
+
+def national_percentiles(salaries):
+    """Single-row frame with the national percentiles, mean, range, count and total"""
+    row = dict.fromkeys(list(NATIONAL_PERCENTILES) + ['avg', 'min', 'max', 'total_salary'], np.nan)
+    row['count'] = len(salaries)
+    if len(salaries):
+        row.update(zip(NATIONAL_PERCENTILES, np.quantile(salaries, list(NATIONAL_PERCENTILES.values()))))
+        row.update(avg=salaries.mean(), min=salaries.min(), max=salaries.max(), total_salary=salaries.sum())
+    return pd.DataFrame([row])
+
+
+def company_sizes(df):
+    """Companies and employees per company size range, in range order"""
+    sizes = df.groupby('company_id', observed=True)['employee_id'].nunique().to_numpy()
+    labels = np.array([label for label, _ in COMPANY_SIZE_RANGES])
+    lower = np.array([bound for _, bound in COMPANY_SIZE_RANGES])
+    buckets = np.searchsorted(lower, sizes, side='right') - 1
+    buckets[buckets < 0] = len(COMPANY_SIZE_RANGES) - 1
+    company_count = np.bincount(buckets, minlength=len(labels))
+    employee_count = np.bincount(buckets, weights=sizes, minlength=len(labels)).astype(np.int64)
+    present = np.flatnonzero(company_count)
+    return pd.DataFrame({
+        'size_range': labels[present],
+        'company_count': company_count[present],
+        'employee_count': employee_count[present],
+    })
+
+
+def income_deciles(salaries):
+    """Record count, salary mass and mean salary per NTILE(10) decile"""
+    ordered = np.sort(salaries)
+    deciles = ntile(len(ordered), 10)
+    frame = pd.DataFrame({'decile': deciles, 'salary_amount': ordered})
+    return (frame.groupby('decile')['salary_amount']
+            .agg(employee_count='count', total_salary='sum', avg_salary='mean')
+            .reset_index())
+
+
+def report_frames(extract):
+    """
+    Every SQL-backed report dataframe, derived from one LOCAL_EXTRACT_QUERY result.
+
+    Returns salary_df (records with a company, as in SQL mode) plus city_df,
+    activity_df, company_df, salary_dist_df, percentiles_df, company_size_df
+    and income_deciles_df with the columns and row order of their queries.
+    """
+    salaries = extract['salary_amount'].to_numpy(dtype=np.float64)
+    with_company = extract[extract['company_id'].notna()]
+
+    city_df = _group_stats(with_company[with_company['city'].notna()], 'city', company_count=True)
+    activity_df = _group_stats(with_company[with_company['activity_description'].notna()],
+                               'activity_description', company_count=True)
+    company_df = _group_stats(with_company, ['company_name', 'city', 'activity_description'])
+    company_df = company_df[company_df['employee_count'] >= 10]
+
+    return {
+        'salary_df': with_company.drop(columns='company_id').reset_index(drop=True),
+        'city_df': _by_employee_count(city_df),
+        'activity_df': _by_employee_count(activity_df),
+        'company_df': _by_employee_count(company_df),
+        'salary_dist_df': salary_distribution(salaries),
+        'percentiles_df': national_percentiles(salaries),
+        'company_size_df': company_sizes(with_company),
+        'income_deciles_df': income_deciles(salaries),
+    }
@@ -0,0 +1,330 @@
+"""Single-pass statistics engine behind /api/stats"""
+from psycopg2.extras import RealDictCursor
+
+from src.query_builder import plan_query, employee_records_unique, employee_count_expr, TEXT_FILTERS
+from src.matviews import salary_views_range
+
+# Upper bounds (exclusive) of the dashboard salary buckets, with their labels.
+# Salaries at or above the last bound fall into SALARY_BUCKET_LABELS[-1].
+SALARY_BUCKET_BOUNDS = [5000, 10000, 15000, 20000, 30000, 50000, 100000, 200000, 500000, 1000000]
+SALARY_BUCKET_LABELS = ['< 5K', '5K-10K', '10K-15K', '15K-20K', '20K-30K', '30K-50K',
+                        '50K-100K', '100K-200K', '200K-500K', '500K-1M', '1M+']
+
+STATS_KEYS = ['city_stats', 'activity_stats', 'salary_distribution', 'top_companies']
+
+# Costlier sections, computed only when the request lists them in "include"
+OPTIONAL_STATS_KEYS = ['city_inequality']
+
+# Per-city inequality: cities need this many salary records, Atkinson uses this epsilon
+INEQUALITY_MIN_GROUP_SIZE = 10
+INEQUALITY_EPSILON = 0.5
+
+# Sections that can be served from the materialized views when no filter applies
+MATVIEW_SECTIONS = {
+    'city_stats': """
+        SELECT city, employee_count, average_salary AS avg_salary, median_salary, max_salary
+        FROM city_salary_stats
+        WHERE city IS NOT NULL
+        ORDER BY average_salary DESC
+        LIMIT 20
+    """,
+    'activity_stats': """
+        SELECT activity_description, employee_count, average_salary AS avg_salary, median_salary
+        FROM activity_salary_stats
+        WHERE activity_description IS NOT NULL
+        ORDER BY average_salary DESC
+        LIMIT 20
+    """,
+}
+
+
+def _sql_array(values, cast):
+    """Render a list of Python literals as a PostgreSQL ARRAY literal"""
+    if cast == 'text':
+        items = ", ".join("'" + str(v).replace("'", "''") + "'" for v in values)
+    else:
+        items = ", ".join(str(v) for v in values)
+    return f"ARRAY[{items}]::{cast}[]"
+
+
+def _section_ctes(employee_count):
+    """CTE body and JSON output expression for every statistics section"""
+    bounds = _sql_array(SALARY_BUCKET_BOUNDS, 'numeric')
+    labels = _sql_array(SALARY_BUCKET_LABELS, 'text')
+
+    return {
+        'city_stats': (f"""
+            SELECT
+                city,
+                {employee_count} as employee_count,
+                AVG(salary_amount) as avg_salary,
+                PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salary_amount) as median_salary,
+                MAX(salary_amount) as max_salary
+            FROM filtered
+            WHERE city IS NOT NULL
+            GROUP BY city
+            ORDER BY avg_salary DESC
+            LIMIT 20
+        """, "COALESCE(json_agg(t ORDER BY t.avg_salary DESC), '[]'::json)"),
+        'activity_stats': (f"""
+            SELECT
+                activity_description,
+                {employee_count} as employee_count,
+                AVG(salary_amount) as avg_salary,
+                PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salary_amount) as median_salary
+            FROM filtered
+            WHERE activity_description IS NOT NULL
+            GROUP BY activity_description
+            ORDER BY avg_salary DESC
+            LIMIT 20
+        """, "COALESCE(json_agg(t ORDER BY t.avg_salary DESC), '[]'::json)"),
+        'salary_distribution': (f"""
+            SELECT
+                width_bucket(salary_amount, {bounds}) AS bucket,
+                COUNT(*) as count
+            FROM filtered
+            GROUP BY bucket
+        """, f"""COALESCE(json_agg(json_build_object(
+                        'salary_range', ({labels})[t.bucket + 1],
+                        'count', t.count) ORDER BY t.bucket), '[]'::json)"""),
+        'top_companies': (f"""
+            SELECT
+                company_name,
+                city,
+                activity_description,
+                {employee_count} as employee_count,
+                AVG(salary_amount) as avg_salary,
+                MAX(salary_amount) as max_salary
+            FROM filtered
+            GROUP BY company_name, city, activity_description
+            HAVING {employee_count} >= 3
+            ORDER BY avg_salary DESC
+            LIMIT 20
+        """, "COALESCE(json_agg(t ORDER BY t.avg_salary DESC), '[]'::json)"),
+        'city_inequality': (f"""
+            SELECT
+                city,
+                {employee_count} as employee_count,
+                gini_agg(x ORDER BY x) as gini,
+                hoover_agg(x, group_mean) as hoover,
+                atkinson_agg(x, {INEQUALITY_EPSILON}) as atkinson,
+                theil_agg(x) as theil
+            FROM (
+                SELECT
+                    city,
+                    employee_id,
+                    salary_amount::float8 AS x,
+                    AVG(salary_amount::float8) OVER (PARTITION BY city) AS group_mean
+                FROM filtered
+                WHERE city IS NOT NULL
+            ) c
+            GROUP BY city
+            HAVING COUNT(*) >= {INEQUALITY_MIN_GROUP_SIZE}
+            ORDER BY gini DESC
+            LIMIT 20
+        """, "COALESCE(json_agg(t ORDER BY t.gini DESC), '[]'::json)"),
+    }
+
+
+def build_stats_query(from_clause, where_clause, employee_count="COUNT(DISTINCT employee_id)",
+                      sections=STATS_KEYS):
+    """
+    Build one statement that computes the requested dashboard aggregates.
+
+    The filtered fact rows are materialized once in the `filtered` CTE and all
+    aggregations read from it, so the salary table is scanned a single time
+    per request instead of once per chart.
+    """
+    ctes = _section_ctes(employee_count)
+    cte_sql = "".join(f",\n        {key} AS ({ctes[key][0]})" for key in sections)
+    outputs = ",\n            ".join(
+        f"(SELECT {ctes[key][1]} FROM {key} t) AS {key}" for key in sections
+    )
+
+    return f"""
+        WITH filtered AS MATERIALIZED (
+            SELECT
+                s.employee_id,
+                s.salary_amount,
+                c.company_name,
+                c.city,
+                c.activity_description
+            FROM {from_clause}
+            WHERE {where_clause}
+        ){cte_sql}
+        SELECT
+            {outputs}
+    """
+
+
+def covers_all_rows(filters, salary_range):
+    """Whether the filters select every row the materialized views aggregate"""
+    if salary_range is None or any(filters.get(key) for key, _, _ in TEXT_FILTERS):
+        return False
+    try:
+        min_salary = float(filters['min_salary'])
+        max_salary = float(filters['max_salary'])
+    except (TypeError, ValueError):
+        return False
+    return min_salary <= salary_range[0] and max_salary >= salary_range[1]
+
+
+def parse_include(data):
+    """Optional sections a stats request asks for, e.g. {"include": ["city_inequality"]}"""
+    include = data.get('include') or []
+    if isinstance(include, str):
+        include = [include]
+    return [key for key in OPTIONAL_STATS_KEYS if key in include]
+
+
+def fetch_stats(conn, filters, include=()):
+    """
+    Run the single-pass statistics query and return the /api/stats payload.
+
+    `include` adds OPTIONAL_STATS_KEYS sections to the default ones.
+    """
+    stats = {}
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    # Unfiltered requests read the precomputed city/activity aggregates
+    if covers_all_rows(filters, salary_views_range(conn)):
+        for key, query in MATVIEW_SECTIONS.items():
+            cursor.execute(f"SELECT COALESCE(json_agg(t ORDER BY t.avg_salary DESC), '[]'::json) AS rows FROM ({query}) t")
+            stats[key] = cursor.fetchone()['rows']
+
+    sections = [key for key in STATS_KEYS if key not in stats]
+    # Per-city inequality needs the aggregates from sql/Inequality.sql
+    if 'city_inequality' in include and inequality_aggregates_installed(conn):
+        sections.append('city_inequality')
+
+    # Only companies is needed for the groupings; other joins depend on the filters
+    from_clause, where_clause, params = plan_query(filters, required_tables={'c'})
+    employee_count = employee_count_expr(employee_records_unique(conn))
+
+    cursor.execute(build_stats_query(from_clause, where_clause, employee_count, sections), params)
+    row = cursor.fetchone()
+    cursor.close()
+
+    # Aggregates arrive as JSON, so numeric values are already plain floats/ints
+    stats.update({key: row[key] for key in sections})
+    return stats
+
+
+# Groupings offered by the inequality endpoint: request value -> grouping column
+INEQUALITY_GROUPS = {
+    'city': 'c.city',
+    'activity': 'c.activity_description',
+}
+
+
+_inequality_aggregates_installed = None
+
+
+def inequality_aggregates_installed(conn):
+    """Whether the aggregates from sql/Inequality.sql exist (cached per process)"""
+    global _inequality_aggregates_installed
+    if _inequality_aggregates_installed is None:
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regprocedure('gini_agg(double precision)') IS NOT NULL")
+        _inequality_aggregates_installed = cursor.fetchone()[0]
+        cursor.close()
+    return _inequality_aggregates_installed
+
+
+def build_inequality_query(from_clause, where_clause, group_expr=None,
+                           employee_count="COUNT(DISTINCT employee_id)"):
+    """
+    Build the inequality measures query, per group or over all filtered rows.
+
+    Uses the aggregates from sql/Inequality.sql; the group mean Hoover needs
+    comes from a window over the same rows, so the data is scanned once.
+    Extra parameters after the filter ones: epsilon, then the minimum group
+    size and the row limit when grouping.
+    """
+    group = group_expr or "NULL::text"
+    group_filter = f" AND {group_expr} IS NOT NULL" if group_expr else ""
+    grouping = """
+        GROUP BY grp
+        HAVING COUNT(*) >= %s
+        ORDER BY gini DESC NULLS LAST
+        LIMIT %s""" if group_expr else ""
+
+    return f"""
+        WITH filtered AS (
+            SELECT
+                {group} AS grp,
+                s.employee_id,
+                s.salary_amount::float8 AS x,
+                AVG(s.salary_amount::float8) OVER (PARTITION BY {group}) AS group_mean
+            FROM {from_clause}
+            WHERE {where_clause}{group_filter}
+        )
+        SELECT{" grp," if group_expr else ""}
+            {employee_count} AS employee_count,
+            AVG(x) AS avg_salary,
+            gini_agg(x ORDER BY x) AS gini,
+            hoover_agg(x, group_mean) AS hoover,
+            atkinson_agg(x, %s) AS atkinson,
+            theil_agg(x) AS theil
+        FROM filtered{grouping}
+    """
+
+
+def build_lorenz_query(from_clause, where_clause):
+    """
+    Build the Lorenz curve query: cumulative population and income shares at
+    the upper end of each of N equal-size groups (N is the last parameter).
+    """
+    return f"""
+        WITH ranked AS (
+            SELECT
+                s.salary_amount::float8 AS x,
+                NTILE(%s) OVER (ORDER BY s.salary_amount) AS bucket
+            FROM {from_clause}
+            WHERE {where_clause}
+        ),
+        buckets AS (
+            SELECT bucket, COUNT(*) AS n, SUM(x) AS total
+            FROM ranked
+            GROUP BY bucket
+        )
+        SELECT
+            SUM(n) OVER w / SUM(n) OVER () AS population_share,
+            SUM(total) OVER w / NULLIF(SUM(total) OVER (), 0) AS income_share
+        FROM buckets
+        WINDOW w AS (ORDER BY bucket)
+        ORDER BY bucket
+    """
+
+
+def fetch_inequality(conn, filters, group_by=None, epsilon=0.5, min_group_size=10,
+                     limit=50, lorenz_points=20):
+    """
+    Gini, Hoover, Atkinson and Theil for the filtered rows, computed in the database.
+
+    Returns {'overall': {...}, 'lorenz': [...]} plus 'groups' (most unequal
+    first) when `group_by` is one of INEQUALITY_GROUPS.
+    """
+    from_clause, where_clause, params = plan_query(filters, required_tables={'c'} if group_by else ())
+    employee_count = employee_count_expr(employee_records_unique(conn))
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    def measures(row):
+        return {key: (float(value) if key != 'employee_count' and value is not None else value)
+                for key, value in row.items() if key != 'grp'}
+
+    cursor.execute(build_inequality_query(from_clause, where_clause, employee_count=employee_count),
+                   params + [epsilon])
+    result = {'overall': measures(cursor.fetchone())}
+
+    if group_by:
+        query = build_inequality_query(from_clause, where_clause, INEQUALITY_GROUPS[group_by], employee_count)
+        cursor.execute(query, params + [epsilon, min_group_size, limit])
+        result['groups'] = [dict(measures(row), group=row['grp']) for row in cursor.fetchall()]
+
+    cursor.execute(build_lorenz_query(from_clause, where_clause), [lorenz_points] + params)
+    result['lorenz'] = [[0.0, 0.0]] + [
+        [float(row['population_share']), float(row['income_share'] or 0)] for row in cursor.fetchall()
+    ]
+    cursor.close()
+    return result
@@ -0,0 +1,61 @@
+"""
+Typeahead suggestions for the name and activity inputs.
+
+Only the dimension tables are read (never salary_records), through the same
+LOWER(...) trigram indexes as the search filters: a name matches when it
+contains the typed text or is similar to it by word similarity. Names that
+start with the text come first, then the closest matches.
+"""
+
+# Suggestion field -> (dimension table, column)
+SUGGEST_SOURCES = {
+    'company_name': ('companies', 'company_name'),
+    'employee_name': ('employees', 'full_name'),
+    'activity': ('companies', 'activity_description'),
+}
+
+# Shorter terms match nearly every name and have no trigram to narrow the index scan
+SUGGEST_MIN_CHARS = 3
+
+
+def normalize_term(term):
+    """Lowercased, whitespace-collapsed typed text (the cache and query key)"""
+    return ' '.join(str(term or '').split()).lower()
+
+
+def suggestion_query(field):
+    """SQL returning the top suggestions for a field (parameters from suggestion_params)"""
+    table, column = SUGGEST_SOURCES[field]
+    name = f"LOWER({column})"
+    return f"""
+        SELECT {column} AS name
+        FROM {table}
+        WHERE {name} LIKE %s OR %s <%% {name}
+        GROUP BY {column}
+        ORDER BY bool_or({name} LIKE %s) DESC, MAX(word_similarity(%s, {name})) DESC, {column}
+        LIMIT %s
+    """
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def suggestion_params(term, limit):
+    """Parameters of suggestion_query() for a normalized term"""
+    escaped = _escape_like(term)
+    return [f"%{escaped}%", term, f"{escaped}%", term, limit]
+
+
+def fetch_suggestions(conn, field, term, limit, threshold):
+    """Up to `limit` distinct names for the typed text, best matches first"""
+    if len(term) < SUGGEST_MIN_CHARS:
+        return []
+    cursor = conn.cursor()
+    try:
+        # Threshold of the <% operator, for this transaction only
+        cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(threshold)])
+        cursor.execute(suggestion_query(field), suggestion_params(term, limit))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
@@ -0,0 +1,51 @@
+# tests/test_analytics.py
+import numpy as np
+import pandas as pd
+from src.analytics import SalarySnapshot, like_to_regex
+from src.query_builder import parse_filters
+
+def make_snapshot():
+    df = pd.DataFrame({
+        'employee_id': [1, 2, 3, 4, 4, 5, 6],
+        'salary_amount': [1000.0, 3000.0, 8000.0, 4000.0, 6000.0, 20000.0, 7000.0],
+        'company_name': ['Atlas', 'Atlas', 'Atlas', 'Beta', 'Beta', 'Beta', 'Gamma'],
+        'city': ['Rabat', 'Rabat', 'Rabat', 'Casablanca', 'Casablanca', 'Casablanca', None],
+        'activity_description': ['Services', 'Services', 'Services', 'Banking', 'Banking', 'Banking', 'Services'],
+    })
+    return SalarySnapshot.from_frame(df), df
+
+def test_like_pattern_semantics():
+    assert like_to_regex('%rab%').fullmatch('Rabat')
+    assert like_to_regex('r_bat').fullmatch('RABAT')
+    assert not like_to_regex('%a.b%').fullmatch('axb')
+
+def test_city_stats_match_pandas():
+    snapshot, df = make_snapshot()
+    stats = snapshot.stats(parse_filters({}))
+    expected = df.dropna(subset=['city']).groupby('city')['salary_amount'].agg(['mean', 'median', 'max'])
+    for row in stats['city_stats']:
+        assert np.isclose(row['avg_salary'], expected.loc[row['city'], 'mean'])
+        assert np.isclose(row['median_salary'], expected.loc[row['city'], 'median'])
+        assert row['max_salary'] == expected.loc[row['city'], 'max']
+    casablanca = next(r for r in stats['city_stats'] if r['city'] == 'Casablanca')
+    assert casablanca['employee_count'] == 2
+
+def test_filters_and_distribution():
+    snapshot, _ = make_snapshot()
+    stats = snapshot.stats(parse_filters({'city': 'RABAT', 'min_salary': 2000}))
+    assert [r['city'] for r in stats['city_stats']] == ['Rabat']
+    assert stats['salary_distribution'] == [{'salary_range': '< 5K', 'count': 1},
+                                            {'salary_range': '5K-10K', 'count': 1}]
+    assert not SalarySnapshot.supports({'employee_name': 'x'})
+    assert 'city_inequality' not in stats
+    assert 'city_inequality' in snapshot.stats(parse_filters({}), ['city_inequality'])
+
+def test_saved_snapshot_is_memory_mapped(tmp_path):
+    snapshot, _ = make_snapshot()
+    snapshot.version = 3
+    snapshot.save(str(tmp_path / 'v3'))
+    opened = SalarySnapshot.open(str(tmp_path / 'v3'))
+    assert isinstance(opened.salary, np.memmap) and opened.version == 3
+    filters = parse_filters({'activity': 'serv'})
+    assert opened.stats(filters) == snapshot.stats(filters)
+    pd.testing.assert_frame_equal(opened.to_frame(min_salary=2000), snapshot.to_frame(min_salary=2000))
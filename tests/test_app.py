@@ -0,0 +1,65 @@
+# tests/test_app.py
+import src.app as app_module
+from src.cache import ResultCache, LocalBackend
+
+def test_index_returns_etag_and_304_when_unchanged(monkeypatch):
+    renders = []
+
+    def fake_render_index():
+        renders.append(1)
+        return {'html': '<html>search</html>', 'etag': 'abc123'}
+
+    monkeypatch.setattr(app_module, 'render_index', fake_render_index)
+    monkeypatch.setattr(app_module, 'page_cache', ResultCache(LocalBackend(max_entries=4), ttl=60))
+    client = app_module.app.test_client()
+
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.headers['ETag'] == '"abc123"'
+    assert response.get_data(as_text=True) == '<html>search</html>'
+
+    response = client.get('/', headers={'If-None-Match': '"abc123"'})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert len(renders) == 1
+
+    assert client.get('/', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+def test_fuzzy_export_runs_the_search_statement(monkeypatch):
+    executed = []
+
+    class StubCursor:
+        def execute(self, query, params=None):
+            executed.append(query)
+
+        def close(self):
+            pass
+
+    class StubConnection:
+        def cursor(self):
+            return StubCursor()
+
+    class StubPool:
+        def getconn(self):
+            return StubConnection()
+
+        def putconn(self, conn):
+            pass
+
+    def fake_stream_rows(conn, query, params, fmt, batch_size):
+        executed.append(query)
+        yield ''
+
+    monkeypatch.setattr(app_module, 'get_pool', lambda: StubPool())
+    monkeypatch.setattr(app_module, 'stream_rows', fake_stream_rows)
+    client = app_module.app.test_client()
+
+    response = client.post('/api/export', json={'company_name': 'atlas', 'mode': 'fuzzy', 'gzip': False})
+    assert response.status_code == 200
+    response.get_data()
+    threshold, query = executed
+    assert 'word_similarity_threshold' in threshold
+    assert '<%% LOWER(c.company_name)' in query and 'ORDER BY relevance DESC' in query
+    assert 'LIMIT' not in query
+
+    assert client.post('/api/export', json={'mode': 'regex'}).status_code == 400
@@ -0,0 +1,62 @@
+# tests/test_cache.py
+import time
+from src.cache import LocalBackend, ResultCache, normalize_filters, filters_key
+
+def test_equivalent_filters_share_a_key():
+    a = normalize_filters({'city': ' Casablanca ', 'min_salary': -5, 'max_salary': 1e12})
+    b = normalize_filters({'city': 'casablanca', 'min_salary': 0})
+    assert filters_key(a) == filters_key(b)
+
+def test_lru_evicts_least_recently_used():
+    backend = LocalBackend(max_entries=2)
+    backend.set('a', 1, 60)
+    backend.set('b', 2, 60)
+    backend.get('a')
+    backend.set('c', 3, 60)
+    assert backend.get('b') is None and backend.get('a') == 1
+    assert backend.evictions == 1
+
+def test_entries_expire():
+    backend = LocalBackend()
+    backend.set('a', 1, 0.01)
+    time.sleep(0.02)
+    assert backend.get('a') is None
+
+def test_version_bump_invalidates():
+    version = [1]
+    cache = ResultCache(LocalBackend(), version_source=lambda: version[0], version_check_interval=0)
+    calls = []
+    compute = lambda: calls.append(1) or {'n': len(calls)}
+    assert cache.get_or_compute('stats', ['k'], compute) == {'n': 1}
+    assert cache.get_or_compute('stats', ['k'], compute) == {'n': 1}
+    version[0] = 2
+    assert cache.get_or_compute('stats', ['k'], compute) == {'n': 2}
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_missing_data_version_table_reads_as_zero():
+    from src.cache import read_data_version
+
+    class StubCursor:
+        def __init__(self, results):
+            self.results = results
+            self.queries = []
+
+        def execute(self, query):
+            self.queries.append(query)
+
+        def fetchone(self):
+            return self.results[len(self.queries) - 1]
+
+        def close(self):
+            pass
+
+    class StubConnection:
+        def __init__(self, *results):
+            self.cursor_ = StubCursor(list(results))
+
+        def cursor(self):
+            return self.cursor_
+
+    missing = StubConnection((False,))
+    assert read_data_version(missing) == 0 and len(missing.cursor_.queries) == 1
+    assert read_data_version(StubConnection((True,), (7,))) == 7
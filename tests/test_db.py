@@ -0,0 +1,60 @@
+# tests/test_db.py
+import pytest
+from src import db
+from src.db import ConnectionPool, PoolTimeout
+
+class StubConnection:
+    def __init__(self, closed=False):
+        self.closed = closed
+
+class StubThreadedPool:
+    """Hands out the queued connections, then fresh healthy ones"""
+
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.queue = []
+        self.returned = []
+        self._pool = []
+        self.fail = False
+
+    def getconn(self):
+        if self.fail:
+            raise RuntimeError('server unreachable')
+        return self.queue.pop(0) if self.queue else StubConnection()
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+
+    def closeall(self):
+        pass
+
+@pytest.fixture
+def make_pool(monkeypatch):
+    monkeypatch.setattr(db.pg_pool, 'ThreadedConnectionPool', StubThreadedPool)
+    return lambda **kwargs: ConnectionPool(health_check=False, **kwargs)
+
+def test_checkout_times_out_when_pool_is_exhausted(make_pool):
+    pool = make_pool(maxconn=1, timeout=0.05)
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()['timeouts'] == 1 and pool.stats()['in_use'] == 1
+
+def test_unhealthy_connection_is_replaced(make_pool):
+    pool = make_pool(maxconn=2)
+    broken = StubConnection(closed=True)
+    pool._pool.queue.append(broken)
+    conn = pool.getconn()
+    assert conn is not broken and not conn.closed
+    assert pool._pool.returned == [(broken, True)]
+    assert pool.stats()['discarded'] == 1
+
+def test_slot_released_when_getconn_raises(make_pool):
+    pool = make_pool(maxconn=1, timeout=0.05)
+    pool._pool.fail = True
+    with pytest.raises(RuntimeError):
+        pool.getconn()
+    pool._pool.fail = False
+    # The failed checkout did not keep the only slot
+    with pool.connection() as conn:
+        assert not conn.closed
+    assert pool.stats()['in_use'] == 0 and pool.stats()['timeouts'] == 0
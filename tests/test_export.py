@@ -0,0 +1,7 @@
+# tests/test_export.py
+import gzip
+from src.export import gzip_stream
+
+def test_gzip_stream_round_trip():
+    chunks = ['a,b\n', '1,2\n' * 1000, '']
+    assert gzip.decompress(b''.join(gzip_stream(chunks))).decode() == ''.join(chunks)
@@ -0,0 +1,29 @@
+# tests/test_extract.py
+import pandas as pd
+import pytest
+from src.extract import _concat_compact, copy_frame
+
+def test_concat_keeps_categoricals():
+    chunks = [pd.DataFrame({'city': pd.Categorical(['Rabat', None]), 'salary_amount': [1.0, 2.0]}),
+              pd.DataFrame({'city': pd.Categorical(['Casablanca']), 'salary_amount': [3.0]})]
+    frame = _concat_compact(chunks)
+    assert isinstance(frame['city'].dtype, pd.CategoricalDtype)
+    assert frame['city'].tolist()[::2] == ['Rabat', 'Casablanca']
+    assert frame['city'].isna().tolist() == [False, True, False]
+
+def test_copy_frame_round_trip():
+    psycopg2 = pytest.importorskip('psycopg2')
+    from config import DB_CONFIG
+    try:
+        conn = psycopg2.connect(connect_timeout=2, **DB_CONFIG)
+    except psycopg2.Error:
+        pytest.skip('database not reachable')
+    query = "SELECT * FROM (VALUES ('', 1, 0.1::float8), (NULL, NULL, 1234.56::float8)) AS t(city, employee_id, salary_amount)"
+    try:
+        frame = copy_frame(conn, query)
+    finally:
+        conn.close()
+    # Empty string and NULL stay apart; floats are exact; ids are nullable
+    assert frame['city'].tolist()[0] == '' and pd.isna(frame['city'].tolist()[1])
+    assert frame['salary_amount'].tolist() == [0.1, 1234.56]
+    assert str(frame['employee_id'].dtype) == 'Int32' and pd.isna(frame['employee_id'][1])
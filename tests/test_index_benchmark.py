@@ -0,0 +1,11 @@
+# tests/test_index_benchmark.py
+import re
+from src.index_benchmark import BASELINE_INDEXES, tuned_indexes
+
+def test_tuned_indexes_come_from_indexes_sql():
+    statements = tuned_indexes()
+    assert any('idx_salary_search' in s and 'INCLUDE' in s for s in statements)
+    assert not any('gin' in s.lower() or 'EXTENSION' in s for s in statements)
+    # Same tables, so the two phases only differ by their index definitions
+    tables = lambda indexes: {re.search(r' ON\s+(\w+)', s).group(1) for s in indexes}
+    assert tables(statements) == tables(BASELINE_INDEXES)
@@ -0,0 +1,50 @@
+# tests/test_inequality.py
+import numpy as np
+from src.inequality import inequality_metrics, streaming_inequality_metrics, grouped_inequality, gini_by
+
+def naive(x, epsilon=0.5):
+    x = np.sort(np.asarray(x, dtype=np.float64))
+    n, mean = len(x), x.mean()
+    index = np.arange(1, n + 1)
+    return {
+        'gini': np.sum((2 * index - n - 1) * x) / (n * x.sum()),
+        'hoover': np.abs(x - mean).sum() / (2 * x.sum()),
+        'atkinson': 1 - np.mean((x / mean) ** (1 - epsilon)) ** (1 / (1 - epsilon)),
+        'theil': np.mean(x / mean * np.log(x / mean)),
+    }
+
+def test_exact_mode_matches_definitions():
+    x = np.random.default_rng(1).lognormal(9, 0.7, 5000)
+    metrics = inequality_metrics(x)
+    for key, value in naive(x).items():
+        assert np.isclose(metrics[key], value)
+    assert inequality_metrics(np.sort(x), presorted=True) == metrics
+
+def test_streaming_mode_within_reported_error():
+    x = np.random.default_rng(2).lognormal(9, 0.9, 50000)
+    exact = inequality_metrics(x)
+    approx = streaming_inequality_metrics(np.array_split(x, 9), bins_per_decade=50)
+    assert abs(approx['gini'] - exact['gini']) <= approx['gini_error'] + 1e-12
+    assert abs(approx['hoover'] - exact['hoover']) <= approx['hoover_error'] + 1e-12
+    assert np.isclose(approx['atkinson'], exact['atkinson'])
+    assert np.isclose(approx['theil'], exact['theil'])
+
+def test_equal_incomes_have_no_inequality():
+    metrics = inequality_metrics([7000.0] * 10)
+    assert all(abs(metrics[key]) < 1e-12 for key in ('gini', 'hoover', 'atkinson', 'theil'))
+
+def test_grouped_matches_per_group_metrics():
+    rng = np.random.default_rng(3)
+    codes = rng.integers(0, 6, 20000)
+    values = rng.lognormal(9, 0.8, 20000)
+    grouped = grouped_inequality(codes, values, lorenz_points=10)
+    for i, code in enumerate(grouped['groups']):
+        x = np.sort(values[codes == code])
+        expected = inequality_metrics(x, presorted=True)
+        for key in ('mean', 'gini', 'hoover', 'atkinson', 'theil'):
+            assert np.isclose(grouped[key][i], expected[key])
+        lorenz = np.interp(np.arange(1, 11) / 10, np.arange(len(x) + 1) / len(x),
+                           np.concatenate(([0], np.cumsum(x))) / x.sum())
+        assert np.allclose(grouped['lorenz'][i], lorenz)
+    groups, gini = gini_by(codes, values)
+    assert np.array_equal(groups, grouped['groups']) and np.allclose(gini, grouped['gini'])
@@ -0,0 +1,19 @@
+# tests/test_loader.py
+import csv
+from src.loader import LOAD_COLUMNS, _copy_buffer, batches
+
+def test_copy_buffer_marks_nulls():
+    rows = [{'filename': 'a.pdf', 'company_name': 'Atlas', 'activity_description': None, 'city': '',
+             'full_name': 'Sara, Amrani', 'salary_amount': 4500.5}]
+    fields = next(csv.reader(_copy_buffer(rows)))
+    assert fields == ['a.pdf', 'Atlas', '\\N', '', 'Sara, Amrani', '4500.5', '\\N', '\\N', '\\N']
+    assert len(fields) == len(LOAD_COLUMNS)
+
+def test_batches_do_not_split_files():
+    rows = [(name, 'Atlas', None, None, 'X', 1) for name in ['a', 'a', 'a', 'b', 'c', 'c']]
+    assert [[r[0] for r in batch] for batch in batches(rows, 2)] == [['a', 'a', 'a'], ['b', 'c', 'c']]
+    assert [len(batch) for batch in batches(rows, 10)] == [6]
+
+def test_copy_buffer_pads_sequence_rows():
+    fields = next(csv.reader(_copy_buffer([('a.pdf', 'Atlas', None, 'Rabat', 'Sara', 4500)])))
+    assert fields[-3:] == ['\\N', '\\N', '\\N'] and len(fields) == len(LOAD_COLUMNS)
@@ -1,6 +1,6 @@
 # tests/test_metrics.py
 import numpy as np
-from yourmodule import calculate_gini, calculate_hoover_index, calculate_atkinson_index
+from src.inequality import calculate_gini, calculate_hoover_index, calculate_atkinson_index
 
 def test_gini_ordering():
     equal = np.array([10,10,10,10])
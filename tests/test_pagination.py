@@ -0,0 +1,33 @@
+# tests/test_pagination.py
+from decimal import Decimal
+import pytest
+from src.query_builder import (encode_cursor, decode_cursor, search_columns, KEYSET_CONDITION,
+                               FUZZY_KEYSET_CONDITION)
+
+def test_cursor_round_trip():
+    token = encode_cursor({'salary_amount': Decimal('12345.67'), 'record_id': 42})
+    assert decode_cursor(token) == [Decimal('12345.67')] * 3 + [42]
+
+def test_malformed_cursor_rejected():
+    for token in ['not-a-cursor', encode_cursor({'salary_amount': 'NaN', 'record_id': 1})]:
+        with pytest.raises(ValueError):
+            decode_cursor(token)
+
+def test_keyset_columns_always_selected():
+    select_list, _ = search_columns(['full_name'])
+    assert "s.record_id" in select_list and "s.salary_amount" in select_list
+
+def test_fuzzy_cursor_carries_relevance():
+    token = encode_cursor({'salary_amount': Decimal('5000.00'), 'record_id': 7, 'relevance': 0.5714286})
+    assert decode_cursor(token, fuzzy=True) == [0.5714286, 0.5714286, Decimal('5000.00'), Decimal('5000.00'), 7]
+    # A cursor only resumes the mode it came from
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor({'salary_amount': Decimal('1'), 'record_id': 1}), fuzzy=True)
+
+def test_keyset_params_match_conditions():
+    token = encode_cursor({'salary_amount': Decimal('100.00'), 'record_id': 3})
+    assert KEYSET_CONDITION.count('%s') == len(decode_cursor(token))
+    fuzzy = encode_cursor({'salary_amount': Decimal('100.00'), 'record_id': 3, 'relevance': 0.5})
+    assert FUZZY_KEYSET_CONDITION.count('%s') == len(decode_cursor(fuzzy, fuzzy=True))
@@ -0,0 +1,156 @@
+# tests/test_parser.py
+import pytest
+import src.parser as parser
+from src.loader import batches
+from src.parser import ProgressLog, parse_amount, parse_declaration_text, parse_files
+from src.registry import DocumentRegistry, file_digest
+
+DECLARATION = """CNSS - Bordereau de declaration des salaires
+Raison sociale : ATLAS  BANK
+Activité : Banking and Financial Services
+Ville : Rabat
+N° Nom et prenom Jours Salaire
+123456789 EL AMRANI SARA 26 12 345,67
+223456789 BENNANI Omar 26 4500.00
+Total 2 16 845,67
+"""
+
+def test_parse_amount_formats():
+    assert parse_amount('12 345,67') == 12345.67
+    assert parse_amount('12.345,67') == 12345.67
+    assert parse_amount('12345.67') == 12345.67
+    assert parse_amount('1.234.567') == 1234567.0
+
+def test_parse_declaration_text():
+    rows = parse_declaration_text(DECLARATION, 'atlas.pdf')
+    assert [(r['full_name'], r['salary_amount']) for r in rows] == [
+        ('EL AMRANI SARA', 12345.67), ('BENNANI Omar', 4500.0)]
+    assert rows[0]['company_name'] == 'ATLAS BANK'
+    assert rows[0]['activity_description'] == 'Banking and Financial Services'
+    assert rows[0]['city'] == 'Rabat' and rows[0]['filename'] == 'atlas.pdf'
+    assert [r['cnss_number'] for r in rows] == ['123456789', '223456789']
+
+def test_declaration_without_company_has_no_rows():
+    assert parse_declaration_text('123456789 EL AMRANI SARA 26 4500,00', 'x.pdf') == []
+
+def test_parse_files_skips_unreadable_and_reports_empty(monkeypatch, capsys):
+    texts = {'a.pdf': DECLARATION, 'b.pdf': 'scanned page, no text'}
+
+    def fake_extract(path):
+        if path not in texts:
+            raise ValueError('not a PDF')
+        return texts[path]
+
+    monkeypatch.setattr(parser, 'extract_text', fake_extract)
+    empty = []
+    rows = list(parse_files(['a.pdf', 'broken.pdf', 'b.pdf'], on_empty=empty.append))
+    assert len(rows) == 2 and empty == ['b.pdf']
+    assert 'Could not parse broken.pdf' in capsys.readouterr().out
+
+def test_parse_files_in_worker_processes(monkeypatch, capsys):
+    def fake_extract(path):
+        if path == 'broken.pdf':
+            raise ValueError('not a PDF')
+        return DECLARATION
+
+    # Forked workers inherit the patched module
+    monkeypatch.setattr(parser, 'extract_text', fake_extract)
+    paths = [f'{i}.pdf' for i in range(6)] + ['broken.pdf']
+    rows = list(parse_files(paths, workers=2, queue_size=1))
+    filenames = [row['filename'] for row in rows]
+    runs = [name for i, name in enumerate(filenames) if i == 0 or filenames[i - 1] != name]
+    assert sorted(runs) == sorted(paths[:-1]) and len(rows) == 12
+    assert 'Could not parse broken.pdf' in capsys.readouterr().out
+
+def test_ingest_resumes_from_progress_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(parser, 'extract_text', lambda path: DECLARATION)
+    loaded = []
+
+    def fake_load_rows(conn, rows, batch_size, on_batch):
+        for batch in batches(rows, batch_size):
+            loaded.append(sorted({row['filename'] for row in batch}))
+            on_batch(batch)
+
+    monkeypatch.setattr(parser, 'load_rows', fake_load_rows)
+    paths = []
+    for name in ['a.pdf', 'b.pdf', 'c.pdf']:
+        (tmp_path / name).write_bytes(name.encode())
+        paths.append(str(tmp_path / name))
+    progress = tmp_path / 'progress'
+    progress.write_text('a.pdf\n')
+
+    parser.ingest(None, paths, str(progress), batch_size=2, registry=DocumentRegistry())
+    assert loaded == [['b.pdf'], ['c.pdf']]
+    assert ProgressLog(str(progress)).done == {'a.pdf', 'b.pdf', 'c.pdf'}
+
+    loaded.clear()
+    parser.ingest(None, paths, str(progress), batch_size=2, registry=DocumentRegistry())
+    assert loaded == []
+
+def test_ingest_skips_registered_and_duplicate_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(parser, 'extract_text', lambda path: DECLARATION)
+    loaded = []
+
+    def fake_load_rows(conn, rows, batch_size, on_batch):
+        rows = list(rows)
+        loaded.extend(rows)
+        on_batch(rows)
+
+    monkeypatch.setattr(parser, 'load_rows', fake_load_rows)
+    (tmp_path / 'old.pdf').write_bytes(b'old')
+    (tmp_path / 'new.pdf').write_bytes(b'new')
+    (tmp_path / 'new-copy.pdf').write_bytes(b'new')
+    paths = [str(tmp_path / name) for name in ['new-copy.pdf', 'new.pdf', 'old.pdf']]
+    progress = tmp_path / 'progress'
+
+    parser.ingest(None, paths, str(progress), registry=DocumentRegistry([('old.pdf', None)]))
+    assert {row['filename'] for row in loaded} == {'new-copy.pdf'}
+    assert loaded[0]['content_hash'] == file_digest(paths[0])[0] and loaded[0]['file_size'] == 3
+    assert 'new.pdf' in ProgressLog(str(progress)).done
+
+def test_copy_is_recorded_with_its_original(monkeypatch, tmp_path):
+    failures = [ValueError('file still being copied')]
+
+    def fake_extract(path):
+        if failures:
+            raise failures.pop()
+        return DECLARATION
+
+    monkeypatch.setattr(parser, 'extract_text', fake_extract)
+    loaded = []
+
+    def fake_load_rows(conn, rows, batch_size, on_batch):
+        rows = list(rows)
+        loaded.extend(rows)
+        on_batch(rows)
+
+    monkeypatch.setattr(parser, 'load_rows', fake_load_rows)
+    (tmp_path / 'a.pdf').write_bytes(b'same')
+    (tmp_path / 'b.pdf').write_bytes(b'same')
+    paths = [str(tmp_path / 'a.pdf'), str(tmp_path / 'b.pdf')]
+    progress = tmp_path / 'progress'
+
+    # The original fails: its copy is not marked as done either
+    parser.ingest(None, paths, str(progress), registry=DocumentRegistry())
+    assert loaded == [] and ProgressLog(str(progress)).done == set()
+
+    parser.ingest(None, paths, str(progress), registry=DocumentRegistry())
+    assert {row['filename'] for row in loaded} == {'a.pdf'}
+    assert ProgressLog(str(progress)).done == {'a.pdf', 'b.pdf'}
+
+def test_parse_generated_pdf(tmp_path):
+    pytest.importorskip('pdfplumber')
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(8.27, 11.69))
+    for i, line in enumerate(DECLARATION.splitlines()):
+        fig.text(0.05, 0.95 - i * 0.03, line, family='monospace', fontsize=10)
+    path = tmp_path / 'atlas.pdf'
+    fig.savefig(path)
+    plt.close(fig)
+
+    filename, rows = parser.parse_file(str(path))
+    assert filename == 'atlas.pdf'
+    assert [r['salary_amount'] for r in rows] == [12345.67, 4500.0]
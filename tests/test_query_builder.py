@@ -0,0 +1,65 @@
+# tests/test_query_builder.py
+import pytest
+from src.query_builder import parse_filters, plan_query, relevance, search_columns, search_query
+
+def test_unfiltered_stats_only_join_companies():
+    from_clause, where_clause, params = plan_query(parse_filters({}), required_tables={'c'})
+    assert "JOIN companies" in from_clause
+    assert "employees" not in from_clause and "documents" not in from_clause
+    # Dropped inner joins keep their semantics through a NOT NULL check
+    assert "s.employee_id IS NOT NULL" in where_clause
+    assert params == [0, 1000000000]
+
+def test_employee_filter_adds_join():
+    from_clause, where_clause, params = plan_query(parse_filters({'employee_name': 'amina'}))
+    assert "JOIN employees" in from_clause
+    assert params[0] == "%amina%"
+
+def test_search_columns_without_filename_skip_documents():
+    select_list, required = search_columns(['full_name', 'salary_amount'])
+    assert required == {'e'}
+    assert "d.filename" not in select_list
+    assert search_columns(['unknown'])[1] == {'c', 'd', 'e'}
+
+def test_city_is_matched_exactly():
+    _, where_clause, params = plan_query(parse_filters({'city': 'Rabat'}))
+    assert "LOWER(c.city) = LOWER(%s)" in where_clause
+    assert params[0] == 'Rabat'
+
+def test_fuzzy_mode_uses_word_similarity():
+    filters = parse_filters({'company_name': 'atlas bank', 'activity': 'bank', 'city': 'Rabat'})
+    _, where_clause, params = plan_query(filters, fuzzy=True)
+    assert "LOWER(%s) <%% LOWER(c.company_name)" in where_clause
+    assert params[:3] == ['atlas bank', 'Rabat', 'bank']
+    rank, rank_params = relevance(filters)
+    assert rank.count('word_similarity') == 2 and rank_params == ['atlas bank', 'bank']
+    assert relevance(parse_filters({})) == ("0::real", [])
+
+def test_fuzzy_index_scan():
+    psycopg2 = pytest.importorskip('psycopg2')
+    from config import DB_CONFIG
+    try:
+        conn = psycopg2.connect(connect_timeout=2, **DB_CONFIG)
+    except psycopg2.Error:
+        pytest.skip('database not reachable')
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            pytest.skip('pg_trgm not installed')
+        from_clause, where_clause, params = plan_query(parse_filters({'company_name': 'atlas'}), {'c'}, fuzzy=True)
+        # Tables this small are cheaper to scan; check that the index can serve the predicate
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN SELECT 1 FROM {from_clause} WHERE {where_clause}", params)
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+        assert 'idx_company_name' in plan
+    finally:
+        conn.close()
+
+def test_search_query_without_limit():
+    filters = parse_filters({'company_name': 'atlas'})
+    for fuzzy in (False, True):
+        query, params = search_query(filters, limit=None, fuzzy=fuzzy)
+        paged_query, paged_params = search_query(filters, limit=10, fuzzy=fuzzy)
+        assert 'LIMIT' not in query and 'LIMIT %s' in paged_query
+        assert params + [10] == paged_params
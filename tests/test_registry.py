@@ -0,0 +1,25 @@
+# tests/test_registry.py
+import hashlib
+from src.registry import DocumentRegistry, file_digest
+
+def test_file_digest(tmp_path):
+    path = tmp_path / 'a.pdf'
+    path.write_bytes(b'%PDF-1.4 declaration')
+    assert file_digest(str(path)) == (hashlib.sha256(b'%PDF-1.4 declaration').hexdigest(), 20)
+    # Larger than one read chunk
+    content = bytes(range(256)) * 10000
+    path.write_bytes(content)
+    assert file_digest(str(path)) == (hashlib.sha256(content).hexdigest(), len(content))
+
+def test_classify_by_name_then_content(tmp_path):
+    for name, content in [('a.pdf', b'A'), ('renamed.pdf', b'A'), ('b.pdf', b'B'), ('b-copy.pdf', b'B')]:
+        (tmp_path / name).write_bytes(content)
+    registry = DocumentRegistry([('a.pdf', hashlib.sha256(b'A').hexdigest()), ('legacy.pdf', None)])
+
+    assert registry.classify(str(tmp_path / 'a.pdf')) == ('known', 'a.pdf')
+    assert registry.classify(str(tmp_path / 'renamed.pdf')) == ('duplicate', 'a.pdf')
+    status, fields = registry.classify(str(tmp_path / 'b.pdf'))
+    assert status == 'new' and fields == {'content_hash': hashlib.sha256(b'B').hexdigest(), 'file_size': 1}
+    # Files admitted earlier in the same run count as registered
+    assert registry.classify(str(tmp_path / 'b-copy.pdf')) == ('duplicate', 'b.pdf')
+    assert registry.classify(str(tmp_path / 'b.pdf')) == ('known', 'b.pdf')
@@ -0,0 +1,65 @@
+# tests/test_report_data.py
+import numpy as np
+import pandas as pd
+import pytest
+from src.report_data import ntile, report_frames, national_percentiles, company_sizes
+
+def make_extract():
+    return pd.DataFrame({
+        'salary_amount': [1000.0, 3000.0, 8000.0, 4000.0, 6000.0, 20000.0, 7000.0, 2500.0],
+        'city': ['Rabat', 'Rabat', 'Rabat', 'Casablanca', 'Casablanca', 'Casablanca', None, None],
+        'activity_description': ['Services'] * 3 + ['Banking'] * 3 + ['Services', None],
+        'company_name': ['Atlas'] * 3 + ['Beta'] * 3 + ['Gamma', None],
+        'employee_id': [1, 2, 3, 4, 4, 5, 6, 7],
+        'company_id': [10, 10, 10, 20, 20, 20, 30, None],
+    })
+
+def test_ntile_gives_remainder_to_first_tiles():
+    assert ntile(12, 10).tolist() == [1, 1, 2, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert ntile(3, 10).tolist() == [1, 2, 3]
+
+def test_percentiles_interpolate_like_percentile_cont():
+    row = national_percentiles(np.array([1.0, 2.0, 3.0, 4.0])).iloc[0]
+    assert row['p25'] == pytest.approx(1.75)
+    assert row['p50'] == pytest.approx(2.5)
+    assert row['count'] == 4 and row['total_salary'] == 10.0
+
+def test_company_sizes_follow_sql_case():
+    df = pd.DataFrame({'company_id': [1, 2, 2, 3], 'employee_id': [1, 2, 3, np.nan]})
+    sizes = company_sizes(df)
+    # A company whose records have no employee id has size 0 and lands in the ELSE branch
+    assert sizes['size_range'].tolist() == ['1 employee', '2-5 employees', '1000+ employees']
+    assert sizes['employee_count'].tolist() == [1, 2, 0]
+
+def test_group_frames_skip_records_without_company():
+    frames = report_frames(make_extract())
+    assert len(frames['salary_df']) == 7
+    assert frames['percentiles_df'].iloc[0]['count'] == 8
+    city = frames['city_df'].set_index('city')
+    assert city.loc['Casablanca', 'employee_count'] == 2
+    assert city.loc['Rabat', 'median_salary'] == 3000.0
+    assert city.loc['Rabat', 'stddev_salary'] == pytest.approx(np.std([1000, 3000, 8000], ddof=1))
+    assert frames['income_deciles_df']['employee_count'].sum() == 8
+
+def test_local_mode_matches_sql():
+    psycopg2 = pytest.importorskip('psycopg2')
+    from config import DB_CONFIG
+    try:
+        psycopg2.connect(connect_timeout=2, **DB_CONFIG).close()
+    except psycopg2.Error:
+        pytest.skip('database not reachable')
+
+    from src.generate_report import fetch_data_for_analysis
+    sql = fetch_data_for_analysis(snapshot_dir=None, workers=1, compute='sql')
+    local = fetch_data_for_analysis(compute='local')
+    for key, expected in sql.items():
+        if not isinstance(expected, pd.DataFrame):
+            continue
+        # Only the per-record frames keep their strings categorical
+        expected = expected.astype({c: object for c in expected.select_dtypes('category')})
+        local[key] = local[key].astype({c: object for c in local[key].select_dtypes('category')})
+        # Rows tied on the ORDER BY column come back in any order from SQL
+        sort_by = [c for c in expected.columns if expected[c].dtype == object] or list(expected.columns)
+        actual = local[key][list(expected.columns)].sort_values(sort_by).reset_index(drop=True)
+        expected = expected.sort_values(sort_by).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, rtol=1e-9)
@@ -0,0 +1,40 @@
+# tests/test_report_pages.py
+import pandas as pd
+from src.generate_report import page_hash, _page_title, _page_cities_by_employees, _page_companies_by_salary
+
+def make_data():
+    city_df = pd.DataFrame({'city': ['Rabat', 'Casablanca'], 'employee_count': [3, 2], 'avg_salary': [4000.0, 10000.0]})
+    company_df = pd.DataFrame({'company_name': ['Atlas'], 'employee_count': [12]})
+    return {'city_df': city_df, 'company_df': company_df}
+
+def test_page_hash_ignores_row_order():
+    data = make_data()
+    shuffled = dict(data, city_df=data['city_df'].iloc[::-1])
+    assert page_hash(_page_cities_by_employees, data) == page_hash(_page_cities_by_employees, shuffled)
+
+def test_page_hash_tracks_only_page_inputs():
+    data = make_data()
+    changed = dict(data, city_df=data['city_df'].assign(avg_salary=[4000.0, 10001.0]))
+    assert page_hash(_page_cities_by_employees, data) != page_hash(_page_cities_by_employees, changed)
+    assert page_hash(_page_companies_by_salary, data) == page_hash(_page_companies_by_salary, changed)
+    assert page_hash(_page_title, data) is None
+
+def test_city_lorenz_curves_follow_their_city():
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from src.generate_report import _page_city_inequality
+    from src.inequality import grouped_inequality
+
+    salaries = {'Rabat': [1000.0, 1000.0, 1000.0, 9000.0], 'Casablanca': [2000.0, 2500.0, 3000.0, 3500.0]}
+    salary_df = pd.DataFrame([(city, s) for city, values in salaries.items() for s in values],
+                             columns=['city', 'salary_amount'])
+    city_df = pd.DataFrame({'city': ['Rabat', 'Casablanca'], 'employee_count': [4, 4]})
+    fig = _page_city_inequality({'city_df': city_df, 'salary_df': salary_df})
+    curves = {line.get_label(): line.get_ydata() for line in fig.axes[1].lines if line.get_label() in salaries}
+    plt.close(fig)
+    assert curves.keys() == salaries.keys()
+    for city, curve in curves.items():
+        alone = grouped_inequality(np.zeros(4), salaries[city], lorenz_points=50)
+        assert np.allclose(curve[1:], alone['lorenz'][0])
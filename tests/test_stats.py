@@ -0,0 +1,64 @@
+# tests/test_stats.py
+import pytest
+from src.inequality import inequality_metrics
+from src.stats import build_stats_query, SALARY_BUCKET_BOUNDS, SALARY_BUCKET_LABELS
+
+def test_bucket_labels_cover_bounds():
+    assert len(SALARY_BUCKET_LABELS) == len(SALARY_BUCKET_BOUNDS) + 1
+    assert SALARY_BUCKET_BOUNDS == sorted(SALARY_BUCKET_BOUNDS)
+
+def test_stats_query_scans_fact_table_once():
+    query = build_stats_query("salary_records s", "s.salary_amount BETWEEN %s AND %s")
+    assert query.count("FROM salary_records") == 1
+    assert query.count("%s") == 2
+
+def test_matview_sections_only_for_unfiltered_requests():
+    from src.stats import covers_all_rows
+    unfiltered = {'company_name': '', 'min_salary': 0, 'max_salary': 1000000000}
+    assert covers_all_rows(unfiltered, (3000.0, 150000.0))
+    assert not covers_all_rows(unfiltered, None)
+    assert not covers_all_rows({**unfiltered, 'city': 'rabat'}, (3000.0, 150000.0))
+    assert not covers_all_rows({**unfiltered, 'min_salary': 5000}, (3000.0, 150000.0))
+    assert not covers_all_rows({**unfiltered, 'max_salary': 'x'}, (3000.0, 150000.0))
+
+def test_inequality_query_parameters():
+    from src.stats import build_inequality_query, build_lorenz_query
+    where = "s.salary_amount BETWEEN %s AND %s"
+    assert build_inequality_query("salary_records s", where).count("%s") == 3
+    grouped = build_inequality_query("salary_records s", where, "c.city")
+    assert grouped.count("%s") == 5 and "GROUP BY grp" in grouped
+    assert build_lorenz_query("salary_records s", where).count("%s") == 3
+
+def test_sql_aggregates_match_inequality_metrics():
+    psycopg2 = pytest.importorskip('psycopg2')
+    from config import DB_CONFIG
+    from src.stats import inequality_aggregates_installed
+    try:
+        conn = psycopg2.connect(connect_timeout=2, **DB_CONFIG)
+    except psycopg2.Error:
+        pytest.skip('database not reachable')
+    values = [1200.0, 3000.0, 3000.0, 5400.5, 18000.0, 95000.0]
+    query = """
+        SELECT gini_agg(x ORDER BY x), hoover_agg(x, m), atkinson_agg(x, 0.5), theil_agg(x)
+        FROM (SELECT x, AVG(x) OVER () AS m FROM unnest(%s::float8[]) AS t(x)) v
+    """
+    try:
+        if not inequality_aggregates_installed(conn):
+            pytest.skip('sql/Inequality.sql not installed')
+        cursor = conn.cursor()
+        cursor.execute(query, [values])
+        gini, hoover, atkinson, theil = cursor.fetchone()
+    finally:
+        conn.close()
+    expected = inequality_metrics(values, epsilon=0.5)
+    assert gini == pytest.approx(expected['gini'])
+    assert hoover == pytest.approx(expected['hoover'])
+    assert atkinson == pytest.approx(expected['atkinson'])
+    assert theil == pytest.approx(expected['theil'])
+
+def test_city_inequality_is_opt_in():
+    from src.stats import parse_include
+    assert "gini_agg" not in build_stats_query("salary_records s", "TRUE")
+    assert parse_include({}) == []
+    assert parse_include({'include': 'city_inequality'}) == ['city_inequality']
+    assert parse_include({'include': ['bogus', 'city_inequality']}) == ['city_inequality']
@@ -0,0 +1,18 @@
+# tests/test_suggest.py
+from src.suggest import fetch_suggestions, normalize_term, suggestion_params, suggestion_query
+
+def test_normalize_term():
+    assert normalize_term('  Atlas   BANK ') == 'atlas bank'
+    assert normalize_term(None) == ''
+
+def test_params_escape_like_wildcards():
+    assert suggestion_params('50%_off', 10) == ['%50\\%\\_off%', '50%_off', '50\\%\\_off%', '50%_off', 10]
+    assert suggestion_query('employee_name').count('%s') == 5
+
+def test_short_terms_skip_the_database():
+    assert fetch_suggestions(None, 'company_name', 'ab', 10, 0.4) == []
+
+def test_query_reads_dimension_tables_only():
+    query = suggestion_query('activity')
+    assert 'FROM companies' in query and 'salary_records' not in query
+    assert 'LOWER(activity_description) LIKE %s' in query